@@ -0,0 +1,198 @@
+"""
+Async Job Runner for AgentLink
+Alternative to the RQ worker processes: one process pulls jobs from the same
+agentlink-queue and runs up to ASYNC_WORKER_CONCURRENCY of them at once on a
+single event loop. Reports spend most of their time waiting on Domain,
+Supabase, Dropbox and Backblaze, so many of them share one process; only
+WeasyPrint rendering, which is CPU bound, goes to the html_pdf_service
+render process pool (PDF_RENDER_PROCESSES).
+
+Jobs are enqueued exactly as before (main.py is unchanged) and keep the usual
+RQ bookkeeping: the runner registers as an RQ worker, heartbeats its running
+jobs and records results and failures in the started, finished and failed
+registries, so `rq info` and the job status endpoints behave the same.
+
+Run with:
+    python -m app.async_worker
+
+Configuration:
+    ASYNC_WORKER_CONCURRENCY - jobs in flight at once (default 8)
+"""
+import os
+import signal
+import asyncio
+import logging
+import traceback
+
+from rq import Queue, Worker
+from rq.exceptions import DequeueTimeout
+from rq.utils import utcnow
+
+from app.worker import warm_up
+from app.worker_tasks import (
+    redis_conn, queue, fail_unfinished_job,
+    agents_report_job, agents_batch_job, agency_report_job
+)
+from app.services.worker_loop import run_async, shutdown_worker_loop
+from app.services.supabase_client import check_supabase_health
+from app.services.leaderboard_materializer import materialize_leaderboards
+
+logger = logging.getLogger("articflow.async_worker")
+
+ASYNC_WORKER_CONCURRENCY = int(os.getenv("ASYNC_WORKER_CONCURRENCY", "8"))
+
+DEQUEUE_TIMEOUT = 5  # Seconds; also how long shutdown can wait for the dequeue call
+HEARTBEAT_INTERVAL = 30
+
+# Coroutine run for each RQ task enqueued by main.py
+ASYNC_TASKS = {
+    "app.worker_tasks.process_agents_report_task": agents_report_job,
+    "app.worker_tasks.process_agents_batch_task": agents_batch_job,
+    "app.worker_tasks.process_agency_report_task": agency_report_job,
+    "app.worker_tasks.materialize_leaderboards_task": materialize_leaderboards,
+}
+
+
+def _report_job_ids(job):
+    """The job:{id} status hashes an RQ job reports progress to"""
+    if job.func_name == "app.worker_tasks.process_agents_batch_task":
+        reports = job.kwargs.get("reports", job.args[1] if len(job.args) > 1 else [])
+        return [report["job_id"] for report in reports]
+    if job.func_name in ("app.worker_tasks.process_agents_report_task",
+                         "app.worker_tasks.process_agency_report_task"):
+        return [job.kwargs.get("job_id", job.args[0] if job.args else None)]
+    return []
+
+
+class AsyncJobRunner:
+    """Dequeues RQ jobs and runs them concurrently on the current event loop"""
+
+    def __init__(self, concurrency=ASYNC_WORKER_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self.worker = Worker([queue], connection=redis_conn)
+        self.running = {}  # RQ job ID -> Job
+        self._stop = None
+
+    def stop(self):
+        """Stop taking new jobs; jobs already running are finished"""
+        logger.info("Async worker: stop requested, finishing running jobs")
+        self._stop.set()
+
+    async def run(self):
+        """Run jobs until stop() is called, then wait for in-flight jobs"""
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stop)
+
+        self.worker.register_birth()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        logger.info(f"Async worker {self.worker.name}: listening on {queue.name}, "
+                    f"{self.concurrency} concurrent jobs")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        try:
+            while not self._stop.is_set():
+                # Backpressure: only take a job off the queue when a slot is free,
+                # so queued jobs stay visible to other workers until then
+                await semaphore.acquire()
+                result = None
+                try:
+                    if not self._stop.is_set():
+                        result = await asyncio.to_thread(
+                            Queue.dequeue_any, [queue], DEQUEUE_TIMEOUT, connection=redis_conn
+                        )
+                except DequeueTimeout:
+                    pass
+                except Exception as e:
+                    logger.error(f"Async worker: error dequeuing job: {e}", exc_info=True)
+                    await asyncio.sleep(DEQUEUE_TIMEOUT)
+                if not result:
+                    semaphore.release()
+                    continue
+
+                job, job_queue = result
+                task = asyncio.create_task(self._perform(job, job_queue))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: semaphore.release())
+
+            if tasks:
+                logger.info(f"Async worker: waiting for {len(tasks)} running jobs")
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
+            self.worker.register_death()
+            logger.info(f"Async worker {self.worker.name}: stopped")
+
+    async def _heartbeat(self):
+        """Keep the worker and its running jobs alive in RQ's registries"""
+        ttl = HEARTBEAT_INTERVAL + 60
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                with redis_conn.pipeline() as pipeline:
+                    self.worker.heartbeat(pipeline=pipeline)
+                    for job in self.running.values():
+                        job.heartbeat(utcnow(), ttl, pipeline=pipeline)
+                    pipeline.execute()
+            except Exception as e:
+                logger.warning(f"Async worker: heartbeat failed: {e}")
+
+    async def _perform(self, job, job_queue):
+        """Run one RQ job and record the outcome like an RQ worker would"""
+        started_job_registry = job_queue.started_job_registry
+        coroutine_function = ASYNC_TASKS.get(job.func_name)
+
+        self.worker.prepare_job_execution(job, remove_from_intermediate_queue=True)
+        self.running[job.id] = job
+        job.started_at = utcnow()
+        timeout = job.timeout or Queue.DEFAULT_TIMEOUT
+        logger.info(f"Async worker: started {job.func_name} ({job.id})")
+        try:
+            if coroutine_function is None:
+                raise RuntimeError(f"{job.func_name} has no async implementation")
+            # Same rate-limited probe the RQ tasks run before each job
+            await asyncio.to_thread(check_supabase_health)
+            job._result = await asyncio.wait_for(coroutine_function(*job.args, **job.kwargs), timeout)
+        except BaseException as e:
+            job.ended_at = utcnow()
+            if isinstance(e, (asyncio.TimeoutError, asyncio.CancelledError)):
+                reason = f"Job timed out after {timeout}s" if isinstance(e, asyncio.TimeoutError) else "Job cancelled"
+                logger.error(f"Async worker: {job.func_name} ({job.id}): {reason}")
+                # The report was interrupted mid-step, so its status hash still says in progress
+                for job_id in _report_job_ids(job):
+                    fail_unfinished_job(job_id, reason)
+            else:
+                logger.error(f"Async worker: {job.func_name} ({job.id}) failed: {e}", exc_info=True)
+            self.worker.handle_job_failure(
+                job, job_queue, started_job_registry=started_job_registry,
+                exc_string="".join(traceback.format_exception(type(e), e, e.__traceback__))
+            )
+            if not isinstance(e, Exception):
+                raise
+        else:
+            job.ended_at = utcnow()
+            self.worker.handle_job_success(job, job_queue, started_job_registry)
+            logger.info(f"Async worker: finished {job.func_name} ({job.id})")
+        finally:
+            self.running.pop(job.id, None)
+
+
+def main():
+    warm_up()
+    try:
+        run_async(AsyncJobRunner().run())
+    finally:
+        shutdown_worker_loop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -4,7 +4,7 @@ import os
 import glob
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pathlib import Path
 
 # Third-party imports
@@ -22,12 +22,25 @@ from app.worker_tasks import (
     process_agency_report_task, 
     queue, 
     get_job_status, 
-    update_job_status
+    update_job_status,
+    agents_report_flight_key,
+    join_single_flight,
+    materialize_leaderboards_task,
+    process_agents_batch_task,
+    create_batch,
+    get_batch_status
 )
 
 # Google Sheets sync router
 from app.routes.google_sheets_sync import router as sheets_sync_router
 
+# Shared cache counters
+from app.services.agency_cache import get_agency_cache_stats
+from app.services.listings_cache import get_listings_cache_stats
+from app.services.subscription_cache import get_subscription_cache_stats
+from app.services.render_cache import get_render_cache_stats
+from app.services.commission_rates import refresh_commission_rates
+
 # Configure logging with date and time in filename
 log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
 os.makedirs(log_dir, exist_ok=True)
@@ -102,6 +115,7 @@ class AgentsReportRequest(BaseModel):
     min_land_area: Optional[int] = None  # Added parameter for minimum land size
     max_land_area: Optional[int] = None  # Added parameter for maximum land size
     home_owner_pricing: Optional[str] = None  
+    bypass_cache: Optional[bool] = False  # Skip cached Domain search results
 
 class AgencyReportRequest(BaseModel):
     featured_agency_id: str = None
@@ -122,11 +136,40 @@ class AgencyReportRequest(BaseModel):
     max_land_area: Optional[int] = None  # Added parameter for maximum land size
     home_owner_pricing: Optional[str] = None
     rental_value: Optional[str] = None  # Rental value for commission PDF selection
+    bypass_cache: Optional[bool] = False  # Skip cached Domain search results
+
+class BatchSuburb(BaseModel):
+    suburb: str
+    state: str = "NSW"
+    post_code: Optional[str] = None
+
+class AgentsBatchReportRequest(BaseModel):
+    suburbs: List[BatchSuburb]  # One agents report per suburb, same filters for all
+    featured_agent_id: str = None
+    property_types: Optional[list] = None
+    min_bedrooms: Optional[int] = 1
+    max_bedrooms: Optional[int] = None
+    min_bathrooms: Optional[int] = 1
+    max_bathrooms: Optional[int] = None
+    min_carspaces: Optional[int] = 1
+    max_carspaces: Optional[int] = None
+    include_surrounding_suburbs: Optional[bool] = False
+    region: Optional[str] = None
+    area: Optional[str] = None
+    min_land_area: Optional[int] = None
+    max_land_area: Optional[int] = None
+    home_owner_pricing: Optional[str] = None
+    bypass_cache: Optional[bool] = False
 
 class JobResponse(BaseModel):
     job_id: str
     status: str
 
+class BatchJobResponse(BaseModel):
+    batch_id: str
+    status: str
+    jobs: List[dict]  # job_id, suburb and state for each suburb
+
 class JobStatusResponse(BaseModel):
     job_id: str
     status: str
@@ -158,6 +201,24 @@ def clear_temp_pdfs(temp_dir=None):
             os.remove(pdf_file)
         except Exception as e:
             print(f"Error removing file {pdf_file}: {e}")
+
+
+# Progress percentage reported for each job status
+JOB_STATUS_PROGRESS = {
+    "processing": 10,
+    "fetching_property_data": 30,
+    "fetching_agents_data": 30,
+    "fetching_agency_data": 30,
+    "generating_commission_pdf": 45,
+    "generating_pdf": 60,
+    "uploading_to_dropbox": 85,
+    "creating_completed_pdf": 92,
+    "completed": 100,
+    "failed": 0,
+}
+
+# Largest number of suburbs accepted in one batch request
+BATCH_MAX_SUBURBS = int(os.getenv("BATCH_MAX_SUBURBS", "25"))
             
             
 @app.get("/api/job-status/{job_id}", response_model=JobStatusResponse)
@@ -174,24 +235,8 @@ async def job_status_endpoint(job_id: str):
     logger.info(f"Current status for job {job_id}: {job.get('status')}")
     
     # Calculate progress based on status
-    progress = 0
     status = job.get("status", "processing")
-    if status == "processing":
-        progress = 10
-    elif status == "fetching_property_data" or status == "fetching_agents_data" or status == "fetching_agency_data":
-        progress = 30
-    elif status == "generating_commission_pdf":
-        progress = 45  
-    elif status == "generating_pdf":
-        progress = 60
-    elif status == "uploading_to_dropbox":
-        progress = 85
-    elif status == "creating_completed_pdf":
-        progress = 92
-    elif status == "completed":
-        progress = 100
-    elif status == "failed":
-        progress = 0
+    progress = JOB_STATUS_PROGRESS.get(status, 0)
     
     # Ensure error is always a string
     error = job.get("error", "")
@@ -215,6 +260,29 @@ async def job_status_endpoint(job_id: str):
         "error": error
     }
 
+@app.get("/api/cache-stats")
+async def cache_stats_endpoint():
+    """Hit/miss counters for the shared Redis caches"""
+    return {
+        "agency_details": get_agency_cache_stats(),
+        "listings": get_listings_cache_stats(),
+        "standard_subscriptions": get_subscription_cache_stats(),
+        "rendered_pdfs": get_render_cache_stats()
+    }
+
+@app.post("/api/commission-rates/refresh")
+def refresh_commission_rates_endpoint(state: Optional[str] = None):
+    """
+    Re-fetch the cached standard commission rate rows (one state or all)
+
+    A plain def so FastAPI runs it in its threadpool: the webhook calls are
+    blocking requests.get calls, one per state.
+    """
+    results = refresh_commission_rates([state] if state else None)
+    if not any(results.values()):
+        raise HTTPException(status_code=502, detail="Could not fetch commission rates from webhook")
+    return {"status": "success", "refreshed": results}
+
 # Add this after initializing the FastAPI app
 templates = Jinja2Templates(directory="app/templates")
 
@@ -232,6 +300,16 @@ async def generate_agents_report(request: AgentsReportRequest):
     update_job_status(job_id, "processing", suburb=request.suburb)
     logger.info(f"Agents report job {job_id} initialized with status 'processing'")
     
+    # Coalesce with an identical in-flight report (single-flight). Cache
+    # bypass requests always get their own run.
+    flight_key = None
+    if not request.bypass_cache:
+        flight_key = agents_report_flight_key(request.model_dump())
+        leader_job_id = join_single_flight(flight_key, job_id)
+        if leader_job_id:
+            logger.info(f"Agents report job {job_id} attached to in-flight job {leader_job_id}")
+            return {"job_id": job_id, "status": "processing"}
+    
     # Enqueue task to RQ worker
     rq_job = queue.enqueue(
         process_agents_report_task,
@@ -253,6 +331,8 @@ async def generate_agents_report(request: AgentsReportRequest):
         min_land_area=request.min_land_area,
         max_land_area=request.max_land_area,
         home_owner_pricing=request.home_owner_pricing,
+        bypass_cache=request.bypass_cache,
+        single_flight_key=flight_key,
         job_timeout='10m'  # 10 minute timeout for PDF generation
     )
     logger.info(f"RQ task enqueued for agents report job {job_id}, RQ Job ID: {rq_job.id}")
@@ -293,6 +373,7 @@ async def generate_agency_report(request: AgencyReportRequest):
         min_land_area=request.min_land_area,
         max_land_area=request.max_land_area,
         rental_value=request.rental_value,
+        bypass_cache=request.bypass_cache,
         job_timeout='10m'  # 10 minute timeout for PDF generation
     )
     logger.info(f"RQ task enqueued for agency report job {job_id}, RQ Job ID: {rq_job.id}")
@@ -300,6 +381,76 @@ async def generate_agency_report(request: AgencyReportRequest):
     return {"job_id": job_id, "status": "processing"}
 
 
+@app.post("/api/generate-agents-report/batch", response_model=BatchJobResponse)
+async def generate_agents_report_batch(request: AgentsBatchReportRequest):
+    """
+    Generate agents reports for several suburbs in one worker job
+    
+    Each suburb gets its own job ID (pollable via /api/job-status); the batch
+    as a whole is tracked via /api/batch-status/{batch_id}.
+    """
+    if not request.suburbs:
+        raise HTTPException(status_code=400, detail="At least one suburb is required")
+    if len(request.suburbs) > BATCH_MAX_SUBURBS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {BATCH_MAX_SUBURBS} suburbs")
+    
+    clear_temp_pdfs()
+    batch_id = str(uuid.uuid4())
+    logger.info(f"New agents report batch created: {batch_id} ({len(request.suburbs)} suburbs)")
+    
+    filters = request.model_dump(exclude={"suburbs"}, exclude_none=True)
+    jobs = []
+    reports = []
+    for item in request.suburbs:
+        job_id = str(uuid.uuid4())
+        update_job_status(job_id, "processing", suburb=item.suburb)
+        jobs.append({"job_id": job_id, "suburb": item.suburb, "state": item.state})
+        
+        # Same parameters (and single-flight key) as a single agents report request
+        params = AgentsReportRequest(**filters, suburb=item.suburb, state=item.state, post_code=item.post_code).model_dump()
+        flight_key = None
+        if not request.bypass_cache:
+            flight_key = agents_report_flight_key(params)
+            leader_job_id = join_single_flight(flight_key, job_id)
+            if leader_job_id:
+                logger.info(f"Batch {batch_id}: job {job_id} ({item.suburb}) attached to in-flight job {leader_job_id}")
+                continue
+        reports.append({"job_id": job_id, **params, "single_flight_key": flight_key})
+    
+    create_batch(batch_id, jobs)
+    
+    if reports:
+        rq_job = queue.enqueue(
+            process_agents_batch_task,
+            batch_id,
+            reports,
+            job_timeout=600 * len(reports)  # Never less than the summed single-report timeouts
+        )
+        logger.info(f"RQ task enqueued for batch {batch_id} ({len(reports)} reports), RQ Job ID: {rq_job.id}")
+    
+    return {"batch_id": batch_id, "status": "processing", "jobs": jobs}
+
+@app.get("/api/batch-status/{batch_id}")
+async def batch_status_endpoint(batch_id: str):
+    """Overall and per-suburb status of a batch report request"""
+    batch = get_batch_status(batch_id)
+    if not batch:
+        logger.warning(f"Batch {batch_id} not found")
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    for job in batch["jobs"]:
+        job["progress"] = JOB_STATUS_PROGRESS.get(job["status"], 0)
+    return batch
+
+
+@app.post("/api/leaderboards/refresh")
+async def refresh_leaderboards(force: bool = False, limit: Optional[int] = None):
+    """Enqueue a refresh of the precomputed suburb leaderboards"""
+    rq_job = queue.enqueue(materialize_leaderboards_task, force=force, limit=limit, job_timeout='2h')
+    logger.info(f"Leaderboard materialization enqueued, RQ Job ID: {rq_job.id}")
+    return {"status": "queued", "rq_job_id": rq_job.id}
+
+
 if __name__ == "__main__":
     # Add a test log message to verify logging is working
     logger.info("Starting the application server")
@@ -13,21 +13,21 @@ from dotenv import load_dotenv
 import logging
 import psycopg2
 from psycopg2 import sql
-from supabase import create_client, Client
 import re
+import asyncio
 from datetime import datetime
+from app.services.featured_agents_index import build_featured_index, FEATURED_INDEX_TABLE
+from app.services.supabase_client import get_supabase, check_supabase_health
+from app.services.subscription_cache import invalidate_subscription_cache
 
 load_dotenv()
 
 router = APIRouter(prefix="/api/sheets", tags=["Google Sheets Sync"])
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_DB_PASSWORD = os.getenv("SUPABASE_DB_PASSWORD")
 WEBHOOK_SECRET = os.getenv("SHEETS_WEBHOOK_SECRET", "change-me-in-production")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-
 logger = logging.getLogger(__name__)
 
 
@@ -152,7 +152,7 @@ def create_table_from_data(table_name: str, data: List[Dict[str, Any]]) -> bool:
 def table_exists(table_name: str) -> bool:
     """Check if table exists in Supabase"""
     try:
-        result = supabase.table(table_name).select("*").limit(1).execute()
+        result = get_supabase().table(table_name).select("*").limit(1).execute()
         return True
     except Exception as e:
         return False
@@ -246,7 +246,7 @@ async def sync_sheet(
         logger.info(f"🗑️ Deleting existing data from {table_name}...")
         try:
             # Delete all rows where id > 0 (effectively all rows)
-            supabase.table(table_name).delete().neq("id", 0).execute()
+            get_supabase().table(table_name).delete().neq("id", 0).execute()
             logger.info(f"  ✅ Cleared existing data")
         except Exception as e:
             logger.warning(f"  ⚠️ Delete failed (table might be empty): {e}")
@@ -258,10 +258,23 @@ async def sync_sheet(
         for i in range(0, len(cleaned_data), batch_size):
             batch = cleaned_data[i:i + batch_size]
             # Use INSERT instead of UPSERT to avoid confusion
-            result = supabase.table(table_name).insert(batch).execute()
+            result = get_supabase().table(table_name).insert(batch).execute()
             total_synced += len(batch)
             logger.info(f"  ✅ Inserted batch {i//batch_size + 1}: {len(batch)} rows")
         
+        # Subscription data may have changed - drop cached webhook results
+        if table_name.startswith("agents_subscribed"):
+            invalidate_subscription_cache()
+        
+        # Featured subscriptions were replaced - rebuild the suburb index now
+        # rather than serving the old rows until its TTL runs out
+        if table_name == FEATURED_INDEX_TABLE:
+            try:
+                suburb_count = await asyncio.to_thread(build_featured_index)
+                logger.info(f"  ✅ Rebuilt featured agents index for {suburb_count} suburbs")
+            except Exception as e:
+                logger.error(f"  ⚠️ Featured index rebuild failed: {e}")
+        
         return {
             "status": "success",
             "message": f"Successfully synced {total_synced} rows to {table_name}",
@@ -277,6 +290,24 @@ async def sync_sheet(
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
 
+@router.post("/featured-index/rebuild")
+async def rebuild_featured_index(x_webhook_secret: Optional[str] = Header(None)):
+    """Rebuild the Redis featured agents index after agent_subscriptions changes"""
+    if x_webhook_secret != WEBHOOK_SECRET:
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+
+    try:
+        suburb_count = await asyncio.to_thread(build_featured_index)
+        return {
+            "status": "success",
+            "message": f"Featured agents index rebuilt for {suburb_count} suburbs",
+            "suburbs_indexed": suburb_count
+        }
+    except Exception as e:
+        logger.error(f"❌ Featured index rebuild failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Featured index rebuild failed: {str(e)}")
+
+
 @router.get("/tables")
 async def list_tables():
     """List all synced tables"""
@@ -344,15 +375,14 @@ async def get_table_schema(table_name: str):
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    try:
-        supabase.table('agents_subscribed').select('*').limit(1).execute()
+    # Probes the shared client and rebuilds it if the connection has gone bad
+    if check_supabase_health(force=True):
         return {
             "status": "healthy",
             "supabase": "connected",
             "endpoint": "sheets-sync"
         }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "error": str(e)
-        }
+    return {
+        "status": "unhealthy",
+        "error": "Supabase health check failed (client reset, see logs)"
+    }
@@ -0,0 +1,121 @@
+"""
+Agency Details Cache
+Redis-backed cache of Domain.com.au agency records shared by all RQ workers.
+
+Entries are keyed by agency id and served in three states:
+- fresh:     younger than AGENCY_CACHE_TTL, returned directly
+- stale:     older than AGENCY_CACHE_TTL but inside the stale window, returned
+             immediately while one worker refreshes it in the background
+- not found: Domain answered 404, cached for AGENCY_CACHE_NEGATIVE_TTL
+"""
+import os
+import time
+import asyncio
+import logging
+
+from .cache import cache_get_json, cache_set_json, acquire_lock, release_lock, incr_stat, get_stats
+
+logger = logging.getLogger("articflow.agency_cache")
+
+AGENCY_CACHE_TTL = int(os.getenv("AGENCY_CACHE_TTL", str(7 * 24 * 3600)))
+AGENCY_CACHE_STALE_TTL = int(os.getenv("AGENCY_CACHE_STALE_TTL", str(30 * 24 * 3600)))
+AGENCY_CACHE_NEGATIVE_TTL = int(os.getenv("AGENCY_CACHE_NEGATIVE_TTL", str(6 * 3600)))
+AGENCY_CACHE_REFRESH_LOCK_TTL = 60
+
+KEY_PREFIX = "agency_cache"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+
+# Keep references to background refreshes so they are not garbage collected
+_refresh_tasks = set()
+# agency_id -> task fetching it after a cache miss; concurrent lookups in this
+# process (e.g. the suburbs of a batch report) share one Domain request
+_inflight = {}
+
+
+def _entry_key(agency_id):
+    return f"{KEY_PREFIX}:{agency_id}"
+
+
+def _store(agency_id, status_code, data):
+    """Write a fetch result to the cache. Only 200s and 404s are cached."""
+    if status_code == 200 and data:
+        entry = {"status": "ok", "data": data, "fetched_at": time.time()}
+        cache_set_json(_entry_key(agency_id), entry, AGENCY_CACHE_TTL + AGENCY_CACHE_STALE_TTL)
+    elif status_code == 404:
+        entry = {"status": "not_found", "data": None, "fetched_at": time.time()}
+        cache_set_json(_entry_key(agency_id), entry, AGENCY_CACHE_NEGATIVE_TTL)
+
+
+async def _refresh(agency_id, fetcher, lock_key):
+    try:
+        status_code, data = await fetcher(agency_id)
+        _store(agency_id, status_code, data)
+        logger.info(f"Refreshed stale agency cache entry for {agency_id} (status {status_code})")
+    except Exception as e:
+        logger.warning(f"Background refresh failed for agency {agency_id}: {e}")
+    finally:
+        release_lock(lock_key)
+
+
+def _schedule_refresh(agency_id, fetcher):
+    """Refresh a stale entry in the background; only one worker wins the lock"""
+    lock_key = f"{_entry_key(agency_id)}:refresh"
+    if not acquire_lock(lock_key, AGENCY_CACHE_REFRESH_LOCK_TTL):
+        return
+    task = asyncio.get_running_loop().create_task(_refresh(agency_id, fetcher, lock_key))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def _fetch_and_store(agency_id, fetcher):
+    status_code, data = await fetcher(agency_id)
+    _store(agency_id, status_code, data)
+    return data if status_code == 200 else None
+
+
+async def get_cached_agency(agency_id, fetcher):
+    """
+    Get an agency record through the shared cache
+
+    Args:
+        agency_id: Domain agency ID
+        fetcher: Coroutine function taking agency_id and returning
+                 (status_code, agency_details) from Domain
+
+    Returns:
+        Agency details dictionary or None
+    """
+    entry = cache_get_json(_entry_key(agency_id))
+
+    if entry:
+        age = time.time() - entry.get("fetched_at", 0)
+        if entry.get("status") == "not_found":
+            incr_stat(STATS_KEY, "negative_hits")
+            logger.info(f"Agency cache negative hit for {agency_id}")
+            return None
+        if age < AGENCY_CACHE_TTL:
+            incr_stat(STATS_KEY, "hits")
+            logger.info(f"Agency cache hit for {agency_id}")
+            return entry.get("data")
+        incr_stat(STATS_KEY, "stale_hits")
+        logger.info(f"Agency cache stale hit for {agency_id} (age {int(age)}s), revalidating")
+        _schedule_refresh(agency_id, fetcher)
+        return entry.get("data")
+
+    loop = asyncio.get_running_loop()
+    task = _inflight.get(agency_id)
+    if task is None or task.get_loop() is not loop:
+        incr_stat(STATS_KEY, "misses")
+        task = loop.create_task(_fetch_and_store(agency_id, fetcher))
+        _inflight[agency_id] = task
+        task.add_done_callback(lambda done: _inflight.pop(agency_id, None) if _inflight.get(agency_id) is done else None)
+    else:
+        incr_stat(STATS_KEY, "inflight_hits")
+        logger.info(f"Agency {agency_id} is already being fetched, waiting for that request")
+    # Shielded so a caller's timeout does not cancel the lookup other callers share
+    return await asyncio.shield(task)
+
+
+def get_agency_cache_stats():
+    """Return the hit/miss counters for the agency cache"""
+    return get_stats(STATS_KEY)
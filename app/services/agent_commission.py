@@ -1,10 +1,11 @@
 import os
 import requests
 import logging
-import json
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from supabase import create_client
+from .supabase_client import get_supabase
+from .commission_rates import get_state_rate_row
+from .area_types import resolve_area_type
 load_dotenv()
 # Domain.com.au API credentials
 DOMAIN_API_KEY = os.getenv("DOMAIN_API_KEY")
@@ -12,11 +13,6 @@ DOMAIN_API_SECRET = os.getenv("DOMAIN_API_SECRET")
 # Set up logging with more detailed configuration
 logger = logging.getLogger("articflow.domain.utils")
 
-def _get_supabase():
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    return create_client(url, key)
-
 # Maps normalized price range string -> (comm column, mkt column) in agent_subscriptions
 PRICE_RANGE_COL_MAP = {
     "Less than $500k": ("comm_less_500k",  "mkt_less_500k"),
@@ -86,102 +82,159 @@ def normalize_home_owner_pricing(home_owner_pricing):
     return home_owner_pricing
 
 
-def get_featured_agent_commission(agent_name, home_owner_pricing, suburb, state):
+# Lowest price in each range, used to turn a commission rate into a discount
+DISCOUNT_PRICE_FLOORS = {
+    "Less than $500k": 500000,
+    "$500k-$1m":       500000,
+    "$1m-$1.5m":       1000000,
+    "$1.5m-$2m":       1500000,
+    "$2m-$2.5m":       2000000,
+    "$2.5m-$3m":       2500000,
+    "$3m-$3.5m":       3000000,
+    "$3.5m-$4m":       3000000,
+    "$3m-$4m":         3000000,
+    "$4m-$6m":         4000000,
+    "$6m-$8m":         6000000,
+    "$8m-$10m":        8000000,
+    "$10m+":           10000000,
+}
+
+EMPTY_COMMISSION = {"commission_rate": "", "discount": "", "marketing": ""}
+
+
+def normalize_agent_name(agent_name):
+    """Key used to match agent names across Domain and agent_subscriptions"""
+    return (agent_name or "").strip().lower()
+
+
+def _calculate_discount(commission_rate, home_owner_pricing, agent_name=""):
     """
-    Get commission rates for a featured agent from Supabase agent_subscriptions table.
+    Calculate the homeowner discount for a commission rate string like "2.0% - 2.5%"
+
+    Returns:
+        Discount formatted as "$1,250", or "" if it cannot be calculated
+    """
+    if not commission_rate:
+        return ""
+    try:
+        lowest_rate = float(commission_rate.split("-")[0].strip().replace("%", ""))
+        lowest_price = DISCOUNT_PRICE_FLOORS.get(home_owner_pricing, 0)
+        if lowest_price > 0:
+            raw_discount    = lowest_price * (lowest_rate / 100) * 0.2 * 0.25
+            rounded_discount = round(raw_discount / 250) * 250
+            rounded_discount = max(500, min(10000, rounded_discount))
+            discount = f"${rounded_discount:,.0f}"
+            logger.info(f"Calculated discount for {agent_name}: {discount}")
+            return discount
+    except Exception as e:
+        logger.error(f"Error calculating discount: {str(e)}")
+    return ""
+
+
+def get_featured_agents_commission(agent_names, home_owner_pricing, suburb, state):
+    """
+    Get commission rates for several featured agents with a single Supabase query.
 
     Args:
-        agent_name: Name of the agent
+        agent_names: Names of the featured agents (as stored in agent_subscriptions)
         home_owner_pricing: Price range of the property
         suburb: Suburb name
         state: State code (e.g., NSW)
 
     Returns:
-        Dictionary containing commission_rate, discount, and marketing
+        Dictionary keyed by normalize_agent_name(name), each value containing
+        commission_rate, discount, and marketing
     """
+    names = list(dict.fromkeys(n.strip() for n in agent_names if n and n.strip()))
+    if not names:
+        return {}
+
     try:
         home_owner_pricing = normalize_home_owner_pricing(home_owner_pricing)
-        print(f"DEBUG - get_featured_agent_commission called with: agent_name='{agent_name}', home_owner_pricing='{home_owner_pricing}', suburb='{suburb}', state='{state}'")
+        print(f"DEBUG - get_featured_agents_commission called with: agent_names={names}, home_owner_pricing='{home_owner_pricing}', suburb='{suburb}', state='{state}'")
 
         if not home_owner_pricing:
             logger.warning("No home_owner_pricing provided")
-            return {"commission_rate": "", "discount": "", "marketing": ""}
+            return {normalize_agent_name(n): dict(EMPTY_COMMISSION) for n in names}
 
         col_pair = PRICE_RANGE_COL_MAP.get(home_owner_pricing)
         if not col_pair:
             logger.warning(f"Unknown price range '{home_owner_pricing}', falling back to standard rates")
-            return get_agent_commission(home_owner_pricing, state=state)
+            standard_values = get_agent_commission(home_owner_pricing, state=state)
+            return {normalize_agent_name(n): dict(standard_values) for n in names}
 
         comm_col, mkt_col = col_pair
 
-        # Query agent_subscriptions by name — state may be NULL (uniform rates) or per-state
-        sb = _get_supabase()
-        name_norm = agent_name.strip()
+        # One query for every agent — state may be NULL (uniform rates) or per-state
+        sb = get_supabase()
         rows = sb.table("agent_subscriptions").select(
             f"name,state,{comm_col},{mkt_col}"
-        ).ilike("name", name_norm).execute().data
+        ).in_("name", names).execute().data or []
 
-        print(f"DEBUG - Supabase returned {len(rows)} row(s) for agent '{name_norm}'")
+        print(f"DEBUG - Supabase returned {len(rows)} row(s) for {len(names)} featured agent(s)")
 
-        commission_rate = ""
-        marketing = ""
+        rows_by_name = {}
+        for row in rows:
+            rows_by_name.setdefault(normalize_agent_name(row.get("name")), []).append(row)
 
-        if rows:
-            state_upper = (state or "").strip().upper()
-            # Prefer a row matching the state, fall back to state=NULL (uniform rates)
-            state_match = next((r for r in rows if (r.get("state") or "").strip().upper() == state_upper), None)
-            best_row = state_match or rows[0]
-            commission_rate = best_row.get(comm_col) or ""
-            marketing       = best_row.get(mkt_col)  or ""
-            print(f"DEBUG - Found values from Supabase: commission_rate='{commission_rate}', marketing='{marketing}'")
+        state_upper = (state or "").strip().upper()
+        standard_values = None
+        results = {}
 
-        # Fall back to standard rates if either value is missing
-        if not commission_rate or not marketing:
-            logger.warning(f"No commission data for '{agent_name}' in Supabase, falling back to standard rates")
-            standard_values = get_agent_commission(home_owner_pricing, state=state)
-            if not commission_rate:
-                commission_rate = standard_values.get("commission_rate", "")
-            if not marketing:
-                marketing = standard_values.get("marketing", "")
-
-        # Calculate discount from commission_rate
-        discount = ""
-        if commission_rate:
-            try:
-                lowest_rate = float(commission_rate.split("-")[0].strip().replace("%", ""))
-                price_ranges = {
-                    "Less than $500k": 500000,
-                    "$500k-$1m":       500000,
-                    "$1m-$1.5m":       1000000,
-                    "$1.5m-$2m":       1500000,
-                    "$2m-$2.5m":       2000000,
-                    "$2.5m-$3m":       2500000,
-                    "$3m-$3.5m":       3000000,
-                    "$3.5m-$4m":       3000000,
-                    "$3m-$4m":         3000000,
-                    "$4m-$6m":         4000000,
-                    "$6m-$8m":         6000000,
-                    "$8m-$10m":        8000000,
-                    "$10m+":           10000000,
-                }
-                lowest_price = price_ranges.get(home_owner_pricing, 0)
-                if lowest_price > 0:
-                    raw_discount    = lowest_price * (lowest_rate / 100) * 0.2 * 0.25
-                    rounded_discount = round(raw_discount / 250) * 250
-                    rounded_discount = max(500, min(10000, rounded_discount))
-                    discount = f"${rounded_discount:,.0f}"
-                    logger.info(f"Calculated discount for {agent_name}: {discount}")
-            except Exception as e:
-                logger.error(f"Error calculating discount: {str(e)}")
-
-        result = {"commission_rate": commission_rate, "discount": discount, "marketing": marketing}
-        print(f"DEBUG - Returning result: {result}")
-        return result
+        for name in names:
+            key = normalize_agent_name(name)
+            commission_rate = ""
+            marketing = ""
+
+            agent_rows = rows_by_name.get(key)
+            if agent_rows:
+                # Prefer a row matching the state, fall back to state=NULL (uniform rates)
+                state_match = next((r for r in agent_rows if (r.get("state") or "").strip().upper() == state_upper), None)
+                best_row = state_match or agent_rows[0]
+                commission_rate = best_row.get(comm_col) or ""
+                marketing       = best_row.get(mkt_col)  or ""
+                print(f"DEBUG - Found values from Supabase for '{name}': commission_rate='{commission_rate}', marketing='{marketing}'")
+
+            # Fall back to standard rates if either value is missing (fetched once per batch)
+            if not commission_rate or not marketing:
+                logger.warning(f"No commission data for '{name}' in Supabase, falling back to standard rates")
+                if standard_values is None:
+                    standard_values = get_agent_commission(home_owner_pricing, state=state)
+                if not commission_rate:
+                    commission_rate = standard_values.get("commission_rate", "")
+                if not marketing:
+                    marketing = standard_values.get("marketing", "")
+
+            results[key] = {
+                "commission_rate": commission_rate,
+                "discount": _calculate_discount(commission_rate, home_owner_pricing, name),
+                "marketing": marketing,
+            }
+
+        print(f"DEBUG - Returning results: {results}")
+        return results
 
     except Exception as e:
-        logger.error(f"Error getting featured agent commission: {str(e)}")
-        print(f"DEBUG - Error getting featured agent commission: {str(e)}")
-        return {"commission_rate": "", "discount": "", "marketing": ""}
+        logger.error(f"Error getting featured agents commission: {str(e)}")
+        print(f"DEBUG - Error getting featured agents commission: {str(e)}")
+        return {normalize_agent_name(n): dict(EMPTY_COMMISSION) for n in names}
+
+
+def get_featured_agent_commission(agent_name, home_owner_pricing, suburb, state):
+    """
+    Get commission rates for a featured agent from Supabase agent_subscriptions table.
+
+    Args:
+        agent_name: Name of the agent
+        home_owner_pricing: Price range of the property
+        suburb: Suburb name
+        state: State code (e.g., NSW)
+
+    Returns:
+        Dictionary containing commission_rate, discount, and marketing
+    """
+    results = get_featured_agents_commission([agent_name], home_owner_pricing, suburb, state)
+    return results.get(normalize_agent_name(agent_name), dict(EMPTY_COMMISSION))
 
 def get_agent_commission(home_owner_pricing, area_type="suburb", state=None):
     """
@@ -205,67 +258,40 @@ def get_agent_commission(home_owner_pricing, area_type="suburb", state=None):
         # First try to get commission rates from the webhook if state code is provided
         if state and home_owner_pricing:
             # Debug: Attempting to fetch rates from webhook
-            print(f"DEBUG - Attempting to fetch rates from webhook for state '{state}' and price '{home_owner_pricing}'")
+            print(f"DEBUG - Looking up state rates for state '{state}' and price '{home_owner_pricing}'")
             
-            # Prepare the request parameters
-            params = {
-                "state_code": state,
-                "home_owner_pricing": home_owner_pricing
-            }
+            # State rate rows are cached (memory + Redis); no webhook call on a hit
+            commission_data = get_state_rate_row(state, home_owner_pricing)
             
-            # Make the API request
-            url = "https://hook.eu2.make.com/wrkwzgqpensv34xlw14mcuzzcu79ohs9"
-            try:
-                response = requests.get(url, params=params)
+            if commission_data:
+                # Map home_owner_pricing to the corresponding keys
+                commission_key = f"{home_owner_pricing} Commission"
+                marketing_key = f"{home_owner_pricing} Marketing"
+                
+                # Debug: Print the keys we're looking for
+                print(f"DEBUG - Looking for keys: commission_key='{commission_key}', marketing_key='{marketing_key}'")
+                
+                # Get the commission rate and marketing value for the specified price range
+                commission_rate = commission_data.get(commission_key, "")
+                marketing = commission_data.get(marketing_key, "")
                 
-                # Debug: Print response status
-                print(f"DEBUG - API response status: {response.status_code}")
+                # Debug: Print the values found
+                print(f"DEBUG - Found webhook values: commission_rate='{commission_rate}', marketing='{marketing}'")
                 
-                # Check if the request was successful
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Debug: Print raw response data
-                    print(f"DEBUG - API response data: {json.dumps(data, indent=2)}")
-                    
-                    # If we got data back
-                    if data and isinstance(data, list) and len(data) > 0:
-                        commission_data = data[0]
-                        
-                        # Map home_owner_pricing to the corresponding keys
-                        commission_key = f"{home_owner_pricing} Commission"
-                        marketing_key = f"{home_owner_pricing} Marketing"
-                        
-                        # Debug: Print the keys we're looking for
-                        print(f"DEBUG - Looking for keys: commission_key='{commission_key}', marketing_key='{marketing_key}'")
-                        
-                        # Get the commission rate and marketing value for the specified price range
-                        commission_rate = commission_data.get(commission_key, "")
-                        marketing = commission_data.get(marketing_key, "")
-                        
-                        # Debug: Print the values found
-                        print(f"DEBUG - Found webhook values: commission_rate='{commission_rate}', marketing='{marketing}'")
-                        
-                        # If both values are found, return them
-                        if commission_rate and marketing:
-                            logger.info(f"Using state-based rates from webhook for state {state}")
-                            print(f"DEBUG - Using state-based rates from webhook")
-                            return {
-                                "commission_rate": commission_rate,
-                                "marketing": marketing
-                            }
-                        else:
-                            logger.warning(f"Incomplete data from webhook for state {state}, price {home_owner_pricing}. Falling back to area-type based rates.")
-                            print(f"DEBUG - Incomplete data from webhook. Falling back to area-type based rates")
-                    else:
-                        logger.warning(f"No data from webhook for state {state}, price {home_owner_pricing}. Falling back to area-type based rates.")
-                        print(f"DEBUG - No data from webhook. Falling back to area-type based rates")
+                # If both values are found, return them
+                if commission_rate and marketing:
+                    logger.info(f"Using state-based rates from webhook for state {state}")
+                    print(f"DEBUG - Using state-based rates from webhook")
+                    return {
+                        "commission_rate": commission_rate,
+                        "marketing": marketing
+                    }
                 else:
-                    logger.error(f"API request failed with status code {response.status_code}: {response.text}")
-                    print(f"DEBUG - API request failed with status code {response.status_code}: {response.text}")
-            except Exception as e:
-                logger.error(f"Error fetching from webhook: {str(e)}")
-                print(f"DEBUG - Error fetching from webhook: {str(e)}")
+                    logger.warning(f"Incomplete data from webhook for state {state}, price {home_owner_pricing}. Falling back to area-type based rates.")
+                    print(f"DEBUG - Incomplete data from webhook. Falling back to area-type based rates")
+            else:
+                logger.warning(f"No data from webhook for state {state}, price {home_owner_pricing}. Falling back to area-type based rates.")
+                print(f"DEBUG - No data from webhook. Falling back to area-type based rates")
         
         # Fallback to area-type based rates
         print(f"DEBUG - Using fallback area-type based rates for area_type '{area_type}'")
@@ -395,17 +421,24 @@ def get_agent_commission(home_owner_pricing, area_type="suburb", state=None):
         logger.error(f"Error getting standard agent commission: {str(e)}")
         return {"commission_rate": "", "marketing": ""}
     
-def get_area_type(post_code, suburb):
+def get_area_type(post_code, suburb, state=None):
     """
-    Determine the area type (suburb, rural, inner_city) by making a request to Make.com webhook
+    Determine the area type (suburb, rural, inner_city) from au_suburbs,
+    falling back to the Make.com webhook for unclassified suburbs
     
     Args:
         post_code: The postal code of the area
         suburb: The suburb name
+        state: State code (optional, used when the postcode does not match)
         
     Returns:
         String representing the area type (suburb, rural, inner_city)
     """
+    area_type = resolve_area_type(suburb, state, post_code)
+    if area_type:
+        logger.info(f"Area type for {suburb} ({post_code}): {area_type} (au_suburbs)")
+        return area_type
+    
     try:
         # Prepare the request parameters
         params = {
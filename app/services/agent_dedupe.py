@@ -0,0 +1,185 @@
+"""
+Agent Deduplication
+Merges the per-agency agent records from get_agent_performance_metrics into
+one leaderboard entry per agent, and indexes agents by name for the
+featured-agent merge.
+
+Every step is a single pass over the agent list with hash lookups, so the
+cost stays linear when include_surrounding_suburbs pulls in thousands of
+listings. Standard library only.
+"""
+import re
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger("articflow.agent_dedupe")
+
+# Common real estate franchise names, in match priority order
+COMMON_FRANCHISES = [
+    "belle property", "ray white", "lj hooker", "century 21",
+    "mcgrath", "raine & horne", "first national", "harcourts"
+]
+
+_FRANCHISE_PRIORITY = {name: index for index, name in enumerate(COMMON_FRANCHISES)}
+# Lookahead so overlapping franchise names are all reported; the highest
+# priority match wins, same as checking the list in order
+_FRANCHISE_PATTERN = re.compile("(?=(" + "|".join(re.escape(name) for name in COMMON_FRANCHISES) + "))")
+
+
+def agent_name_key(agent_name):
+    """Key used to match agent names (case and surrounding whitespace ignored)"""
+    return (agent_name or "").strip().lower()
+
+
+@lru_cache(maxsize=8192)
+def canonical_agency(agency_name):
+    """
+    Normalize an agency name to its main agency so branches can be merged
+
+    "Agency Name - Location" becomes "agency name", names containing a known
+    franchise become the franchise name, and other multi-word names are cut
+    to their first two words.
+
+    Args:
+        agency_name: Agency name as returned by Domain
+
+    Returns:
+        Lowercase main agency name
+    """
+    agency_full = (agency_name or "").strip().lower()
+
+    # Handle hyphenated format: "Agency Name - Location"
+    if " - " in agency_full:
+        return agency_full.split(" - ")[0]
+
+    parts = agency_full.split()
+    if len(parts) <= 1:
+        return agency_full
+
+    matches = _FRANCHISE_PATTERN.findall(agency_full)
+    if matches:
+        return min(matches, key=_FRANCHISE_PRIORITY.__getitem__)
+
+    # No known franchise, use the first two words as the main agency name
+    return " ".join(parts[:2])
+
+
+def merge_branch_agents(branch_agents, main_agency):
+    """
+    Merge one agent's records from several branches of the same agency
+
+    Returns:
+        Copy of the first record with sales, joint sales, values and
+        properties summed, 'branches' listing every branch, and 'agency'
+        set to main_agency
+    """
+    merged_agent = branch_agents[0].copy()
+    merged_agent["branches"] = []
+
+    total_sales = 0
+    joint_sales = 0
+    total_value = 0
+    joint_sales_value = 0
+    all_properties = {}
+
+    for branch_agent in branch_agents:
+        merged_agent["branches"].append(branch_agent["agency"])
+        total_sales += branch_agent.get("total_sales", 0)
+        joint_sales += branch_agent.get("joint_sales", 0)
+        total_value += branch_agent.get("total_value", 0)
+        joint_sales_value += branch_agent.get("joint_sales_value", 0)
+        all_properties.update(branch_agent.get("properties", {}))
+
+    merged_agent["total_sales"] = total_sales
+    merged_agent["joint_sales"] = joint_sales
+    merged_agent["total_value"] = total_value
+    merged_agent["joint_sales_value"] = joint_sales_value
+    merged_agent["properties"] = all_properties
+    merged_agent["agency"] = main_agency
+    return merged_agent
+
+
+def dedupe_agents(agents_list):
+    """
+    Merge agents listed under several branches of the same agency
+
+    Agents are grouped by name, then by canonical agency; groups with more
+    than one record are merged with merge_branch_agents. Agents with the same
+    name at different agencies stay separate. Output order follows the first
+    appearance of each name, then of each agency within that name.
+
+    Args:
+        agents_list: Agent dictionaries with 'name' and 'agency' set
+
+    Returns:
+        Deduplicated list of agent dictionaries
+    """
+    # name -> canonical agency -> records, all in first-appearance order
+    groups = {}
+    for agent in agents_list:
+        by_agency = groups.setdefault(agent_name_key(agent["name"]), {})
+        by_agency.setdefault(canonical_agency(agent["agency"]), []).append(agent)
+
+    unique_agents = []
+    for by_agency in groups.values():
+        for main_agency, branch_agents in by_agency.items():
+            if len(branch_agents) == 1:
+                unique_agents.append(branch_agents[0])
+            else:
+                logger.debug(f"Merging {len(branch_agents)} branch records for {branch_agents[0]['name']} ({main_agency})")
+                unique_agents.append(merge_branch_agents(branch_agents, main_agency))
+    return unique_agents
+
+
+class AgentNameIndex:
+    """
+    Name -> first matching agent lookup over an agent list
+
+    Replaces a linear scan of the list per featured agent. Agents appended
+    through the index are indexed as well.
+    """
+
+    def __init__(self, agents_list):
+        self.agents_list = agents_list
+        self._positions = {}
+        for position, agent in enumerate(agents_list):
+            self._positions.setdefault(agent_name_key(agent["name"]), position)
+
+    def find(self, agent_name):
+        """Return the first agent with this name, or None"""
+        position = self._positions.get(agent_name_key(agent_name))
+        return None if position is None else self.agents_list[position]
+
+    def append(self, agent):
+        """Append an agent to the list and index it"""
+        self._positions.setdefault(agent_name_key(agent["name"]), len(self.agents_list))
+        self.agents_list.append(agent)
+
+
+def _prefer_agent(existing, agent):
+    """True if agent should replace existing (featured first, then more sales)"""
+    if agent.get("featured", False) != existing.get("featured", False):
+        return agent.get("featured", False)
+    return agent.get("total_sales", 0) > existing.get("total_sales", 0)
+
+
+def dedupe_agents_by_name(agents_list):
+    """
+    Keep one record per agent name
+
+    A featured record beats a non-featured one; otherwise the record with
+    more total sales wins (the earlier record on ties).
+
+    Returns:
+        Deduplicated list in first-appearance order of each name
+    """
+    unique_agents = {}
+    for agent in agents_list:
+        key = agent_name_key(agent["name"])
+        existing = unique_agents.get(key)
+        if existing is None:
+            unique_agents[key] = agent
+        elif _prefer_agent(existing, agent):
+            logger.debug(f"Duplicate agent {agent['name']}: keeping later record")
+            unique_agents[key] = agent
+    return list(unique_agents.values())
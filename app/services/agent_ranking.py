@@ -0,0 +1,77 @@
+"""
+Agent Ranking
+Top-K selection for agent and agency leaderboards.
+
+heapq.nlargest keeps only K candidates, so ranking costs O(n log K) instead
+of a full sort. Ties keep their input order, same as a stable descending
+sort.
+"""
+import os
+import heapq
+import logging
+
+logger = logging.getLogger("articflow.agent_ranking")
+
+# Number of agents shown on an agents report
+TOP_AGENTS_COUNT = int(os.getenv("TOP_AGENTS_COUNT", "5"))
+
+
+def _total_sales(agent):
+    return agent["total_sales"]
+
+
+def top_k(items, k, key):
+    """
+    Return the k items with the largest key, best first
+
+    Equivalent to sorted(items, key=key, reverse=True)[:k].
+    """
+    if k <= 0:
+        return []
+    return heapq.nlargest(k, items, key=key)
+
+
+def top_agent(agents, key=_total_sales):
+    """Return the highest ranked agent (first one on ties), or None"""
+    best = top_k(agents, 1, key)
+    return best[0] if best else None
+
+
+def select_top_agents(agents_list, k=None):
+    """
+    Pick the agents shown on a report, in priority tiers
+
+    Every featured agent comes first (in list order), then standard
+    subscription agents, then regular agents, each tier ranked by total
+    sales, until k agents are selected.
+
+    Args:
+        agents_list: Deduplicated agents with 'featured' and optional 'standard_subscription' set
+        k: Number of agents to show (default TOP_AGENTS_COUNT)
+
+    Returns:
+        Tuple of (top agents list, tier counts dictionary)
+    """
+    k = TOP_AGENTS_COUNT if k is None else k
+
+    featured_agents = []
+    std_sub_agents = []
+    regular_agents = []
+    for agent in agents_list:
+        if agent["featured"]:
+            featured_agents.append(agent)
+        elif agent.get("standard_subscription", False):
+            std_sub_agents.append(agent)
+        else:
+            regular_agents.append(agent)
+
+    top_agents = list(featured_agents)
+    top_agents.extend(top_k(std_sub_agents, k - len(top_agents), _total_sales))
+    top_agents.extend(top_k(regular_agents, k - len(top_agents), _total_sales))
+
+    tier_counts = {
+        "featured": len(featured_agents),
+        "standard_subscription": len(std_sub_agents),
+        "regular": len(regular_agents),
+    }
+    return top_agents, tier_counts
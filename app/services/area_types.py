@@ -0,0 +1,106 @@
+"""
+Suburb Area Types
+Resolves a suburb's commission sheet / area type from au_suburbs.commission_sheet
+(supabase/migrations/add-au-suburbs-commission-sheet.sql), held in worker memory.
+
+Commission sheet numbers are shared by the sales and leasing flows:
+    1 = inner_city, 2 = suburb, 3 = rural
+"""
+import os
+import time
+import logging
+
+from .supabase_client import get_supabase
+
+logger = logging.getLogger("articflow.area_types")
+
+COMMISSION_SHEET_AREA_TYPES = {
+    "1": "inner_city",
+    "2": "suburb",
+    "3": "rural",
+}
+
+# Reload interval; the classification is effectively static
+AREA_TYPES_RELOAD_INTERVAL = int(os.getenv("AREA_TYPES_RELOAD_INTERVAL", str(24 * 3600)))
+AREA_TYPES_PAGE_SIZE = 1000
+
+# (SUBURB, STATE) -> sheet and (SUBURB, POSTCODE) -> sheet; the sales flow
+# only knows suburb + postcode, the leasing flow knows all three
+_by_suburb_state = None
+_by_suburb_postcode = None
+_loaded_at = 0.0
+
+
+def _normalise(value):
+    return str(value or "").strip().upper()
+
+
+def load_area_types():
+    """
+    Load every classified au_suburbs row into memory
+
+    Returns:
+        Number of classified suburb rows loaded, or None if loading failed
+    """
+    global _by_suburb_state, _by_suburb_postcode, _loaded_at
+
+    try:
+        sb = get_supabase()
+        by_suburb_state = {}
+        by_suburb_postcode = {}
+        start = 0
+        while True:
+            page = sb.table("au_suburbs").select("suburb,state,postcode,commission_sheet").not_.is_(
+                "commission_sheet", "null"
+            ).range(start, start + AREA_TYPES_PAGE_SIZE - 1).execute().data or []
+            for row in page:
+                sheet = str(row["commission_sheet"])
+                suburb = _normalise(row.get("suburb"))
+                by_suburb_state.setdefault((suburb, _normalise(row.get("state"))), sheet)
+                by_suburb_postcode.setdefault((suburb, _normalise(row.get("postcode")).zfill(4)), sheet)
+            if len(page) < AREA_TYPES_PAGE_SIZE:
+                break
+            start += AREA_TYPES_PAGE_SIZE
+    except Exception as e:
+        logger.error(f"Failed to load area types from au_suburbs: {e}")
+        # Retry on the next lookup; keep whatever was loaded before
+        _loaded_at = time.monotonic() - AREA_TYPES_RELOAD_INTERVAL + 60
+        return None
+
+    _by_suburb_state = by_suburb_state
+    _by_suburb_postcode = by_suburb_postcode
+    _loaded_at = time.monotonic()
+    logger.info(f"Loaded area types for {len(by_suburb_postcode)} suburb/postcode pairs")
+    return len(by_suburb_postcode)
+
+
+def resolve_commission_sheet(suburb, state=None, post_code=None):
+    """
+    Look up a suburb's commission sheet number
+
+    Args:
+        suburb: Suburb name
+        state: State code (optional)
+        post_code: Post code (optional)
+
+    Returns:
+        "1", "2" or "3", or None if the suburb is not classified
+    """
+    if _by_suburb_postcode is None or time.monotonic() - _loaded_at > AREA_TYPES_RELOAD_INTERVAL:
+        load_area_types()
+    if _by_suburb_postcode is None:
+        return None
+
+    suburb = _normalise(suburb)
+    if post_code:
+        sheet = _by_suburb_postcode.get((suburb, _normalise(post_code).zfill(4)))
+        if sheet:
+            return sheet
+    if state:
+        return _by_suburb_state.get((suburb, _normalise(state)))
+    return None
+
+
+def resolve_area_type(suburb, state=None, post_code=None):
+    """Area type name (inner_city, suburb, rural) for a suburb, or None if not classified"""
+    return COMMISSION_SHEET_AREA_TYPES.get(resolve_commission_sheet(suburb, state, post_code))
@@ -0,0 +1,138 @@
+"""
+Redis Cache Helpers
+Shared Redis connection and JSON helpers used by the service-level caches.
+Every helper degrades to a cache miss when Redis is unavailable so reports
+still generate (just without caching).
+"""
+import os
+import json
+import time
+import zlib
+import logging
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("articflow.cache")
+
+# Same Redis instance RQ uses for the job queue
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+_redis = None
+
+
+def get_redis():
+    """Get the process-wide Redis client (redis-py pools connections internally)"""
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(REDIS_URL)
+    return _redis
+
+
+def cache_get_json(key):
+    """Return the decoded JSON value stored at key, or None on miss/error"""
+    try:
+        raw = get_redis().get(key)
+    except Exception as e:
+        logger.warning(f"Redis GET failed for {key}: {e}")
+        return None
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        logger.warning(f"Discarding undecodable cache entry {key}")
+        return None
+
+
+def cache_set_json(key, value, ttl):
+    """Store value as JSON at key with a TTL in seconds. Returns True on success."""
+    try:
+        get_redis().set(key, json.dumps(value), ex=max(1, int(ttl)))
+        return True
+    except Exception as e:
+        logger.warning(f"Redis SET failed for {key}: {e}")
+        return False
+
+
+def cache_get_compressed_json(key):
+    """Return the value stored by cache_set_compressed_json, or None on miss/error"""
+    try:
+        raw = get_redis().get(key)
+    except Exception as e:
+        logger.warning(f"Redis GET failed for {key}: {e}")
+        return None
+    if raw is None:
+        return None
+    try:
+        return json.loads(zlib.decompress(raw))
+    except (zlib.error, ValueError):
+        logger.warning(f"Discarding undecodable cache entry {key}")
+        return None
+
+
+def cache_set_compressed_json(key, value, ttl):
+    """Store value as zlib-compressed JSON at key with a TTL in seconds"""
+    try:
+        payload = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        get_redis().set(key, payload, ex=max(1, int(ttl)))
+        return True
+    except Exception as e:
+        logger.warning(f"Redis SET failed for {key}: {e}")
+        return False
+
+
+def acquire_lock(key, ttl):
+    """Best-effort SET NX lock. Returns True if this process now holds it."""
+    try:
+        return bool(get_redis().set(key, "1", nx=True, ex=max(1, int(ttl))))
+    except Exception as e:
+        logger.warning(f"Redis lock failed for {key}: {e}")
+        return False
+
+
+def release_lock(key):
+    """Release a lock taken with acquire_lock"""
+    try:
+        get_redis().delete(key)
+    except Exception as e:
+        logger.warning(f"Redis lock release failed for {key}: {e}")
+
+
+def incr_stat(stats_key, field, amount=1):
+    """Increment a counter in the hash stats_key (hit/miss counters)"""
+    try:
+        get_redis().hincrby(stats_key, field, amount)
+    except Exception as e:
+        logger.debug(f"Redis HINCRBY failed for {stats_key}.{field}: {e}")
+
+
+def prune_cache_dir(directory, max_age):
+    """Delete files in a file cache directory older than max_age seconds"""
+    removed = 0
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    if removed:
+        logger.info(f"Pruned {removed} expired files from {directory}")
+    return removed
+
+
+def get_stats(stats_key):
+    """Return the counters in stats_key as a dict of ints"""
+    try:
+        data = get_redis().hgetall(stats_key)
+    except Exception as e:
+        logger.warning(f"Redis HGETALL failed for {stats_key}: {e}")
+        return {}
+    return {k.decode(): int(v) for k, v in data.items()}
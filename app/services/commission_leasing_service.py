@@ -7,6 +7,8 @@ import requests
 from pathlib import Path
 from typing import Optional, Tuple
 
+from .area_types import resolve_commission_sheet
+
 logger = logging.getLogger(__name__)
 
 WEBHOOK_URL = "https://n8n.srv1165267.hstgr.cloud/webhook/property-area-type"
@@ -87,7 +89,8 @@ def call_area_type_webhook(suburb: str, state: str, post_code: str) -> Optional[
 
 def get_commission_sheet_with_retry(suburb: str, state: str, post_code: str) -> str:
     """
-    Get commission sheet number with retry logic
+    Get commission sheet number from au_suburbs, falling back to the
+    webhook (with one retry) for unclassified suburbs
     
     Args:
         suburb: Suburb name
@@ -98,6 +101,12 @@ def get_commission_sheet_with_retry(suburb: str, state: str, post_code: str) ->
         Commission sheet number as string ("1", "2", or "3")
         Defaults to "1" if all attempts fail
     """
+    # Classified suburbs are answered from au_suburbs without a webhook call
+    commission_sheet = resolve_commission_sheet(suburb, state, post_code)
+    if commission_sheet is not None:
+        logger.info(f"Got commission sheet from au_suburbs: {commission_sheet}")
+        return commission_sheet
+    
     # First attempt
     commission_sheet = call_area_type_webhook(suburb, state, post_code)
     
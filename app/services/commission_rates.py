@@ -0,0 +1,130 @@
+"""
+Standard Commission Rate Cache
+Per-state standard commission/marketing rate rows from the Make.com rates
+webhook, cached in Redis (shared by all workers) and in worker memory.
+
+Each webhook response row carries every price band for a state
+("<band> Commission" / "<band> Marketing" columns), so the whole
+state x price-band matrix is at most one webhook call per state per TTL.
+"""
+import os
+import time
+import logging
+import requests
+
+from .cache import cache_get_json, cache_set_json
+
+logger = logging.getLogger("articflow.commission_rates")
+
+COMMISSION_RATES_WEBHOOK_URL = "https://hook.eu2.make.com/wrkwzgqpensv34xlw14mcuzzcu79ohs9"
+COMMISSION_RATES_TTL = int(os.getenv("COMMISSION_RATES_TTL", str(12 * 3600)))
+# Workers re-read Redis after this long, so a manual refresh reaches every worker
+COMMISSION_RATES_MEMORY_TTL = int(os.getenv("COMMISSION_RATES_MEMORY_TTL", "600"))
+COMMISSION_RATES_TIMEOUT = float(os.getenv("COMMISSION_RATES_TIMEOUT", "15"))
+
+AU_STATES = ["NSW", "VIC", "QLD", "WA", "SA", "TAS", "ACT", "NT"]
+# Any band works for the lookup; the response row holds every band
+DEFAULT_LOOKUP_PRICING = "$500k-$1m"
+
+KEY_PREFIX = "commission_rates"
+
+# state -> (loaded_at, rate row)
+_rows = {}
+
+
+def _entry_key(state):
+    return f"{KEY_PREFIX}:{state}"
+
+
+def _fetch_state_row(state, home_owner_pricing):
+    """
+    Fetch the rate row for a state from the webhook
+
+    Returns:
+        Rate row dictionary ({} when the webhook has no row), or None on failure
+    """
+    params = {
+        "state_code": state,
+        "home_owner_pricing": home_owner_pricing or DEFAULT_LOOKUP_PRICING
+    }
+    try:
+        response = requests.get(COMMISSION_RATES_WEBHOOK_URL, params=params, timeout=COMMISSION_RATES_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error fetching commission rates for {state}: {str(e)}")
+        return None
+
+    if response.status_code != 200:
+        logger.error(f"Commission rates request for {state} failed with status code {response.status_code}: {response.text}")
+        return None
+
+    try:
+        data = response.json()
+    except ValueError:
+        logger.error(f"Commission rates response for {state} was not JSON: {response.text}")
+        return None
+
+    if data and isinstance(data, list) and isinstance(data[0], dict):
+        return data[0]
+    logger.warning(f"No commission rate row returned for state {state}")
+    return {}
+
+
+def _remember(state, row):
+    _rows[state] = (time.monotonic(), row)
+
+
+def get_state_rate_row(state, home_owner_pricing=None):
+    """
+    Get the standard rate row for a state (memory, then Redis, then webhook)
+
+    Args:
+        state: State code (e.g., NSW)
+        home_owner_pricing: Price band for the webhook lookup on a cache miss
+
+    Returns:
+        Rate row dictionary (possibly empty), or None if it could not be fetched
+    """
+    state = (state or "").strip().upper()
+    if not state:
+        return None
+
+    entry = _rows.get(state)
+    if entry and time.monotonic() - entry[0] < COMMISSION_RATES_MEMORY_TTL:
+        return entry[1]
+
+    row = cache_get_json(_entry_key(state))
+    if row is not None:
+        _remember(state, row)
+        return row
+
+    row = _fetch_state_row(state, home_owner_pricing)
+    if row is None:
+        # Serve the expired in-memory row rather than nothing
+        return entry[1] if entry else None
+
+    cache_set_json(_entry_key(state), row, COMMISSION_RATES_TTL)
+    _remember(state, row)
+    logger.info(f"Cached commission rate row for {state}")
+    return row
+
+
+def refresh_commission_rates(states=None):
+    """
+    Re-fetch the rate rows for the given states (all states by default)
+
+    Returns:
+        Dictionary of state -> True if refreshed, False if the fetch failed
+    """
+    results = {}
+    for state in states or AU_STATES:
+        state = state.strip().upper()
+        row = _fetch_state_row(state, None)
+        if row is None:
+            results[state] = False
+            continue
+        cache_set_json(_entry_key(state), row, COMMISSION_RATES_TTL)
+        _remember(state, row)
+        results[state] = True
+    logger.info(f"Refreshed commission rates: {results}")
+    return results
+
@@ -1,9 +1,13 @@
 import logging
-import requests
 from datetime import datetime, timedelta
 import os
 from typing import Dict, List, Optional, Any
 
+from .http_client import get_domain_client
+from .domain_utils import get_agency_details
+from .listings_cache import get_cached_listings, set_cached_listings
+from .agent_ranking import top_k
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -25,7 +29,8 @@ async def search_rental_listings_by_suburb(
     region=None,
     area=None,
     min_land_area=None,
-    max_land_area=None
+    max_land_area=None,
+    use_cache=True
 ):
     """
     Search for rental listings in a specific suburb using Domain.com.au API
@@ -46,6 +51,7 @@ async def search_rental_listings_by_suburb(
         area: The area to filter by
         min_land_area: Minimum land area in square meters
         max_land_area: Maximum land area in square meters
+        use_cache: Read from the listings cache (False still refreshes it)
         
     Returns:
         List of listings matching the criteria
@@ -113,35 +119,39 @@ async def search_rental_listings_by_suburb(
     }
     
     try:
-        # Make the API request
-        response = requests.post(url, headers=headers, json=payload)
-        
-        # Check if the request was successful
-        if response.status_code == 200:
-            listings = response.json()
-            logger.info(f"Found {len(listings)} rental listings in {suburb}")
-            print(f"Found {len(listings)} rental listings in {suburb}, {state}")  # Add this print statement
+        listings = get_cached_listings(payload) if use_cache else None
+        if listings is None:
+            # Make the API request over the shared connection pool
+            response = await get_domain_client().post(url, headers=headers, json=payload)
             
-            # Filter listings by user's requested property types if specified
-            if user_requested_property_types:
-                filtered_listings = []
-                for listing in listings:
-                    if ("listing" in listing and 
-                        "propertyDetails" in listing["listing"] and 
-                        "propertyType" in listing["listing"]["propertyDetails"]):
-                        
-                        property_type = listing["listing"]["propertyDetails"]["propertyType"]
-                        if property_type in user_requested_property_types:
-                            filtered_listings.append(listing)
-                
-                logger.info(f"Filtered to {len(filtered_listings)} listings matching requested property types")
-                return filtered_listings
+            # Check if the request was successful
+            if response.status_code != 200:
+                logger.error(f"API request failed with status code {response.status_code}: {response.text}")
+                return None
             
-            # Return all listings if no property type filter was specified
-            return listings
-        else:
-            logger.error(f"API request failed with status code {response.status_code}: {response.text}")
-            return None
+            listings = response.json()
+            set_cached_listings(payload, listings)
+        
+        logger.info(f"Found {len(listings)} rental listings in {suburb}")
+        print(f"Found {len(listings)} rental listings in {suburb}, {state}")  # Add this print statement
+        
+        # Filter listings by user's requested property types if specified
+        if user_requested_property_types:
+            filtered_listings = []
+            for listing in listings:
+                if ("listing" in listing and 
+                    "propertyDetails" in listing["listing"] and 
+                    "propertyType" in listing["listing"]["propertyDetails"]):
+                    
+                    property_type = listing["listing"]["propertyDetails"]["propertyType"]
+                    if property_type in user_requested_property_types:
+                        filtered_listings.append(listing)
+            
+            logger.info(f"Filtered to {len(filtered_listings)} listings matching requested property types")
+            return filtered_listings
+        
+        # Return all listings if no property type filter was specified
+        return listings
     except Exception as e:
         logger.error(f"Error searching for rental listings: {str(e)}")
         return None
@@ -150,6 +160,9 @@ async def fetch_agency_address(agency_id):
     """
     Fetch agency details including address from Domain.com.au API
     
+    Uses the shared agency details cache, so the record is only requested
+    from Domain when no worker has fetched it recently.
+    
     Args:
         agency_id: The ID of the agency to fetch details for
         
@@ -162,23 +175,10 @@ async def fetch_agency_address(agency_id):
     
     logger.info(f"Fetching agency details for agency ID: {agency_id}")
     
-    # API endpoint
-    url = f"https://api.domain.com.au/v1/agencies/{agency_id}"
-    
-    # Headers with API key
-    headers = {
-        "X-Api-Key": DOMAIN_API_KEY,
-        "Content-Type": "application/json"
-    }
-    
     try:
-        # Make the API request
-        response = requests.get(url, headers=headers)
+        agency_data = await get_agency_details(agency_id)
         
-        # Check if the request was successful
-        if response.status_code == 200:
-            agency_data = response.json()
-            
+        if agency_data:
             # Extract address components
             details = agency_data.get("details", {})
             street_address1 = details.get("streetAddress1", "")
@@ -205,20 +205,21 @@ async def fetch_agency_address(agency_id):
             logger.info(f"Successfully fetched address for agency {agency_id}: {full_address}")
             return full_address
         else:
-            logger.error(f"API request failed with status code {response.status_code}: {response.text}")
+            logger.error(f"Failed to fetch agency details for agency ID: {agency_id}")
             return None
     except Exception as e:
         logger.error(f"Error fetching agency details: {str(e)}")
         return None
 
 # Now update the process_agency_rental_data function to use real addresses for top agencies
-async def process_agency_rental_data(suburb, state="NSW"):
+async def process_agency_rental_data(suburb, state="NSW", use_cache=True):
     """
     Process rental listings data to create a dictionary of agencies and their rental properties
     
     Args:
         suburb: The suburb to analyze
         state: The state (default: NSW)
+        use_cache: Read rental search results from the listings cache
         
     Returns:
         Dictionary with agencies and their rental statistics
@@ -226,7 +227,7 @@ async def process_agency_rental_data(suburb, state="NSW"):
     logger.info(f"Processing agency rental data for {suburb}, {state}")
     
     # Step 1: Get rental listings for the suburb
-    listings = await search_rental_listings_by_suburb(suburb, state)
+    listings = await search_rental_listings_by_suburb(suburb, state, use_cache=use_cache)
     if not listings:
         logger.error(f"No rental listings found for {suburb}")
         return {}
@@ -285,7 +286,7 @@ async def process_agency_rental_data(suburb, state="NSW"):
     
     return agency_counts
 
-async def get_top_rental_agencies(suburb, state="NSW", limit=5):
+async def get_top_rental_agencies(suburb, state="NSW", limit=5, use_cache=True):
     """
     Get the top rental agencies in a suburb based on the number of listings
     
@@ -293,19 +294,16 @@ async def get_top_rental_agencies(suburb, state="NSW", limit=5):
         suburb: The suburb to analyze
         state: The state (default: NSW)
         limit: Maximum number of agencies to return (default: 5)
+        use_cache: Read rental search results from the listings cache
         
     Returns:
         List of top agencies with their metrics
     """
     # Get all agency data
-    agency_counts = await process_agency_rental_data(suburb, state)
-    
-    # Convert to list and sort by count in descending order
-    agencies_list = list(agency_counts.values())
-    agencies_list.sort(key=lambda x: x["count"], reverse=True)
+    agency_counts = await process_agency_rental_data(suburb, state, use_cache=use_cache)
     
-    # Get the top N agencies
-    top_agencies = agencies_list[:limit]
+    # Get the top N agencies by listing count
+    top_agencies = top_k(agency_counts.values(), limit, key=lambda x: x["count"])
     
     # Fetch real addresses for top agencies
     for agency in top_agencies:
@@ -346,7 +344,8 @@ async def fetch_rented_property_data(
     region=None,
     area=None,
     min_land_area=None,
-    max_land_area=None
+    max_land_area=None,
+    bypass_cache=False
 ):
     """
     Fetch rental property data from Domain.com.au API
@@ -369,6 +368,7 @@ async def fetch_rented_property_data(
         area: The area to filter by
         min_land_area: Minimum land area in square meters
         max_land_area: Maximum land area in square meters
+        bypass_cache: Skip the cached Domain search results
         
     Returns:
         Dictionary with agency data and metrics
@@ -376,7 +376,7 @@ async def fetch_rented_property_data(
     logger.info(f"Fetching rental property data for job {job_id}, suburb={suburb}")
     
     # Get top rental agencies with all filter parameters
-    top_agencies = await get_top_rental_agencies(suburb, state)
+    top_agencies = await get_top_rental_agencies(suburb, state, use_cache=not bypass_cache)
     
     # Verify each agency has an address before creating the result
     for agency in top_agencies:
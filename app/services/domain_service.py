@@ -1,15 +1,21 @@
 import os
-import requests
 from dotenv import load_dotenv
 import logging
 import asyncio
 import json
+from datetime import datetime, timedelta
 from .domain_utils import (
-    format_price, check_featured_agent, check_standard_subscription,
-    get_mock_property_data, get_listing_details, get_agency_details,get_agent_details
+    format_price, check_featured_agent, check_standard_subscriptions_bulk,
+    get_mock_property_data, get_listing_details, get_agency_details_bulk, get_agent_details
 )
+from .http_client import get_domain_client
+from .listings_cache import get_cached_listings, set_cached_listings
+from .leaderboards import uses_default_filters, get_leaderboard_snapshot
+from .agent_dedupe import dedupe_agents, dedupe_agents_by_name, AgentNameIndex
+from .agent_ranking import select_top_agents, top_agent
+from .listing_aggregation import use_frame_aggregation, ListingFrameAggregator
 from .agent_commission import (
- get_featured_agent_commission, get_agent_commission ,get_area_type
+ get_featured_agents_commission, get_agent_commission ,get_area_type, normalize_agent_name, EMPTY_COMMISSION
 )
 load_dotenv()
 
@@ -17,6 +23,11 @@ load_dotenv()
 DOMAIN_API_KEY = os.getenv("DOMAIN_API_KEY")
 DOMAIN_API_SECRET = os.getenv("DOMAIN_API_SECRET")
 
+# Sold-listing search paging budget
+DOMAIN_SEARCH_PAGE_SIZE = 100
+DOMAIN_SEARCH_MAX_PAGES = int(os.getenv("DOMAIN_SEARCH_MAX_PAGES", "10"))
+DOMAIN_SEARCH_MAX_LISTINGS = int(os.getenv("DOMAIN_SEARCH_MAX_LISTINGS", "1000"))
+
 # Set up logging with more detailed configuration
 logger = logging.getLogger("articflow.domain")
 
@@ -58,6 +69,56 @@ if __name__ == "__main__":
     )
     logger.info("Running domain_service.py as main script")
 
+async def _apply_standard_subscriptions(agents_list, suburb, state):
+    """
+    Set agent['standard_subscription'] for every non-featured agent
+    
+    All agents are checked in one bounded-concurrency batch instead of one
+    webhook call at a time.
+    """
+    non_featured = [agent for agent in agents_list if not agent['featured']]
+    statuses = await check_standard_subscriptions_bulk([agent['name'] for agent in non_featured], suburb, state)
+    for agent in non_featured:
+        agent['standard_subscription'] = statuses.get(agent['name'], False)
+        if agent['standard_subscription']:
+            logger.info(f"Agent {agent['name']} has standard subscription")
+
+def build_agent_leaderboard(agencies_data):
+    """
+    Flatten get_agent_performance_metrics output into a deduplicated agent list
+    
+    Agents appearing under several branches of the same agency are merged
+    (sales, joint sales, values and properties summed).
+    
+    Args:
+        agencies_data: Dictionary of agencies with their agents
+        
+    Returns:
+        List of agent dictionaries with agency name and logo attached
+    """
+    # Convert the nested dictionary structure to a flat list of agents for display
+    agents_list = []
+    for agency_id, agency_data in agencies_data.items():
+        agency_name = agency_data['name']
+        agency_logo = agency_data.get('logo', 'N/A')
+        
+        for agent_id, agent_data in agency_data['agents'].items():
+            if agent_data['total_sales'] > 0:  # Only include agents with sales
+                # Add agency info to the agent data
+                agent_data['agency'] = agency_name
+                agent_data['agency_logo'] = agency_logo
+                agents_list.append(agent_data)
+    
+    # Merge agents listed under several branches of the same agency
+    print("\n===== AGENT DEDUPLICATION PROCESS =====")
+    print(f"Total agents before deduplication: {len(agents_list)}")
+    unique_agents = dedupe_agents(agents_list)
+    
+    print("\n===== DEDUPLICATION SUMMARY =====")
+    print(f"Reduced {len(agents_list)} agents to {len(unique_agents)} unique agents")
+    
+    return unique_agents
+
 async def fetch_property_data(
     property_id, 
     agent_id=None, 
@@ -78,7 +139,8 @@ async def fetch_property_data(
     area=None,
     min_land_area: int = None,  # Added parameter
     max_land_area: int = None ,
-    home_owner_pricing=None
+    home_owner_pricing=None,
+    bypass_cache=False
 ):
     """
     Fetch property data from Domain.com.au API
@@ -101,17 +163,16 @@ async def fetch_property_data(
         post_code: The post code to filter by
         region: The region to filter by
         area: The area to filter by
+        bypass_cache: Skip the cached Domain search results
         
     Returns:
         Dictionary with property data
     """
     logger.info(f"Fetching top agents for suburb={suburb}, state={state}")
     
-    # Get top agents for the suburb
-    logger.info(f"Getting top agents for {suburb}, {state}")
-    agencies_data = await get_agent_performance_metrics(
-        suburb, 
-        state, 
+    # Default-filter reports for warm suburbs render from the precomputed leaderboard
+    snapshot = None
+    if not bypass_cache and uses_default_filters(
         property_types=property_types,
         min_bedrooms=min_bedrooms,
         max_bedrooms=max_bedrooms,
@@ -120,157 +181,40 @@ async def fetch_property_data(
         min_carspaces=min_carspaces,
         max_carspaces=max_carspaces,
         include_surrounding_suburbs=include_surrounding_suburbs,
-        post_code=post_code,
         region=region,
         area=area,
-        min_land_area=min_land_area,  # Added parameter
-        max_land_area=max_land_area   # Added parameter
-    )
-    
-    
-    # Convert the nested dictionary structure to a flat list of agents for display
-    agents_list = []
-    for agency_id, agency_data in agencies_data.items():
-        agency_name = agency_data['name']
-        agency_logo = agency_data.get('logo', 'N/A')
-        
-        for agent_id, agent_data in agency_data['agents'].items():
-            if agent_data['total_sales'] > 0:  # Only include agents with sales
-                # Add agency info to the agent data
-                agent_data['agency'] = agency_name
-                agent_data['agency_logo'] = agency_logo
-                agents_list.append(agent_data)
-    
-    # Handle duplicate agents - keep only the record with the most complete data
-    print("\n===== AGENT DEDUPLICATION PROCESS =====")
-    print(f"Total agents before deduplication: {len(agents_list)}")
-    unique_agents = {}
+        min_land_area=min_land_area,
+        max_land_area=max_land_area
+    ):
+        snapshot = get_leaderboard_snapshot(suburb, state, post_code)
     
-    # First pass: Group agents by name only to identify potential duplicates across branches
-    agents_by_name = {}
-    for agent in agents_list:
-        agent_name = agent['name'].strip().lower()
-        if agent_name not in agents_by_name:
-            agents_by_name[agent_name] = []
-        agents_by_name[agent_name].append(agent)
-    
-    # Second pass: Process each agent name group
-    for agent_name, agent_group in agents_by_name.items():
-        print(f"\nProcessing agent group: {agent_name} ({len(agent_group)} occurrences)")
-        
-        # If only one occurrence, add directly
-        if len(agent_group) == 1:
-            agent = agent_group[0]
-            agency_name = agent['agency'].strip().lower()
-            agent_key = f"{agent_name}_{agency_name}"
-            print(f"  Single occurrence - Adding agent: {agent['name']} from {agent['agency']}")
-            print(f"  Agent key: '{agent_key}'")
-            unique_agents[agent_key] = agent
-            continue
-        
-        # Improved agency name normalization to handle different office formats
-        normalized_agencies = {}
-        for a in agent_group:
-            agency_full = a['agency'].strip().lower()
-            
-            # Handle hyphenated format: "Agency Name - Location"
-            if ' - ' in agency_full:
-                main_agency = agency_full.split(' - ')[0]
-            else:
-                # Handle space-separated format: "Agency Name Location"
-                # Try to identify common agency names
-                parts = agency_full.split()
-                if len(parts) > 1:
-                    # For agencies like "Belle Property Dee Why", extract "Belle Property"
-                    # Common real estate franchise patterns
-                    common_franchises = ["belle property", "ray white", "lj hooker", "century 21", 
-                                        "mcgrath", "raine & horne", "first national", "harcourts"]
-                    
-                    # Check if any common franchise name is in the agency name
-                    found_franchise = False
-                    for franchise in common_franchises:
-                        if franchise in agency_full:
-                            main_agency = franchise
-                            found_franchise = True
-                            break
-                    
-                    # If no known franchise, use first two words as the main agency name
-                    if not found_franchise:
-                        main_agency = " ".join(parts[:2])
-                else:
-                    main_agency = agency_full
-            
-            # Store the normalized agency name
-            if main_agency not in normalized_agencies:
-                normalized_agencies[main_agency] = []
-            normalized_agencies[main_agency].append(a)
-            
-            print(f"  Normalized '{agency_full}' to '{main_agency}'")
+    if snapshot:
+        logger.info(f"Using precomputed leaderboard for {suburb}, {state} ({len(snapshot['agents'])} agents)")
+        agents_list = snapshot["agents"]
+    else:
+        # Get top agents for the suburb
+        logger.info(f"Getting top agents for {suburb}, {state}")
+        agencies_data = await get_agent_performance_metrics(
+            suburb, 
+            state, 
+            property_types=property_types,
+            min_bedrooms=min_bedrooms,
+            max_bedrooms=max_bedrooms,
+            min_bathrooms=min_bathrooms,
+            max_bathrooms=max_bathrooms,
+            min_carspaces=min_carspaces,
+            max_carspaces=max_carspaces,
+            include_surrounding_suburbs=include_surrounding_suburbs,
+            post_code=post_code,
+            region=region,
+            area=area,
+            min_land_area=min_land_area,  # Added parameter
+            max_land_area=max_land_area,  # Added parameter
+            bypass_cache=bypass_cache
+        )
         
-        # Process each normalized agency group
-        for main_agency, agency_agents in normalized_agencies.items():
-            if len(agency_agents) == 1:
-                # Only one occurrence for this normalized agency
-                agent = agency_agents[0]
-                agency_name = agent['agency'].strip().lower()
-                agent_key = f"{agent_name}_{main_agency}"
-                print(f"  Adding agent: {agent['name']} from {agent['agency']} (normalized to {main_agency})")
-                print(f"  Agent key: '{agent_key}'")
-                unique_agents[agent_key] = agent
-            else:
-                # Multiple occurrences for the same agent at the same normalized agency
-                print(f"  Same agent across different branches of {main_agency}")
-                
-                # Merge the data from all branches
-                merged_agent = agency_agents[0].copy()  # Start with the first occurrence
-                merged_agent['branches'] = []  # Track all branches
-                
-                # Sum up the sales and values
-                total_sales = 0
-                joint_sales = 0
-                total_value = 0
-                joint_sales_value = 0
-                all_properties = {}
-                
-                for branch_agent in agency_agents:
-                    branch_name = branch_agent['agency']
-                    merged_agent['branches'].append(branch_name)
-                    
-                    # Add sales counts
-                    total_sales += branch_agent.get('total_sales', 0)
-                    joint_sales += branch_agent.get('joint_sales', 0)
-                    total_value += branch_agent.get('total_value', 0)
-                    joint_sales_value += branch_agent.get('joint_sales_value', 0)
-                    
-                    # Merge properties
-                    for prop_id, prop_data in branch_agent.get('properties', {}).items():
-                        all_properties[prop_id] = prop_data
-                    
-                    print(f"  Merged branch: {branch_name} - Sales: {branch_agent.get('total_sales', 0)}")
-                
-                # Update the merged agent with combined data
-                merged_agent['total_sales'] = total_sales
-                merged_agent['joint_sales'] = joint_sales
-                merged_agent['total_value'] = total_value
-                merged_agent['joint_sales_value'] = joint_sales_value
-                merged_agent['properties'] = all_properties
-                merged_agent['agency'] = f"{main_agency}"  # Use the normalized agency name
-                
-                # Use the main agency name for the key
-                agent_key = f"{agent_name}_{main_agency}"
-                print(f"  Created merged agent with key: '{agent_key}'")
-                print(f"  Total sales after merge: {total_sales}")
-                unique_agents[agent_key] = merged_agent
-    
-    # Print summary of unique agents
-    print("\n===== DEDUPLICATION SUMMARY =====")
-    print(f"Reduced {len(agents_list)} agents to {len(unique_agents)} unique agents")
-    print("Unique agent keys:")
-    for key in unique_agents.keys():
-        print(f"  - '{key}'")
+        agents_list = build_agent_leaderboard(agencies_data)
     
-    # Convert back to a list
-    agents_list = list(unique_agents.values())
     # Add default 'featured' key to all agents
     for agent in agents_list:
         agent['featured'] = False
@@ -285,12 +229,19 @@ async def fetch_property_data(
     
     # Get the Area Type
     print("\n===== CHECKING FOR AREA TYPE =====")
-    area_type = get_area_type(post_code, suburb)
+    area_type = get_area_type(post_code, suburb, state)
     print(f"Area type for {suburb}: {area_type}")
     # Process featured agents if any were found
     if featured_agents_data:
         print(f"Found {len(featured_agents_data)} featured agents for {suburb}, {state}")
         
+        # Resolve commission/marketing/discount for every featured agent in one query
+        featured_commissions = get_featured_agents_commission(
+            [info.get("Name", "") for info in featured_agents_data], home_owner_pricing, suburb, state
+        )
+        # Name -> agent lookup for matching featured agents against the leaderboard
+        agents_by_name = AgentNameIndex(agents_list)
+        
         for featured_agent_info in featured_agents_data:
             # Check if this is a manually entered agent (Manual Pull Data = Yes)
             if featured_agent_info.get("Manully Pull Data", "").strip().lower() == "yes":
@@ -324,7 +275,7 @@ async def fetch_property_data(
                     agent_details = await get_agent_details(agent_name, agency_name)
                 
                 # Get featured agent commission rate and discount
-                featured_agent_commission = get_featured_agent_commission(agent_name, home_owner_pricing, suburb, state)
+                featured_agent_commission = featured_commissions.get(normalize_agent_name(agent_name), EMPTY_COMMISSION)
                 featured_agent_commission_rate = featured_agent_commission.get("commission_rate", "")
                 featured_agent_discount = featured_agent_commission.get("discount", "")
                 featured_agent_marketing = featured_agent_commission.get("marketing", "")
@@ -355,20 +306,16 @@ async def fetch_property_data(
                 print(f"DEBUG - New agent object commission values: rate='{new_agent['commission_rate']}', discount='{new_agent['discount']}', marketing='{new_agent['marketing']}'")
                 
                 # Check if this agent already exists in the list
-                existing_agent = None
-                for idx, agent in enumerate(agents_list):
-                    if agent['name'].strip().lower() == agent_name.lower():
-                        existing_agent = idx
-                        break
+                existing_agent = agents_by_name.find(agent_name)
                 
                 if existing_agent is not None:
                     # Update the existing agent instead of adding a duplicate
-                    print(f"Agent {agent_name} already exists in list at index {existing_agent}. Updating instead of adding duplicate.")
-                    agents_list[existing_agent].update(new_agent)
+                    print(f"Agent {agent_name} already exists in list. Updating instead of adding duplicate.")
+                    existing_agent.update(new_agent)
                     print(f"Updated existing agent to featured: {agent_name}")
                 else:
                     # Add the new agent to the agents list
-                    agents_list.append(new_agent)
+                    agents_by_name.append(new_agent)
                     print(f"Added manually entered featured agent: {agent_name}")
             else:
                 # For non-manual agents, check if they match any existing agents
@@ -377,28 +324,24 @@ async def fetch_property_data(
                 print(f"Checking for existing agent match: {agent_name}")
                 
                 # Look for a match in our existing agents list
-                found_match = False
-                for agent in agents_list:
-                    if agent["name"].strip().lower() == agent_name:
-                        agent["featured"] = True
-                        # Check if this is a Featured Plus agent
-                        agent["featured_plus"] = featured_agent_info.get("Subscription Type", "").strip() == "Featured Plus"
-                        print(f"Agent {agent['name']} is Featured Plus: {agent['featured_plus']}")
-                        # Get featured agent commission rate and discount
-                        featured_agent_commission = get_featured_agent_commission(agent["name"], home_owner_pricing, suburb, state)
-                        agent["commission_rate"] = featured_agent_commission.get("commission_rate", "")
-                        agent["discount"] = featured_agent_commission.get("discount", "")
-                        agent["marketing"] = featured_agent_commission.get("marketing", "")
-                        
-                        # Debug: Print the commission values for this agent
-                        print(f"DEBUG - Existing agent commission for {agent['name']}: rate='{agent['commission_rate']}', discount='{agent['discount']}', marketing='{agent['marketing']}'")
-                        print(f"DEBUG - home_owner_pricing value: '{home_owner_pricing}'")
-                        
-                        found_match = True
-                        print(f"Matched existing agent as featured: {agent['name']}")
-                        break
-                
-                if not found_match:
+                agent = agents_by_name.find(agent_name)
+                if agent is not None:
+                    agent["featured"] = True
+                    # Check if this is a Featured Plus agent
+                    agent["featured_plus"] = featured_agent_info.get("Subscription Type", "").strip() == "Featured Plus"
+                    print(f"Agent {agent['name']} is Featured Plus: {agent['featured_plus']}")
+                    # Get featured agent commission rate and discount
+                    featured_agent_commission = featured_commissions.get(agent_name, EMPTY_COMMISSION)
+                    agent["commission_rate"] = featured_agent_commission.get("commission_rate", "")
+                    agent["discount"] = featured_agent_commission.get("discount", "")
+                    agent["marketing"] = featured_agent_commission.get("marketing", "")
+                    
+                    # Debug: Print the commission values for this agent
+                    print(f"DEBUG - Existing agent commission for {agent['name']}: rate='{agent['commission_rate']}', discount='{agent['discount']}', marketing='{agent['marketing']}'")
+                    print(f"DEBUG - home_owner_pricing value: '{home_owner_pricing}'")
+                    
+                    print(f"Matched existing agent as featured: {agent['name']}")
+                else:
                     print(f"No match found for featured agent: {agent_name}")
     else:
         print(f"No featured agents found for {suburb}, {state}")
@@ -414,141 +357,34 @@ async def fetch_property_data(
         print(f"DEBUG - Standard commission rate: '{agent_commission_rate}', marketing: '{agent_marketing}'")
         print(f"DEBUG - home_owner_pricing value: '{home_owner_pricing}'")
         
-        # Create a cache for standard subscription status to avoid duplicate API calls
-        std_sub_status_cache = {}
-        # Check for standard subscription for non-featured agents
+        # Check standard subscriptions for non-featured agents (concurrent, shared cache)
+        await _apply_standard_subscriptions(agents_list, suburb, state)
+        
+        # Add commission rate for non-featured agents - changed condition to not check featured_agents_data is None
         for agent in agents_list:
-            agent_name = agent['name']
-            # Skip featured agents - they already have highest priority
-            if agent['featured']:
-                continue
-                
-            # Check if we already have the subscription status for this agent in the cache
-            if agent_name in std_sub_status_cache:
-                agent['standard_subscription'] = std_sub_status_cache[agent_name]
-                logger.info(f"Using cached standard subscription status for {agent_name}: {agent['standard_subscription']}")
-            else:
-                # If not in cache, make the API call
-                has_std_subscription = await check_standard_subscription(agent_name, suburb, state)
-                agent['standard_subscription'] = has_std_subscription
-                # Store in cache for future use
-                std_sub_status_cache[agent_name] = has_std_subscription
-                if has_std_subscription:
-                    logger.info(f"Agent {agent_name} has standard subscription")
-            # Add commission rate for non-featured agents - changed condition to not check featured_agents_data is None
             if not agent.get('featured', False) and 'commission_rate' not in agent:
                 agent['commission_rate'] = agent_commission_rate
                 agent['discount'] = None
                 agent['marketing'] = agent_marketing
-                print(f"DEBUG - Added standard commission to agent {agent_name}: rate='{agent_commission_rate}', marketing='{agent_marketing}'")
+                print(f"DEBUG - Added standard commission to agent {agent['name']}: rate='{agent_commission_rate}', marketing='{agent_marketing}'")
     else:
-        # Create a cache for standard subscription status to avoid duplicate API calls
-        std_sub_status_cache = {}
-        # Check for standard subscription for non-featured agents
-        for agent in agents_list:
-            agent_name = agent['name']
-            # Skip featured agents - they already have highest priority
-            if agent['featured']:
-                continue
-                
-            # Check if we already have the subscription status for this agent in the cache
-            if agent_name in std_sub_status_cache:
-                agent['standard_subscription'] = std_sub_status_cache[agent_name]
-                logger.info(f"Using cached standard subscription status for {agent_name}: {agent['standard_subscription']}")
-            else:
-                # If not in cache, make the API call
-                has_std_subscription = await check_standard_subscription(agent_name, suburb, state)
-                agent['standard_subscription'] = has_std_subscription
-                # Store in cache for future use
-                std_sub_status_cache[agent_name] = has_std_subscription
-                if has_std_subscription:
-                    logger.info(f"Agent {agent_name} has standard subscription")
+        # Check standard subscriptions for non-featured agents (concurrent, shared cache)
+        await _apply_standard_subscriptions(agents_list, suburb, state)
     
     # Final deduplication step - ensure no duplicates make it to the final list
     print("\n===== FINAL DEDUPLICATION BEFORE CATEGORIZATION =====")
     print(f"Total agents before final deduplication: {len(agents_list)}")
     
-    final_unique_agents = {}
-    for agent in agents_list:
-        agent_name = agent['name'].strip().lower()
-        agent_key = agent_name  # Use just the name as key for final deduplication
-        
-        if agent_key in final_unique_agents:
-            # Duplicate found - keep the one with featured status, or the one with more data
-            existing = final_unique_agents[agent_key]
-            print(f"Duplicate found: {agent['name']} (Featured: {agent.get('featured', False)}) vs existing (Featured: {existing.get('featured', False)})")
-            
-            # Prioritize featured agents
-            if agent.get('featured', False) and not existing.get('featured', False):
-                print(f"  Keeping new agent (featured)")
-                final_unique_agents[agent_key] = agent
-            elif not agent.get('featured', False) and existing.get('featured', False):
-                print(f"  Keeping existing agent (featured)")
-                # Keep existing
-            elif agent.get('featured', False) and existing.get('featured', False):
-                # Both are featured, merge the data and keep the one with more complete information
-                print(f"  Both are featured - merging data")
-                # Use the one with more sales data, or manual data if available
-                if agent.get('total_sales', 0) > existing.get('total_sales', 0):
-                    final_unique_agents[agent_key] = agent
-                # Keep existing if it has equal or more sales
-            else:
-                # Neither is featured, keep the one with more sales
-                if agent.get('total_sales', 0) > existing.get('total_sales', 0):
-                    print(f"  Keeping new agent (higher sales)")
-                    final_unique_agents[agent_key] = agent
-                else:
-                    print(f"  Keeping existing agent (higher or equal sales)")
-        else:
-            final_unique_agents[agent_key] = agent
-    
-    agents_list = list(final_unique_agents.values())
+    agents_list = dedupe_agents_by_name(agents_list)
     print(f"Total agents after final deduplication: {len(agents_list)}")
     print("=" * 50)
     
-    # Separate agents into three categories: featured, standard subscription, and regular
-    featured_agents = [agent for agent in agents_list if agent['featured']]
-    std_sub_agents = [agent for agent in agents_list if not agent['featured'] and agent.get('standard_subscription', False)]
-    regular_agents = [agent for agent in agents_list if not agent['featured'] and not agent.get('standard_subscription', False)]
-    
-    # Sort standard subscription and regular agents by total sales (descending)
-    std_sub_agents.sort(key=lambda x: x['total_sales'], reverse=True)
-    regular_agents.sort(key=lambda x: x['total_sales'], reverse=True)
-    
     # Combine agents in priority order: featured first, then standard subscription, then regular
-    # Calculate how many agents we need from each category to make up to 5 total
-    if featured_agents:
-        logger.info(f"Found {len(featured_agents)} featured agents in {suburb}")
-        remaining_spots = 5 - len(featured_agents)
-        
-        if std_sub_agents and remaining_spots > 0:
-            logger.info(f"Found {len(std_sub_agents)} standard subscription agents in {suburb}")
-            std_sub_needed = min(remaining_spots, len(std_sub_agents))
-            remaining_spots -= std_sub_needed
-            
-            # Calculate how many regular agents we need
-            regular_needed = min(remaining_spots, len(regular_agents)) if remaining_spots > 0 else 0
-            
-            # Combine all categories
-            top_agents = featured_agents + std_sub_agents[:std_sub_needed] + regular_agents[:regular_needed]
-        else:
-            # No standard subscription agents, just use regular agents to fill remaining spots
-            top_agents = featured_agents + regular_agents[:remaining_spots]
-    elif std_sub_agents:
-        logger.info(f"No featured agents found, but found {len(std_sub_agents)} standard subscription agents in {suburb}")
-        # No featured agents, but we have standard subscription agents
-        std_sub_needed = min(5, len(std_sub_agents))
-        remaining_spots = 5 - std_sub_needed
-        
-        # Calculate how many regular agents we need
-        regular_needed = min(remaining_spots, len(regular_agents)) if remaining_spots > 0 else 0
-        
-        # Combine standard subscription and regular agents
-        top_agents = std_sub_agents[:std_sub_needed] + regular_agents[:regular_needed]
-    else:
-        logger.info(f"No featured or standard subscription agents found in {suburb}")
-        # No featured or standard subscription agents, just take top 5 regular agents
-        top_agents = regular_agents[:5] if len(regular_agents) > 5 else regular_agents
+    top_agents, tier_counts = select_top_agents(agents_list)
+    logger.info(
+        f"Selected {len(top_agents)} top agents in {suburb} from {tier_counts['featured']} featured, "
+        f"{tier_counts['standard_subscription']} standard subscription and {tier_counts['regular']} regular agents"
+    )
     
 
     # Format the top agents data for the PDF
@@ -558,15 +394,18 @@ async def fetch_property_data(
         total_value = agent.get('total_sales_value_combined', 0)
         
         # For manually entered agents, use the total_value directly
-        if agent.get('featured', False) and len(agent.get('properties', {})) == 0 and agent.get('total_value'):
+        # (leaderboard snapshot agents carry has_sold_price instead of properties)
+        if agent.get('featured', False) and agent.get('properties') == {} and agent.get('total_value'):
             formatted_total = agent.get('total_value')
         else:
             # Determine if we should show the total value or "Not disclosed"
             # Only show "Not disclosed" if ALL properties have no price
-            valid_prices = [p["sold_price"] for p in agent["properties"].values() 
-                           if p["sold_price"] is not None]
-            
-            if valid_prices:  # If we have at least one property with price
+            if 'properties' in agent:
+                has_sold_price = any(p["sold_price"] is not None for p in agent["properties"].values())
+            else:
+                has_sold_price = agent.get('has_sold_price', False)
+
+            if has_sold_price:  # If we have at least one property with price
                 formatted_total = format_price(total_value)
             else:  # If none of the properties have price data
                 formatted_total = "Not disclosed"
@@ -611,13 +450,12 @@ async def fetch_property_data(
     
     return result
 
-async def search_sold_listings_by_suburb(
-    suburb, 
-    state="NSW", 
-    property_types=None, 
-    min_bedrooms=1, 
+def _build_sold_search_payload(
+    suburb,
+    state="NSW",
+    min_bedrooms=1,
     max_bedrooms=None,
-    min_bathrooms=1, 
+    min_bathrooms=1,
     max_bathrooms=None,
     min_carspaces=1,
     max_carspaces=None,
@@ -629,43 +467,16 @@ async def search_sold_listings_by_suburb(
     max_land_area=None
 ):
     """
-    Search for sold listings in a specific suburb using Domain.com.au API
+    Build the Domain.com.au `_search` payload for sold listings
     
-    Args:
-        suburb: The suburb to search in
-        state: The state to search in
-        property_types: List of property types to filter by
-        min_bedrooms: Minimum number of bedrooms
-        max_bedrooms: Maximum number of bedrooms
-        min_bathrooms: Minimum number of bathrooms
-        max_bathrooms: Maximum number of bathrooms
-        min_carspaces: Minimum number of car spaces
-        max_carspaces: Maximum number of car spaces
-        include_surrounding_suburbs: Whether to include surrounding suburbs
-        post_code: The post code to filter by
-        region: The region to filter by
-        area: The area to filter by
-        min_land_area: Minimum land area in square meters
-        max_land_area: Maximum land area in square meters
-        
-    Returns:
-        List of listings matching the criteria
+    Property types are always requested in full and filtered afterwards, so
+    the payload only depends on location, room and land filters.
     """
-    if not DOMAIN_API_KEY:
-        logger.error("Domain API key not found. Please set DOMAIN_API_KEY environment variable.")
-        return None
-    
-    logger.info(f"Searching for sold listings in {suburb}, {state}")
-    
-    # Store user's requested property types for post-filtering
-    user_requested_property_types = property_types
-    
     # Always use all property types in the API request
     all_property_types = ["AcreageSemiRural", "ApartmentUnitFlat", "Aquaculture", "BlockOfUnits", "CarSpace", "DairyFarming", "DevelopmentSite", "Duplex", "Farm", "FishingForestry", "NewHomeDesigns", "House", "NewHouseLand", "IrrigationServices", "NewLand", "Livestock", "NewApartments", "Penthouse", "RetirementVillage", "Rural", "SemiDetached", "SpecialistFarm", "Studio", "Terrace", "Townhouse", "VacantLand", "Villa", "Cropping", "Viticulture", "MixedFarming", "Grazing", "Horticulture", "Equine", "Farmlet", "Orchard", "RuralLifestyle"
 ]
     
     # Calculate one year ago date in ISO 8601 format
-    from datetime import datetime, timedelta
     one_year_ago = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%dT00:00:00Z")
     
     # Prepare the search request payload
@@ -683,7 +494,7 @@ async def search_sold_listings_by_suburb(
         "minBathrooms": min_bathrooms,
         "minCarspaces": min_carspaces,
         "listedSince": one_year_ago,
-        "pageSize": 100
+        "pageSize": DOMAIN_SEARCH_PAGE_SIZE
     }
     # Add optional parameters if provided
     if max_bedrooms is not None:
@@ -705,6 +516,32 @@ async def search_sold_listings_by_suburb(
     if max_land_area is not None:
         payload["maxLandArea"] = max_land_area
     
+    return payload
+
+def _filter_listings_by_property_types(listings, property_types):
+    """Keep only listings whose propertyType is in property_types (no-op when empty)"""
+    if not property_types:
+        return listings
+    
+    filtered_listings = []
+    for listing in listings:
+        if ("listing" in listing and 
+            "propertyDetails" in listing["listing"] and 
+            "propertyType" in listing["listing"]["propertyDetails"]):
+            
+            property_type = listing["listing"]["propertyDetails"]["propertyType"]
+            if property_type in property_types:
+                filtered_listings.append(listing)
+    
+    return filtered_listings
+
+async def _post_search_page(payload, page_number):
+    """
+    Request one page of `_search` results
+    
+    Returns:
+        List of listings, or None if the request failed
+    """
     # API endpoint
     url = "https://api.domain.com.au/v1/listings/residential/_search"
     
@@ -714,40 +551,199 @@ async def search_sold_listings_by_suburb(
         "Content-Type": "application/json"
     }
     
+    page_payload = dict(payload, pageNumber=page_number)
+    
     try:
-        # Make the API request
-        response = requests.post(url, headers=headers, json=payload)
+        # Make the API request over the shared connection pool
+        response = await get_domain_client().post(url, headers=headers, json=page_payload)
         
         # Check if the request was successful
         if response.status_code == 200:
-            listings = response.json()
-            logger.info(f"Found {len(listings)} sold listings in {suburb}")
-            
-            # Filter listings by user's requested property types if specified
-            if user_requested_property_types:
-                filtered_listings = []
-                for listing in listings:
-                    if ("listing" in listing and 
-                        "propertyDetails" in listing["listing"] and 
-                        "propertyType" in listing["listing"]["propertyDetails"]):
-                        
-                        property_type = listing["listing"]["propertyDetails"]["propertyType"]
-                        if property_type in user_requested_property_types:
-                            filtered_listings.append(listing)
-                
-                logger.info(f"Filtered to {len(filtered_listings)} listings matching requested property types")
-                return filtered_listings
-            
-            # Return all listings if no property type filter was specified
-            print("Returning All Listings /n *************")
-            return listings
+            return response.json()
         else:
-            logger.error(f"API request failed with status code {response.status_code}: {response.text}")
+            logger.error(f"API request for page {page_number} failed with status code {response.status_code}: {response.text}")
             return None
     except Exception as e:
-        logger.error(f"Error searching for listings: {str(e)}")
+        logger.error(f"Error searching for listings (page {page_number}): {str(e)}")
         return None
 
+async def iter_sold_listing_pages(
+    suburb, 
+    state="NSW", 
+    property_types=None, 
+    min_bedrooms=1, 
+    max_bedrooms=None,
+    min_bathrooms=1, 
+    max_bathrooms=None,
+    min_carspaces=1,
+    max_carspaces=None,
+    include_surrounding_suburbs=False,
+    post_code=None,
+    region=None,
+    area=None,
+    min_land_area=None,
+    max_land_area=None,
+    max_pages=None,
+    max_listings=None,
+    use_cache=True
+):
+    """
+    Page through sold listings in a suburb, yielding each page as it arrives
+    
+    The next page is requested before the current one is yielded, so callers
+    can aggregate page N while page N+1 is in flight. Paging stops at the
+    first short page or when the max_pages / max_listings budget is spent.
+    A complete result set is stored in the listings cache and served from
+    there for identical searches until it expires.
+    
+    Args:
+        suburb: The suburb to search in
+        state: The state to search in
+        property_types: List of property types to filter each page by
+        (remaining filters as for search_sold_listings_by_suburb)
+        max_pages: Maximum pages to request (default: DOMAIN_SEARCH_MAX_PAGES)
+        max_listings: Maximum raw listings to request (default: DOMAIN_SEARCH_MAX_LISTINGS)
+        use_cache: Read from the listings cache (False still refreshes it)
+        
+    Yields:
+        Lists of listings, already filtered by property_types
+    """
+    if not DOMAIN_API_KEY:
+        logger.error("Domain API key not found. Please set DOMAIN_API_KEY environment variable.")
+        return
+    
+    max_pages = max_pages or DOMAIN_SEARCH_MAX_PAGES
+    max_listings = max_listings or DOMAIN_SEARCH_MAX_LISTINGS
+    
+    logger.info(f"Searching for sold listings in {suburb}, {state} (up to {max_pages} pages / {max_listings} listings)")
+    
+    payload = _build_sold_search_payload(
+        suburb,
+        state,
+        min_bedrooms=min_bedrooms,
+        max_bedrooms=max_bedrooms,
+        min_bathrooms=min_bathrooms,
+        max_bathrooms=max_bathrooms,
+        min_carspaces=min_carspaces,
+        max_carspaces=max_carspaces,
+        include_surrounding_suburbs=include_surrounding_suburbs,
+        post_code=post_code,
+        region=region,
+        area=area,
+        min_land_area=min_land_area,
+        max_land_area=max_land_area
+    )
+    page_size = payload["pageSize"]
+    
+    if use_cache:
+        cached_listings = get_cached_listings(payload)
+        if cached_listings is not None:
+            logger.info(f"Using {len(cached_listings)} cached sold listings for {suburb}, {state}")
+            for start in range(0, len(cached_listings), page_size):
+                yield _filter_listings_by_property_types(cached_listings[start:start + page_size], property_types)
+            return
+    
+    page_number = 1
+    fetched_listings = []
+    complete = False
+    pending = asyncio.ensure_future(_post_search_page(payload, page_number))
+    try:
+        while pending is not None:
+            listings = await pending
+            pending = None
+            
+            if listings is None:
+                break
+            
+            listings = listings[:max_listings - len(fetched_listings)]
+            fetched_listings.extend(listings)
+            logger.info(f"Page {page_number}: {len(listings)} sold listings in {suburb} ({len(fetched_listings)} so far)")
+            
+            # Start the next request before handing this page to the caller
+            if len(listings) >= page_size and page_number < max_pages and len(fetched_listings) < max_listings:
+                page_number += 1
+                pending = asyncio.ensure_future(_post_search_page(payload, page_number))
+            else:
+                complete = True
+            
+            if listings:
+                yield _filter_listings_by_property_types(listings, property_types)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+    
+    # Only cache result sets where every page came back
+    if complete:
+        set_cached_listings(payload, fetched_listings)
+
+async def search_sold_listings_by_suburb(
+    suburb, 
+    state="NSW", 
+    property_types=None, 
+    min_bedrooms=1, 
+    max_bedrooms=None,
+    min_bathrooms=1, 
+    max_bathrooms=None,
+    min_carspaces=1,
+    max_carspaces=None,
+    include_surrounding_suburbs=False,
+    post_code=None,
+    region=None,
+    area=None,
+    min_land_area=None,
+    max_land_area=None,
+    use_cache=True
+):
+    """
+    Search for sold listings in a specific suburb using Domain.com.au API
+    
+    Collects every page from iter_sold_listing_pages.
+    
+    Args:
+        suburb: The suburb to search in
+        state: The state to search in
+        property_types: List of property types to filter by
+        min_bedrooms: Minimum number of bedrooms
+        max_bedrooms: Maximum number of bedrooms
+        min_bathrooms: Minimum number of bathrooms
+        max_bathrooms: Maximum number of bathrooms
+        min_carspaces: Minimum number of car spaces
+        max_carspaces: Maximum number of car spaces
+        include_surrounding_suburbs: Whether to include surrounding suburbs
+        post_code: The post code to filter by
+        region: The region to filter by
+        area: The area to filter by
+        min_land_area: Minimum land area in square meters
+        max_land_area: Maximum land area in square meters
+        use_cache: Read from the listings cache (False still refreshes it)
+        
+    Returns:
+        List of listings matching the criteria
+    """
+    listings = []
+    async for page in iter_sold_listing_pages(
+        suburb,
+        state,
+        property_types=property_types,
+        min_bedrooms=min_bedrooms,
+        max_bedrooms=max_bedrooms,
+        min_bathrooms=min_bathrooms,
+        max_bathrooms=max_bathrooms,
+        min_carspaces=min_carspaces,
+        max_carspaces=max_carspaces,
+        include_surrounding_suburbs=include_surrounding_suburbs,
+        post_code=post_code,
+        region=region,
+        area=area,
+        min_land_area=min_land_area,
+        max_land_area=max_land_area,
+        use_cache=use_cache
+    ):
+        listings.extend(page)
+    
+    logger.info(f"Found {len(listings)} sold listings in {suburb} matching requested property types")
+    return listings
+
 async def process_agent_sales_data(suburb, state="NSW"):
     """
     Process sold listings data to create a nested dictionary of agencies, agents, and their sales
@@ -845,6 +841,103 @@ async def process_agent_sales_data(suburb, state="NSW"):
     
     return result
 
+def _add_listing_agents(listing, agents_by_agency):
+    """
+    Add the agents on one sold listing to their agency's agents dictionary
+    
+    The first contact on a listing is the primary agent; any others are
+    counted as joint sales. Listings whose agency is not in agents_by_agency
+    are ignored.
+    """
+    if "listing" not in listing or "advertiser" not in listing["listing"]:
+        return
+        
+    advertiser = listing["listing"]["advertiser"]
+    agency_id = advertiser.get("id")
+    
+    # Skip if agency not found in our data
+    if agency_id not in agents_by_agency:
+        return
+    
+    # Extract agent information from contacts
+    if "contacts" not in advertiser:
+        return
+    
+    agents = agents_by_agency[agency_id]
+    
+    # Get listing ID and sold price
+    listing_id = listing["listing"].get("id")
+    
+    # Extract sold price and date from soldData instead of soldDetails
+    sold_price = None
+    sold_date = None
+    if "soldData" in listing["listing"]:
+        sold_price = listing["listing"]["soldData"].get("soldPrice")
+        sold_date = listing["listing"]["soldData"].get("soldDate")
+    
+    # Process each contact/agent based on their position in the contacts list
+    for index, contact in enumerate(advertiser["contacts"]):
+        if "name" not in contact or not contact["name"] or contact["name"].strip() == "":
+            logger.info(f"Skipping contact with missing or empty name for listing ID: {listing_id}")
+            continue
+            
+        agent_name = contact["name"]
+        agent_photo = contact.get("photoUrl", "")
+        
+        # Use name as ID since we don't have actual agent IDs
+        agent_id = agent_name
+        
+        # Initialize agent in result if not already present
+        if agent_id not in agents:
+            agents[agent_id] = {
+                "id": agent_id,
+                "name": agent_name,
+                "photo": agent_photo,
+                "properties": {},  # Changed from sales[] to properties dict
+                "total_sales": 0,  # Primary sales (agent is first in contacts)
+                "joint_sales": 0,  # New field for joint sales (agent is not first)
+                "total_value": 0,  # Value of primary sales
+                "joint_sales_value": 0,  # Value of joint sales
+            }
+        
+        # Store property data if we have a listing ID
+        if listing_id:
+            agents[agent_id]["properties"][listing_id] = {
+                "sold_price": sold_price,
+                "sold_date": sold_date,
+                "is_primary": index == 0  # Track if this was a primary or joint sale
+            }
+            
+            # Update sales counts and values based on agent position
+            if index == 0:  # Primary agent (first in contacts list)
+                agents[agent_id]["total_sales"] += 1
+                if sold_price:
+                    agents[agent_id]["total_value"] += sold_price
+            else:  # Joint agent (not first in contacts list)
+                agents[agent_id]["joint_sales"] += 1
+                if sold_price:
+                    agents[agent_id]["joint_sales_value"] += sold_price
+
+def _agent_price_stats(agent_data):
+    """
+    Median sold price over an agent's properties that have a price
+    
+    Returns:
+        Tuple of (number of priced properties, median sold price or 0)
+    """
+    valid_prices = [p["sold_price"] for p in agent_data["properties"].values() 
+                   if p["sold_price"] is not None]
+    
+    median_sold_price = 0
+    if valid_prices:
+        sorted_prices = sorted(valid_prices)
+        mid = len(sorted_prices) // 2
+        if len(sorted_prices) % 2 == 0:
+            median_sold_price = (sorted_prices[mid-1] + sorted_prices[mid]) / 2
+        else:
+            median_sold_price = sorted_prices[mid]
+    return len(valid_prices), median_sold_price
+
 async def get_agent_performance_metrics(
     suburb, 
     state="NSW", 
@@ -861,7 +954,8 @@ async def get_agent_performance_metrics(
     region=None,
     area=None,
     min_land_area=None,
-    max_land_area=None
+    max_land_area=None,
+    bypass_cache=False
 ):
     """
     Calculate performance metrics for agents in a specific suburb
@@ -881,16 +975,26 @@ async def get_agent_performance_metrics(
         post_code: The post code to filter by
         region: The region to filter by
         area: The area to filter by
+        bypass_cache: Skip the cached search results and query Domain directly
         
     Returns:
         Dictionary of agencies with their agents and performance metrics
     """
     logger.info(f"Calculating agent performance metrics for {suburb}, {state}")
     
-    # Step 1: Search for sold listings in the suburb
+    # Step 1: Page through sold listings in the suburb. Agency lookups for each
+    # page start straight away and agents are aggregated while the next page loads.
     print(f"\nStep 1: Searching for sold listings in {suburb}...")
     logger.info(f"Step 1: Searching for sold listings in {suburb}...")
-    listings = await search_sold_listings_by_suburb(
+    
+    agency_advertisers = {}  # First advertiser seen for each agency, in listing order
+    agents_by_agency = {}  # agency_id -> agents dict built from the listings
+    agency_detail_tasks = []
+    total_listings = 0
+    # Region and multi-suburb searches can be aggregated with pandas (listing_aggregation.py)
+    frame_aggregator = ListingFrameAggregator() if use_frame_aggregation(include_surrounding_suburbs, region, area) else None
+    
+    async for page in iter_sold_listing_pages(
         suburb, 
         state, 
         property_types=property_types,
@@ -905,130 +1009,82 @@ async def get_agent_performance_metrics(
         region=region,
         area=area,
         min_land_area=min_land_area,
-        max_land_area=max_land_area
-    )
-    if not listings:
+        max_land_area=max_land_area,
+        use_cache=not bypass_cache
+    ):
+        total_listings += len(page)
+        
+        # Step 2 (per page): start agency detail lookups for agencies not seen yet
+        new_agency_ids = []
+        for listing in page:
+            if "listing" in listing and "advertiser" in listing["listing"] and "id" in listing["listing"]["advertiser"]:
+                agency_id = listing["listing"]["advertiser"]["id"]
+                if agency_id not in agency_advertisers:
+                    agency_advertisers[agency_id] = listing["listing"]["advertiser"]
+                    agents_by_agency[agency_id] = {}
+                    new_agency_ids.append(agency_id)
+        if new_agency_ids:
+            logger.info(f"Getting details for {len(new_agency_ids)} new agencies concurrently")
+            agency_detail_tasks.append(asyncio.ensure_future(get_agency_details_bulk(new_agency_ids)))
+        
+        # Step 3 (per page): extract agent information directly from the sold listings
+        if frame_aggregator is not None:
+            frame_aggregator.add_listings(page, agents_by_agency)
+        else:
+            for listing in page:
+                _add_listing_agents(listing, agents_by_agency)
+    
+    if not total_listings:
         logger.error(f"No listings found for {suburb}")
         print(f"No listings found for {suburb}")
         return {}
     
-    print(f"Found {len(listings)} listings in {suburb}")
-    logger.info(f"Found {len(listings)} listings in {suburb}")
+    print(f"Found {total_listings} listings in {suburb}")
+    logger.info(f"Found {total_listings} listings in {suburb}")
     
-    # Step 2: Extract agency IDs from the listings and get agency details
-    print(f"\nStep 2: Extracting agency IDs from listings and getting agency details...")
-    logger.info(f"Step 2: Extracting agency IDs from listings and getting agency details...")
-    agencies_data = {}  # Main dictionary to store all data
+    # (priced property count, median sold price) per agent when aggregated with pandas
+    price_stats = {}
+    if frame_aggregator is not None:
+        frame_agents, price_stats = frame_aggregator.aggregate()
+        for agency_id, agents in frame_agents.items():
+            agents_by_agency[agency_id].update(agents)
     
-    for listing in listings:
-        if "listing" in listing and "advertiser" in listing["listing"] and "id" in listing["listing"]["advertiser"]:
-            agency_id = listing["listing"]["advertiser"]["id"]
-            
-            # Skip if we already processed this agency
-            if agency_id in agencies_data:
-                continue
-                
-            # Get agency details
-            print(f"Getting details for agency ID: {agency_id}")
-            logger.info(f"Getting details for agency ID: {agency_id}")
-            agency_details = await get_agency_details(agency_id)
-            
-            if not agency_details:
-                print(f"Failed to retrieve details for agency ID: {agency_id}")
-                logger.warning(f"Failed to retrieve details for agency ID: {agency_id}")
-                # Initialize with minimal info
-                agencies_data[agency_id] = {
-                    "id": agency_id,
-                    "name": f"Agency {agency_id}",
-                    "logo": listing["listing"]["advertiser"].get("logoUrl") if "listing" in listing and "advertiser" in listing["listing"] else None,
-                    "agents": {}
-                }
-            else:
-                # Store agency details
-                agencies_data[agency_id] = {
-                    "id": agency_id,
-                    "name": agency_details.get("name", f"Agency {agency_id}"),
-                    "logo": agency_details.get("logo") or (listing["listing"]["advertiser"].get("logoUrl") if "listing" in listing and "advertiser" in listing["listing"] else None),
-                    "agents": {}
-                }
-                print(f"Added agency: {agencies_data[agency_id]['name']}")
-                logger.info(f"Added agency: {agencies_data[agency_id]['name']}")
+    # Step 2: Collect agency details fetched while the listings were streaming in
+    print(f"\nStep 2: Collecting agency details for {len(agency_advertisers)} agencies...")
+    logger.info(f"Step 2: Collecting agency details for {len(agency_advertisers)} agencies...")
+    agency_details_by_id = {}
+    for details in await asyncio.gather(*agency_detail_tasks):
+        agency_details_by_id.update(details)
+    
+    agencies_data = {}  # Main dictionary to store all data
+    for agency_id, advertiser in agency_advertisers.items():
+        agency_details = agency_details_by_id.get(agency_id)
+        
+        if not agency_details:
+            print(f"Failed to retrieve details for agency ID: {agency_id}")
+            logger.warning(f"Failed to retrieve details for agency ID: {agency_id}")
+            # Initialize with minimal info
+            agencies_data[agency_id] = {
+                "id": agency_id,
+                "name": f"Agency {agency_id}",
+                "logo": advertiser.get("logoUrl"),
+                "agents": agents_by_agency[agency_id]
+            }
+        else:
+            # Store agency details
+            agencies_data[agency_id] = {
+                "id": agency_id,
+                "name": agency_details.get("name", f"Agency {agency_id}"),
+                "logo": agency_details.get("logo") or advertiser.get("logoUrl"),
+                "agents": agents_by_agency[agency_id]
+            }
+            print(f"Added agency: {agencies_data[agency_id]['name']}")
+            logger.info(f"Added agency: {agencies_data[agency_id]['name']}")
     
     print(f"Found {len(agencies_data)} unique agencies in {suburb}")
     logger.info(f"Found {len(agencies_data)} unique agencies in {suburb}")
     
-    # Modified: Skip agency listings retrieval and directly extract agent info from the sold listings
-    print(f"\nStep 3: Extracting agent information directly from sold listings...")
-    logger.info(f"Step 3: Extracting agent information directly from sold listings...")
-    
-    # Process each listing to extract agent information
-    for listing in listings:
-        if "listing" not in listing or "advertiser" not in listing["listing"]:
-            continue
-            
-        advertiser = listing["listing"]["advertiser"]
-        agency_id = advertiser.get("id")
-        
-        # Skip if agency not found in our data
-        if agency_id not in agencies_data:
-            continue
-            
-        # Extract agent information from contacts
-        if "contacts" in advertiser:
-            # Get listing ID and sold price
-            listing_id = listing["listing"].get("id")
-            
-            # Extract sold price and date from soldData instead of soldDetails
-            sold_price = None
-            sold_date = None
-            if "soldData" in listing["listing"]:
-                sold_price = listing["listing"]["soldData"].get("soldPrice")
-                sold_date = listing["listing"]["soldData"].get("soldDate")
-            
-            # Process each contact/agent based on their position in the contacts list
-            for index, contact in enumerate(advertiser["contacts"]):
-                if "name" not in contact or not contact["name"] or contact["name"].strip() == "":
-                    logger.info(f"Skipping contact with missing or empty name for listing ID: {listing_id}")
-                    continue
-                    
-                agent_name = contact["name"]
-                agent_photo = contact.get("photoUrl", "")
-                
-                # Use name as ID since we don't have actual agent IDs
-                agent_id = agent_name
-                
-                # Initialize agent in result if not already present
-                if agent_id not in agencies_data[agency_id]["agents"]:
-                    agencies_data[agency_id]["agents"][agent_id] = {
-                        "id": agent_id,
-                        "name": agent_name,
-                        "photo": agent_photo,
-                        "properties": {},  # Changed from sales[] to properties dict
-                        "total_sales": 0,  # Primary sales (agent is first in contacts)
-                        "joint_sales": 0,  # New field for joint sales (agent is not first)
-                        "total_value": 0,  # Value of primary sales
-                        "joint_sales_value": 0,  # Value of joint sales
-                    }
-                
-                # Store property data if we have a listing ID
-                if listing_id:
-                    agencies_data[agency_id]["agents"][agent_id]["properties"][listing_id] = {
-                        "sold_price": sold_price,
-                        "sold_date": sold_date,
-                        "is_primary": index == 0  # Track if this was a primary or joint sale
-                    }
-                    
-                    # Update sales counts and values based on agent position
-                    if index == 0:  # Primary agent (first in contacts list)
-                        agencies_data[agency_id]["agents"][agent_id]["total_sales"] += 1
-                        if sold_price:
-                            agencies_data[agency_id]["agents"][agent_id]["total_value"] += sold_price
-                    else:  # Joint agent (not first in contacts list)
-                        agencies_data[agency_id]["agents"][agent_id]["joint_sales"] += 1
-                        if sold_price:
-                            agencies_data[agency_id]["agents"][agent_id]["joint_sales_value"] += sold_price
-    
-        # Step 4: Calculate final metrics for each agent
+    # Step 4: Calculate final metrics for each agent
     print(f"\nStep 4: Calculating final metrics for each agent...")
     
     # Process each agent to calculate metrics and handle edge cases properly
@@ -1039,22 +1095,12 @@ async def get_agent_performance_metrics(
                 print(f"Skipping agent {agent_data['name']} ({agent_id}) - no sales at all")
                 continue
                 
-            # Get all valid prices from both primary and joint sales
-            valid_prices = [p["sold_price"] for p in agent_data["properties"].values() 
-                           if p["sold_price"] is not None]
-            
-            # Calculate median sold price (include both primary and joint sales with prices)
-            median_sold_price = 0
-            if valid_prices:
-                sorted_prices = sorted(valid_prices)
-                mid = len(sorted_prices) // 2
-                if len(sorted_prices) % 2 == 0 and len(sorted_prices) > 0:
-                    median_sold_price = (sorted_prices[mid-1] + sorted_prices[mid]) / 2
-                elif len(sorted_prices) > 0:
-                    median_sold_price = sorted_prices[mid]
+            # Median sold price over both primary and joint sales with prices
+            stats = price_stats.get((agency_id, agent_id))
+            properties_with_prices, median_sold_price = stats if stats is not None else _agent_price_stats(agent_data)
             
             # Format the metrics based on whether we have any price data
-            if valid_prices:  # If we have at least one property with price
+            if properties_with_prices:  # If we have at least one property with price
                 formatted_median_price = format_price(median_sold_price)
             else:  # If none of the properties have price data
                 formatted_median_price = "Not disclosed"
@@ -1077,7 +1123,6 @@ async def get_agent_performance_metrics(
             
             # Count total properties (both with and without prices)
             total_properties = len(agent_data["properties"])
-            properties_with_prices = len(valid_prices)
             
             # Log the breakdown for debugging
             print(f"Agent {agent_data['name']} metrics:")
@@ -1104,22 +1149,18 @@ async def get_agent_performance_metrics(
     # Step 5: Mark the top agent as featured
     print(f"\nStep 5: Marking top agents as featured...")
     
-    # Find all agents across all agencies
-    all_agents = []
-    for agency_id, agency_data in agencies_data.items():
-        for agent_id, agent_data in agency_data["agents"].items():
-            if agent_data["total_sales"] > 0:  # Only include agents with sales
-                all_agents.append((agency_id, agent_id, agent_data["total_sales"]))
-    
-    # Sort by total sales (descending)
-    all_agents.sort(key=lambda x: x[2], reverse=True)
+    # Find the top agent (by total sales) across all agencies
+    best_agent = top_agent(
+        agent_data
+        for agency_data in agencies_data.values()
+        for agent_data in agency_data["agents"].values()
+        if agent_data["total_sales"] > 0  # Only include agents with sales
+    )
     
     # Mark the top agent as featured
-    if all_agents:
-        top_agency_id, top_agent_id, _ = all_agents[0]
-        agencies_data[top_agency_id]["agents"][top_agent_id]["featured"] = True
-        agent_name = agencies_data[top_agency_id]["agents"][top_agent_id]["name"]
-        print(f"\nMarked {agent_name} as featured agent")
+    if best_agent is not None:
+        best_agent["featured"] = True
+        print(f"\nMarked {best_agent['name']} as featured agent")
     
     logger.info(f"Calculated metrics for agents in {suburb}")
     
@@ -1,21 +1,39 @@
 import os
-import requests
+import asyncio
 import logging
 import json
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from supabase import create_client
+from .http_client import get_domain_client, get_async_client
+from .agency_cache import get_cached_agency
+from .featured_agents_index import lookup_featured_rows, query_featured_rows, scan_featured_rows, schedule_featured_index_build
+from .supabase_client import get_supabase
+from .subscription_cache import get_cached_subscriptions, set_cached_subscriptions
+from .subscription_status import lookup_standard_subscriptions
 load_dotenv()
 # Domain.com.au API credentials
 DOMAIN_API_KEY = os.getenv("DOMAIN_API_KEY")
 DOMAIN_API_SECRET = os.getenv("DOMAIN_API_SECRET")
+# Bounded fan-out settings for bulk agency lookups
+DOMAIN_AGENCY_CONCURRENCY = int(os.getenv("DOMAIN_AGENCY_CONCURRENCY", "8"))
+DOMAIN_AGENCY_TIMEOUT = float(os.getenv("DOMAIN_AGENCY_TIMEOUT", "15"))
+# Make.com standard subscription webhook and its fan-out limit
+STANDARD_SUBSCRIPTION_WEBHOOK_URL = "https://hook.eu2.make.com/gne36wgwoje49c54gwrz8lnf749mxw3e"
+STD_SUB_CONCURRENCY = int(os.getenv("STD_SUB_CONCURRENCY", "6"))
+# Use the webhook when the local agents_subscribed set cannot be loaded
+STD_SUB_WEBHOOK_FALLBACK = os.getenv("STD_SUB_WEBHOOK_FALLBACK", "true").lower() == "true"
 # Set up logging with more detailed configuration
 logger = logging.getLogger("articflow.domain.utils")
 
-def _get_supabase():
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    return create_client(url, key)
+def _query_featured_rows(suburb, state):
+    """Featured rows for a suburb straight from Supabase (blocking; run in a thread)"""
+    sb = get_supabase()
+    try:
+        return query_featured_rows(suburb, state, sb), "suburb_states query"
+    except Exception as e:
+        # Column missing (migration not run) - fall back to the full scan
+        logger.warning(f"subscribed_suburb_states query failed, scanning agent_subscriptions: {e}")
+        return scan_featured_rows(suburb, state, sb), "full scan"
 
 def format_price(price):
     """Format a price value as a string with appropriate units (k or m)"""
@@ -39,28 +57,15 @@ async def check_featured_agent(suburb, state):
         Each agent will have an additional 'is_featured_plus' boolean field.
     """
     try:
-        sb = _get_supabase()
-        suburb_upper = suburb.strip().upper()
-        state_upper = state.strip().upper()
-
-        # subscribed_suburbs entries are stored as "SUBURB|STATE|POSTCODE"
-        # We fetch all rows and filter in Python — avoids needing Postgres array operators via REST
-        rows = sb.table("agent_subscriptions").select(
-            "name,email,phone,subscription_type,manually_pull_data,agent_photo,agency_photo,agency,"
-            "subscribed_suburbs,ad_group,mrr,total_sales,total_sales_value,median_sold_price"
-        ).execute().data
+        # 1. Redis SUBURB|STATE index (None when the index is not built yet)
+        matched = lookup_featured_rows(suburb, state)
+        source = "index"
 
-        matched = []
-        for row in rows:
-            suburbs = row.get("subscribed_suburbs") or []
-            for entry in suburbs:
-                parts = entry.split("|")
-                if len(parts) >= 2:
-                    entry_suburb = parts[0].strip().upper()
-                    entry_state  = parts[1].strip().upper()
-                    if entry_suburb == suburb_upper and entry_state == state_upper:
-                        matched.append(row)
-                        break
+        if matched is None:
+            # 2. GIN-indexed containment query on subscribed_suburb_states, off the event loop
+            matched, source = await asyncio.to_thread(_query_featured_rows, suburb, state)
+            # Build the index for later reports without holding up this one
+            schedule_featured_index_build()
 
         if not matched:
             logger.info(f"No featured agents found for {suburb}, {state}")
@@ -88,27 +93,20 @@ async def check_featured_agent(suburb, state):
             })
             logger.info(f"Agent {row.get('name')} | type={subscription_type} | is_featured_plus={subscription_type == 'Featured Plus'}")
 
-        logger.info(f"Found {len(result)} featured agents for {suburb}, {state} (via Supabase)")
+        logger.info(f"Found {len(result)} featured agents for {suburb}, {state} (via {source})")
         return result
 
     except Exception as e:
         logger.error(f"Error checking featured agents via Supabase: {e}")
         return None
 
-async def check_standard_subscription(agent_name, suburb, state):
+async def _post_standard_subscription_check(agent_name, suburb, state):
     """
-    Check if an agent has a standard subscription by calling the Make.com webhook
-    
-    Args:
-        agent_name: The name of the agent to check
-        suburb: The suburb to check for
-        state: The state to check for
-        
+    Ask the Make.com webhook whether an agent has a standard subscription
+
     Returns:
-        Boolean indicating whether the agent has a standard subscription
+        Boolean result, or None if the webhook call failed (not cached)
     """
-    webhook_url = "https://hook.eu2.make.com/gne36wgwoje49c54gwrz8lnf749mxw3e"
-    
     try:
         # Prepare the data to send to the webhook
         data = {
@@ -117,8 +115,8 @@ async def check_standard_subscription(agent_name, suburb, state):
             "state": state
         }
         
-        # Make the POST request to the webhook
-        response = requests.post(webhook_url, json=data)
+        # Make the POST request to the webhook over the shared connection pool
+        response = await get_async_client("make_webhook", STD_SUB_CONCURRENCY).post(STANDARD_SUBSCRIPTION_WEBHOOK_URL, json=data)
         
         # Check if the request was successful
         if response.status_code == 200:
@@ -146,10 +144,78 @@ async def check_standard_subscription(agent_name, suburb, state):
             return has_subscription
         else:
             logger.error(f"Failed to check standard subscription status: {response.status_code} - {response.text}")
-            return False
+            return None
     except Exception as e:
         logger.error(f"Error checking standard subscription status: {e}")
-        return False
+        return None
+
+async def check_standard_subscription(agent_name, suburb, state):
+    """
+    Check if an agent has a standard subscription (local agents_subscribed
+    set, with the Make.com webhook as fallback)
+    
+    Args:
+        agent_name: The name of the agent to check
+        suburb: The suburb to check for
+        state: The state to check for
+        
+    Returns:
+        Boolean indicating whether the agent has a standard subscription
+    """
+    results = await check_standard_subscriptions_bulk([agent_name], suburb, state)
+    return results.get(agent_name, False)
+
+async def check_standard_subscriptions_bulk(agent_names, suburb, state, concurrency=None):
+    """
+    Check standard subscriptions for several agents
+    
+    Results come from the local agents_subscribed set. If it is unavailable
+    (see subscription_status) and STD_SUB_WEBHOOK_FALLBACK is on, agents are
+    checked against the webhook instead: shared Redis cache first, then at most
+    `concurrency` requests in flight. Failed webhook calls count as no
+    subscription and are not cached.
+    
+    Args:
+        agent_names: Agent names to check (duplicates are checked once)
+        suburb: The suburb to check for
+        state: The state to check for
+        concurrency: Maximum simultaneous webhook calls
+        
+    Returns:
+        Dictionary mapping agent_name to a boolean
+    """
+    names = list(dict.fromkeys(agent_names))
+    if not names:
+        return {}
+    
+    # Served from the local agents_subscribed set when it is available
+    local = lookup_standard_subscriptions(names, suburb, state)
+    if local is not None:
+        return local
+    if not STD_SUB_WEBHOOK_FALLBACK:
+        logger.warning(f"Standard subscription set unavailable, treating {len(names)} agents as unsubscribed")
+        return {name: False for name in names}
+    
+    results = get_cached_subscriptions(names, suburb, state)
+    pending = [name for name in names if name not in results]
+    if results:
+        logger.info(f"Standard subscription cache hits for {len(results)}/{len(names)} agents in {suburb}")
+    if not pending:
+        return results
+    
+    semaphore = asyncio.Semaphore(concurrency or STD_SUB_CONCURRENCY)
+    
+    async def check_one(agent_name):
+        async with semaphore:
+            return await _post_standard_subscription_check(agent_name, suburb, state)
+    
+    checked = await asyncio.gather(*(check_one(name) for name in pending))
+    fresh = {name: has_sub for name, has_sub in zip(pending, checked) if has_sub is not None}
+    set_cached_subscriptions(fresh, suburb, state)
+    
+    for name, has_sub in zip(pending, checked):
+        results[name] = bool(has_sub)
+    return results
 
 def get_mock_property_data(property_id, agent_id=None, featured_agent_id=None, job_id=None, suburb=None):
     """Generate mock property and agent data for prototype"""
@@ -355,8 +421,8 @@ async def get_listing_details(listing_id):
     }
     
     try:
-        # Make the API request
-        response = requests.get(url, headers=headers)
+        # Make the API request over the shared connection pool
+        response = await get_domain_client().get(url, headers=headers)
         
         # Check if the request was successful
         if response.status_code == 200:
@@ -369,14 +435,14 @@ async def get_listing_details(listing_id):
     except Exception as e:
         logger.error(f"Error retrieving listing details: {str(e)}")
         return None
-async def get_agency_details(agency_id):
-    """
-    Retrieve details for a specific agency using Domain.com.au API
+async def _fetch_agency_record(agency_id):
     """
-    if not DOMAIN_API_KEY:
-        logger.error("Domain API key not found. Please set DOMAIN_API_KEY environment variable.")
-        return None
+    Fetch an agency record from Domain.com.au API (uncached)
     
+    Returns:
+        Tuple of (status_code, agency_details). status_code is None when the
+        request itself failed.
+    """
     logger.info(f"Retrieving details for agency ID: {agency_id}")
     
     # API endpoint
@@ -389,20 +455,66 @@ async def get_agency_details(agency_id):
     }
     
     try:
-        # Make the API request
-        response = requests.get(url, headers=headers)
+        # Make the API request over the shared connection pool
+        response = await get_domain_client().get(url, headers=headers)
         
         # Check if the request was successful
         if response.status_code == 200:
             agency_details = response.json()
             logger.info(f"Successfully retrieved details for agency ID: {agency_id}")
-            return agency_details
+            return response.status_code, agency_details
         else:
             logger.error(f"API request failed with status code {response.status_code}: {response.text}")
-            return None
+            return response.status_code, None
     except Exception as e:
         logger.error(f"Error retrieving agency details: {str(e)}")
+        return None, None
+
+async def get_agency_details(agency_id):
+    """
+    Retrieve details for a specific agency using Domain.com.au API
+    
+    Lookups go through the shared Redis agency cache, so agencies already
+    fetched by any worker are not requested from Domain again.
+    """
+    if not DOMAIN_API_KEY:
+        logger.error("Domain API key not found. Please set DOMAIN_API_KEY environment variable.")
         return None
+    
+    return await get_cached_agency(agency_id, _fetch_agency_record)
+
+
+async def get_agency_details_bulk(agency_ids, concurrency=DOMAIN_AGENCY_CONCURRENCY, timeout=DOMAIN_AGENCY_TIMEOUT):
+    """
+    Retrieve details for many agencies concurrently
+    
+    At most `concurrency` requests are in flight at once and each lookup is
+    capped at `timeout` seconds. A failed or timed out lookup maps to None so
+    callers can apply their own fallback without losing the other results.
+    
+    Args:
+        agency_ids: Iterable of Domain agency IDs
+        concurrency: Maximum number of simultaneous requests
+        timeout: Per-request timeout in seconds
+        
+    Returns:
+        Dictionary of agency ID -> agency details (or None)
+    """
+    agency_ids = list(dict.fromkeys(agency_ids))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def _fetch(agency_id):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(get_agency_details(agency_id), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out after {timeout}s retrieving details for agency ID: {agency_id}")
+            except Exception as e:
+                logger.error(f"Error retrieving details for agency ID {agency_id}: {str(e)}")
+            return None
+    
+    results = await asyncio.gather(*(_fetch(agency_id) for agency_id in agency_ids))
+    return dict(zip(agency_ids, results))
 
 
 async def get_agent_details(agent_name, agency_name=None):
@@ -441,9 +553,11 @@ async def get_agent_details(agent_name, agency_name=None):
         "query": agent_name
     }
     
+    domain_client = get_domain_client()
+    
     try:
         # Make the API request to search for agents
-        response = requests.get(agent_search_url, headers=headers, params=params)
+        response = await domain_client.get(agent_search_url, headers=headers, params=params)
         
         # Check if the request was successful
         if response.status_code == 200:
@@ -484,7 +598,7 @@ async def get_agent_details(agent_name, agency_name=None):
             }
             
             # Make the API request to search for the agency
-            agency_response = requests.get(agency_search_url, headers=headers, params=agency_params)
+            agency_response = await domain_client.get(agency_search_url, headers=headers, params=agency_params)
             
             if agency_response.status_code == 200:
                 agencies = agency_response.json()
@@ -494,7 +608,7 @@ async def get_agent_details(agent_name, agency_name=None):
                     
                     # Step 3: Get agency logo
                     agency_details_url = f"https://api.domain.com.au/v1/agencies/{agency_id}"
-                    agency_details_response = requests.get(agency_details_url, headers=headers)
+                    agency_details_response = await domain_client.get(agency_details_url, headers=headers)
                     
                     if agency_details_response.status_code == 200:
                         agency_details = agency_details_response.json()
@@ -0,0 +1,184 @@
+"""
+Featured Agents Index
+Suburb-keyed lookup of agent_subscriptions rows so the featured-agent check
+only touches the agents subscribed to the report suburb.
+
+Lookup order used by check_featured_agent:
+1. Redis hash SUBURB|STATE -> [agent rows], rebuilt whenever agent_subscriptions
+   is re-imported (scripts/import_agent_subscriptions.py, the sheets /sync
+   endpoint or the rebuild endpoint) and built at worker warm-up. A report
+   never waits for a build: on a cold index it uses step 2 while the index
+   is built in the background
+2. GIN-indexed containment query on agent_subscriptions.subscribed_suburb_states
+   (supabase/migrations/add-agent-subscriptions-suburb-states.sql)
+"""
+import os
+import json
+import asyncio
+import logging
+from collections import defaultdict
+
+from .supabase_client import get_supabase
+from .cache import get_redis, acquire_lock, release_lock
+
+logger = logging.getLogger("articflow.featured_index")
+
+FEATURED_AGENT_COLUMNS = (
+    "name,email,phone,subscription_type,manually_pull_data,agent_photo,agency_photo,agency,"
+    "subscribed_suburbs,ad_group,mrr,total_sales,total_sales_value,median_sold_price"
+)
+
+# Safety expiry so a missed rebuild hook heals itself on the next lookup
+FEATURED_INDEX_TTL = int(os.getenv("FEATURED_INDEX_TTL", str(24 * 3600)))
+FEATURED_INDEX_PAGE_SIZE = 1000
+FEATURED_INDEX_BUILD_LOCK_TTL = 120
+
+# Table the index is built from (a sheets sync into it triggers a rebuild)
+FEATURED_INDEX_TABLE = "agent_subscriptions"
+
+INDEX_KEY = "featured_index"
+BUILT_KEY = f"{INDEX_KEY}:built"
+BUILD_LOCK_KEY = f"{INDEX_KEY}:build"
+
+# Background build started by this process, if one is running
+_background_build = None
+
+
+def suburb_state_key(suburb, state):
+    """Normalise a suburb/state pair to the SUBURB|STATE index key"""
+    return f"{suburb.strip().upper()}|{state.strip().upper()}"
+
+
+def _row_suburb_keys(row):
+    """Distinct SUBURB|STATE keys for a row (subscribed_suburbs is SUBURB|STATE|POSTCODE)"""
+    keys = set()
+    for entry in row.get("subscribed_suburbs") or []:
+        parts = entry.split("|")
+        if len(parts) >= 2:
+            keys.add(suburb_state_key(parts[0], parts[1]))
+    return keys
+
+
+def _fetch_all_subscriptions(sb):
+    """Page through agent_subscriptions (PostgREST caps a single response)"""
+    rows = []
+    start = 0
+    while True:
+        page = sb.table(FEATURED_INDEX_TABLE).select(FEATURED_AGENT_COLUMNS).range(
+            start, start + FEATURED_INDEX_PAGE_SIZE - 1
+        ).execute().data or []
+        rows.extend(page)
+        if len(page) < FEATURED_INDEX_PAGE_SIZE:
+            return rows
+        start += FEATURED_INDEX_PAGE_SIZE
+
+
+def group_rows_by_suburb(rows):
+    """Group agent_subscriptions rows into {SUBURB|STATE: [rows]}"""
+    index = defaultdict(list)
+    for row in rows:
+        for key in _row_suburb_keys(row):
+            index[key].append(row)
+    return index
+
+
+def build_featured_index(sb=None):
+    """
+    Rebuild the Redis SUBURB|STATE -> [agent rows] index from agent_subscriptions
+
+    The new hash is written under a temporary key and renamed into place so
+    readers never see a half-built index.
+
+    Args:
+        sb: Optional Supabase client (defaults to the shared client)
+
+    Returns:
+        Number of suburb keys indexed
+    """
+    sb = sb or get_supabase()
+    rows = _fetch_all_subscriptions(sb)
+    index = group_rows_by_suburb(rows)
+
+    r = get_redis()
+    tmp_key = f"{INDEX_KEY}:tmp"
+    pipe = r.pipeline()
+    pipe.delete(tmp_key)
+    if index:
+        pipe.hset(tmp_key, mapping={key: json.dumps(matches) for key, matches in index.items()})
+        pipe.rename(tmp_key, INDEX_KEY)
+        pipe.expire(INDEX_KEY, FEATURED_INDEX_TTL)
+    else:
+        pipe.delete(INDEX_KEY)
+    pipe.set(BUILT_KEY, len(rows), ex=FEATURED_INDEX_TTL)
+    pipe.execute()
+
+    logger.info(f"Built featured agents index: {len(rows)} subscriptions across {len(index)} suburbs")
+    return len(index)
+
+
+def ensure_featured_index():
+    """Build the index if it is missing; only one worker builds at a time"""
+    try:
+        if get_redis().exists(BUILT_KEY):
+            return True
+    except Exception as e:
+        logger.warning(f"Featured index unavailable: {e}")
+        return False
+
+    if not acquire_lock(BUILD_LOCK_KEY, FEATURED_INDEX_BUILD_LOCK_TTL):
+        return False
+    try:
+        build_featured_index()
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to build featured agents index: {e}")
+        return False
+    finally:
+        release_lock(BUILD_LOCK_KEY)
+
+
+def schedule_featured_index_build():
+    """
+    Start ensure_featured_index() in a thread without waiting for it
+
+    Called from the report path when the index is cold, so the full table
+    scan and Redis write never hold up the event loop or the report.
+    """
+    global _background_build
+
+    if _background_build is not None and not _background_build.done():
+        return
+    _background_build = asyncio.get_running_loop().run_in_executor(None, ensure_featured_index)
+
+
+def lookup_featured_rows(suburb, state):
+    """
+    Look up agent_subscriptions rows for a suburb in the Redis index
+
+    Returns:
+        List of rows (possibly empty), or None if the index is not built
+    """
+    try:
+        r = get_redis()
+        raw = r.hget(INDEX_KEY, suburb_state_key(suburb, state))
+        if raw is None and not r.exists(BUILT_KEY):
+            return None
+    except Exception as e:
+        logger.warning(f"Featured index lookup failed: {e}")
+        return None
+    return json.loads(raw) if raw else []
+
+
+def query_featured_rows(suburb, state, sb=None):
+    """Fetch only the matching rows using the GIN-indexed subscribed_suburb_states column"""
+    sb = sb or get_supabase()
+    return sb.table(FEATURED_INDEX_TABLE).select(FEATURED_AGENT_COLUMNS).contains(
+        "subscribed_suburb_states", [suburb_state_key(suburb, state)]
+    ).execute().data or []
+
+
+def scan_featured_rows(suburb, state, sb=None):
+    """Full-table scan fallback for databases without the suburb_states migration"""
+    sb = sb or get_supabase()
+    key = suburb_state_key(suburb, state)
+    return [row for row in _fetch_all_subscriptions(sb) if key in _row_suburb_keys(row)]
@@ -1,11 +1,22 @@
 import os
+import asyncio
 import tempfile
 import logging
+import weakref
+import threading
+import multiprocessing
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor
 from datetime import datetime
-from weasyprint import HTML, CSS
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from weasyprint import HTML, CSS, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
 import uuid
 
+from .report_images import prefetch_report_images
+from .render_cache import RENDER_CACHE_TEMPLATES, render_cache_key, copy_cached_pdf, store_rendered_pdf
+
 logger = logging.getLogger("articflow.html_pdf")
 
 # Determine the directory of the current script (which is in app/services)
@@ -23,10 +34,126 @@ assets_dir = os.path.join(app_dir, "assets")
 print(f"Using assets Dir for WeasyPrint: {assets_dir}")
 os.makedirs(assets_dir, exist_ok=True)
 
-# Set up Jinja2 environment for templates
+# Set up Jinja2 environment for templates. Compiled templates are kept on disk
+# (keyed by template source), so a new worker process loads them instead of
+# compiling them again. Templates are not re-checked for changes on every
+# render unless TEMPLATE_AUTO_RELOAD=true (local development).
 template_dir = os.path.join(app_dir, "templates")
 os.makedirs(template_dir, exist_ok=True)
-env = Environment(loader=FileSystemLoader(template_dir))
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", os.path.join(os.path.dirname(app_dir), "temp", "jinja_cache"))
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "false").lower() == "true"
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+env = Environment(
+    loader=FileSystemLoader(template_dir),
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+    auto_reload=TEMPLATE_AUTO_RELOAD
+)
+
+
+def precompile_templates():
+    """
+    Compile every report template into the Jinja caches
+    
+    Run at image build and worker start, so the first report a worker
+    renders does not pay for parsing and compiling its template.
+    
+    Returns:
+        Number of templates compiled
+    """
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        env.get_template(name)
+    logger.info(f"Precompiled {len(names)} report templates into {TEMPLATE_CACHE_DIR}")
+    return len(names)
+
+# WeasyPrint rendering is CPU bound and blocks, so it runs in a pool of
+# processes; the event loop keeps other reports' network I/O and status
+# updates going while a PDF renders. PDF_RENDER_PROCESSES=0 renders on
+# PDF_RENDER_THREADS threads instead (less memory, but renders share the GIL).
+PDF_RENDER_PROCESSES = int(os.getenv("PDF_RENDER_PROCESSES", str(os.cpu_count() or 1)))
+PDF_RENDER_THREADS = int(os.getenv("PDF_RENDER_THREADS", "2"))
+PDF_RENDER_TIMEOUT = int(os.getenv("PDF_RENDER_TIMEOUT", "180"))  # Seconds per render
+
+_render_executor = None
+_render_slots = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+_discarded_executors = weakref.WeakSet()  # Pools restarted by _discard_render_executor
+
+def _render_pool_size():
+    return PDF_RENDER_PROCESSES if PDF_RENDER_PROCESSES > 0 else max(1, PDF_RENDER_THREADS)
+
+def get_render_executor():
+    """The render pool, created on first use (render processes start on demand)"""
+    global _render_executor
+    if _render_executor is None:
+        if PDF_RENDER_PROCESSES > 0:
+            # Spawned, not forked: the parent already runs an event loop and threads
+            _render_executor = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _render_executor = ThreadPoolExecutor(max_workers=_render_pool_size(), thread_name_prefix="pdf-render")
+        logger.info(f"Created PDF render pool: {type(_render_executor).__name__} with {_render_pool_size()} workers")
+    return _render_executor
+
+def _discard_render_executor(executor):
+    """
+    Replace a broken or stuck render pool; the next render creates a new one
+    
+    A render that is already running cannot be cancelled, only its process
+    killed, and the pool does not say which process runs which render, so
+    every render process is terminated. The other renders in flight on the
+    pool then fail with BrokenExecutor and run_render retries them.
+    """
+    global _render_executor
+    if _render_executor is executor:
+        _render_executor = None
+    _discarded_executors.add(executor)
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False)
+
+async def run_render(func, *args):
+    """
+    Run a blocking render function on the render pool
+    
+    At most one render per pool worker is submitted from each event loop;
+    further renders wait here instead of piling up in the pool's queue. A
+    render that exceeds PDF_RENDER_TIMEOUT raises asyncio.TimeoutError and
+    the pool is restarted so the stuck render stops holding a worker. The
+    restart kills every render process; renders that fail only because of
+    it (their pool was already discarded) are retried once on the new pool.
+    
+    Args:
+        func: Module-level function (it is pickled to the render process)
+        *args: Picklable arguments for func
+        
+    Returns:
+        The return value of func
+    """
+    loop = asyncio.get_running_loop()
+    slots = _render_slots.get(loop)
+    if slots is None:
+        slots = _render_slots[loop] = asyncio.Semaphore(_render_pool_size())
+    if slots.locked():
+        logger.info("PDF render pool busy, waiting for a free slot")
+    
+    async with slots:
+        for attempt in range(2):
+            executor = get_render_executor()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(executor, func, *args), PDF_RENDER_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error(f"PDF render timed out after {PDF_RENDER_TIMEOUT}s, restarting render pool")
+                _discard_render_executor(executor)
+                raise
+            except BrokenExecutor:
+                if attempt == 0 and executor in _discarded_executors:
+                    logger.warning("PDF render interrupted by a render pool restart, retrying")
+                    continue
+                logger.error("PDF render pool broken (render process died), restarting it")
+                _discard_render_executor(executor)
+                raise
 
 async def generate_agents_report_html(data):
     template = env.get_template("agents_report.html")
@@ -39,19 +166,111 @@ async def generate_agents_report_html(data):
     html_content = template.render(**template_data)
     return html_content
 
-async def html_to_pdf(html_content, css_files=None, output_path=None):
-    if not output_path:
-        temp_dir = tempfile.gettempdir()
-        output_path = os.path.join(temp_dir, f"report_{int(datetime.now().timestamp())}.pdf")
+# Resources that are the same for every report: template assets (file: URLs)
+# and the Google Fonts stylesheets and font files the templates link to
+CACHED_URL_HOSTS = {"fonts.googleapis.com", "fonts.gstatic.com"}
+# Decoded images kept between renders (agent photos, logos, backgrounds)
+RENDER_IMAGE_CACHE_SIZE = int(os.getenv("RENDER_IMAGE_CACHE_SIZE", "200"))
+
+_fetched_resources = {}  # URL -> fetched resource, shared by every renderer in the process
+_renderers = threading.local()
+
+
+def cached_url_fetcher(url, timeout=10, ssl_context=None):
+    """
+    WeasyPrint url_fetcher that keeps template assets and web fonts in memory
     
-    css_list = []
+    Agent photos and agency logos differ per report and go straight to
+    WeasyPrint's default fetcher.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        # App assets only; prefetched report images (report_images.py) are per report
+        cacheable = os.path.abspath(url2pathname(parsed.path)).startswith(app_dir + os.sep)
+    else:
+        cacheable = parsed.hostname in CACHED_URL_HOSTS
+    if not cacheable:
+        return default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+    
+    resource = _fetched_resources.get(url)
+    if resource is None:
+        result = default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+        if "file_obj" in result:
+            file_obj = result.pop("file_obj")
+            try:
+                result["string"] = file_obj.read()
+            finally:
+                file_obj.close()
+        resource = _fetched_resources[url] = result
+    return dict(resource)
+
+
+class PdfRenderer:
+    """
+    WeasyPrint state reused across renders: parsed stylesheets, loaded fonts
+    and decoded images
+    
+    Not thread safe; get_renderer() keeps one per render thread.
+    """
+    
+    def __init__(self, css_paths):
+        self.font_config = FontConfiguration()
+        self.image_cache = {}
+        self.stylesheets = [
+            CSS(filename=css_path, base_url=base_url, font_config=self.font_config, url_fetcher=cached_url_fetcher)
+            for css_path in css_paths
+        ]
+        logger.info(f"PDF renderer ready in thread {threading.current_thread().name} ({len(css_paths)} stylesheets)")
+    
+    def write_pdf(self, html_content, target=None):
+        """
+        Render HTML to PDF
+        
+        Args:
+            html_content: HTML string, relative URLs resolved against the templates folder
+            target: Output path, or None to return the PDF
+            
+        Returns:
+            PDF bytes if target is None, otherwise None
+        """
+        # Images are only dropped between renders; a document may still reference them while it renders
+        if len(self.image_cache) > RENDER_IMAGE_CACHE_SIZE:
+            self.image_cache.clear()
+        html = HTML(string=html_content, base_url=base_url, url_fetcher=cached_url_fetcher)
+        return html.write_pdf(
+            target,
+            stylesheets=self.stylesheets,
+            font_config=self.font_config,
+            optimize_images=True,
+            cache=self.image_cache
+        )
+
+
+def get_renderer(css_paths):
+    """This thread's PdfRenderer for the given stylesheets, created on first use"""
+    cache = getattr(_renderers, "by_stylesheets", None)
+    if cache is None:
+        cache = _renderers.by_stylesheets = {}
+    key = tuple(css_paths)
+    renderer = cache.get(key)
+    if renderer is None:
+        renderer = cache[key] = PdfRenderer(css_paths)
+    return renderer
+
+
+def _write_pdf(html_content, css_paths, output_path):
+    get_renderer(css_paths).write_pdf(html_content, output_path)
+
+
+def _resolve_css_paths(css_files):
+    css_paths = []
     if css_files:
         for css_file in css_files:
             css_path = os.path.join(template_dir, "css", css_file)
             # Convert backslashes to forward slashes for WeasyPrint
             css_path = css_path.replace('\\', '/')
             if os.path.exists(css_path):
-                css_list.append(CSS(filename=css_path, base_url=base_url))
+                css_paths.append(css_path)
                 logger.info(f"Added CSS file: {css_path}")
             else:
                 # Try with alternative name (styles.css vs style.css)
@@ -59,17 +278,48 @@ async def html_to_pdf(html_content, css_files=None, output_path=None):
                 alternative_path = os.path.join(template_dir, "css", alternative_name)
                 alternative_path = alternative_path.replace('\\', '/')
                 if os.path.exists(alternative_path):
-                    css_list.append(CSS(filename=alternative_path, base_url=base_url))
+                    css_paths.append(alternative_path)
                     logger.info(f"CSS file {css_file} not found, using alternative: {alternative_path}")
                 else:
                     logger.warning(f"CSS file not found: {css_path} or {alternative_path}")
+    return css_paths
+
+
+def render(template_name, context, css_files=("styles.css",)):
+    """
+    Render a template to PDF bytes in the calling thread
+    
+    Args:
+        template_name: HTML template in app/templates
+        context: Template variables
+        css_files: Stylesheets from app/templates/css
+        
+    Returns:
+        The PDF as bytes
+    """
+    html_content = env.get_template(template_name).render(**context)
+    return get_renderer(_resolve_css_paths(css_files)).write_pdf(html_content)
+
+
+async def html_to_pdf(html_content, css_files=None, output_path=None, use_render_cache=False):
+    if not output_path:
+        temp_dir = tempfile.gettempdir()
+        output_path = os.path.join(temp_dir, f"report_{int(datetime.now().timestamp())}.pdf")
+    
+    css_paths = _resolve_css_paths(css_files)
+    
+    # Identical HTML renders to an identical PDF (see render_cache.py)
+    cache_key = render_cache_key(html_content, css_paths) if use_render_cache else None
+    if cache_key and await asyncio.to_thread(copy_cached_pdf, cache_key, output_path):
+        logger.info(f"PDF copied from render cache to {output_path}")
+        return output_path
     
     try:
-        # Create HTML object with the proper base_url
-        html = HTML(string=html_content, base_url=base_url)
-        # Write PDF with CSS stylesheets
-        html.write_pdf(output_path, stylesheets=css_list ,optimize_images=True)
+        # Render in the pool; _write_pdf applies the stylesheets and writes output_path
+        await run_render(_write_pdf, html_content, css_paths, output_path)
         logger.info(f"PDF generated successfully at {output_path}")
+        if cache_key:
+            await asyncio.to_thread(store_rendered_pdf, cache_key, output_path)
         return output_path
     except Exception as e:
         logger.error(f"Error generating PDF: {e}", exc_info=True)
@@ -116,9 +366,13 @@ async def generate_pdf_with_weasyprint(data, job_id=None, template_name="propert
     # CSS files to include
     css_files = ["styles.css"]
     
+    # Download and downsize remote photos and logos up front, not during the render
+    data = await prefetch_report_images(data)
+    
     # Check if this is a property report or agents report
     if "top_agents" in data:
         # This is an agents report
+        template_name = "agents_report.html"
         html_content = await generate_agents_report_html(data)
     else:
         # This is a property report
@@ -126,5 +380,8 @@ async def generate_pdf_with_weasyprint(data, job_id=None, template_name="propert
         html_content = template.render(**data)
     
     # Generate PDF from HTML
-    pdf_path = await html_to_pdf(html_content, css_files, output_path)
+    pdf_path = await html_to_pdf(
+        html_content, css_files, output_path,
+        use_render_cache=template_name in RENDER_CACHE_TEMPLATES
+    )
     return pdf_path
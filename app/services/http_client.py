@@ -0,0 +1,116 @@
+"""
+Shared Async HTTP Clients
+Pooled httpx clients reused across Domain.com.au API calls
+"""
+import os
+import asyncio
+import logging
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("articflow.http")
+
+# Pool and timeout settings (overridable per deployment)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+# HTTP/2 needs the optional h2 package (installed via httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# name -> (event loop, client). httpx connections are bound to the loop that
+# opened them, so a client is only reused while its loop is still running.
+_clients = {}
+
+
+def _build_client(max_connections):
+    """Create a pooled AsyncClient with keep-alive, timeouts and HTTP/2 where possible"""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(HTTP_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=HTTP2_AVAILABLE)
+
+
+def _close_sockets(client):
+    """
+    Close a client's pooled sockets without its event loop
+
+    Used when the loop that owns the client is closed or not running (e.g. a
+    loop inherited across fork()), so aclose() cannot be awaited there.
+    """
+    pool = getattr(client._transport, "_pool", None)
+    for connection in list(getattr(pool, "connections", None) or []):
+        stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+        sock = stream.get_extra_info("socket") if stream is not None else None
+        if sock is not None:
+            # asyncio hands out a TransportSocket wrapper; close the socket it wraps
+            getattr(sock, "_sock", sock).close()
+
+
+def _discard_client(name, client_loop, client):
+    """Release the connection pool of a client that is being replaced"""
+    if client.is_closed:
+        return
+    try:
+        if client_loop.is_running():
+            # Still in use on another thread's loop: close it there
+            asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+        else:
+            _close_sockets(client)
+    except Exception as e:
+        logger.warning(f"Error closing replaced '{name}' HTTP client: {e}")
+
+
+def get_async_client(name, max_connections=HTTP_MAX_CONNECTIONS):
+    """
+    Get the shared AsyncClient registered under name for the running event loop
+
+    Args:
+        name: Pool name (one pool per upstream host)
+        max_connections: Connection limit for this pool
+
+    Returns:
+        httpx.AsyncClient
+    """
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(name)
+    if entry:
+        client_loop, client = entry
+        if client_loop is loop and not client.is_closed:
+            return client
+        logger.debug(f"Discarding '{name}' HTTP client bound to a previous event loop")
+        _discard_client(name, client_loop, client)
+
+    client = _build_client(max_connections)
+    _clients[name] = (loop, client)
+    logger.info(f"Created '{name}' HTTP client (http2={HTTP2_AVAILABLE}, max_connections={max_connections})")
+    return client
+
+
+def get_domain_client():
+    """Get the pooled client used for every Domain.com.au API call"""
+    return get_async_client("domain")
+
+
+async def close_http_clients():
+    """Close every client owned by the running event loop"""
+    loop = asyncio.get_running_loop()
+    for name, (client_loop, client) in list(_clients.items()):
+        if client_loop is not loop:
+            continue
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing '{name}' HTTP client: {e}")
+        _clients.pop(name, None)
@@ -0,0 +1,106 @@
+"""
+Leaderboard Materialization Job
+Recomputes suburb leaderboard snapshots (leaderboards.py) for every suburb
+with an active subscription in agents_subscribed.
+
+Refresh is incremental: each run only recomputes suburbs whose snapshot is
+missing or older than LEADERBOARD_REFRESH_AGE, oldest first.
+
+Run on a schedule via scripts/materialize_leaderboards.py (cron) or by
+enqueueing worker_tasks.materialize_leaderboards_task.
+"""
+import os
+import time
+import logging
+
+from .supabase_client import get_supabase
+from .domain_service import get_agent_performance_metrics, build_agent_leaderboard
+from .leaderboards import (
+    DEFAULT_FILTERS, LEADERBOARD_REFRESH_AGE,
+    leaderboard_key, store_leaderboard_snapshot, get_snapshot_ages
+)
+
+logger = logging.getLogger("articflow.leaderboard_materializer")
+
+# Upper bound on suburbs recomputed per run (keeps Domain API usage bounded)
+LEADERBOARD_BATCH_SIZE = int(os.getenv("LEADERBOARD_BATCH_SIZE", "200"))
+
+
+def get_subscribed_suburbs():
+    """
+    Distinct subscribed suburbs as (suburb, state, postcode) tuples
+
+    One tuple per SUBURB|STATE snapshot key; the first row's postcode is kept.
+    """
+    sb = get_supabase()
+    suburbs = {}
+    start = 0
+    while True:
+        page = sb.table("agents_subscribed").select("suburb,state,postcode").range(start, start + 999).execute().data or []
+        for row in page:
+            suburb = (row.get("suburb") or "").strip()
+            state = (row.get("state") or "").strip().upper()
+            if not suburb or not state:
+                continue
+            postcode = (row.get("postcode") or "").strip() or None
+            suburbs.setdefault(leaderboard_key(suburb, state), (suburb, state, postcode))
+        if len(page) < 1000:
+            return list(suburbs.values())
+        start += 1000
+
+
+async def materialize_suburb_leaderboard(suburb, state, post_code=None):
+    """
+    Compute and store the default-filter leaderboard for one suburb
+
+    Returns:
+        Number of agents in the stored leaderboard
+    """
+    filters = {name: value for name, value in DEFAULT_FILTERS.items() if name != "property_types"}
+    agencies_data = await get_agent_performance_metrics(suburb, state, post_code=post_code, **filters)
+    agents_list = build_agent_leaderboard(agencies_data)
+    store_leaderboard_snapshot(suburb, state, post_code, agents_list)
+    return len(agents_list)
+
+
+async def materialize_leaderboards(force=False, limit=None):
+    """
+    Refresh stale or missing leaderboard snapshots for subscribed suburbs
+
+    Args:
+        force: Recompute every subscribed suburb regardless of snapshot age
+        limit: Maximum suburbs to recompute this run (default LEADERBOARD_BATCH_SIZE)
+
+    Returns:
+        Summary dictionary with refreshed, skipped and failed counts
+    """
+    suburbs = get_subscribed_suburbs()
+    ages = {} if force else get_snapshot_ages()
+    now = time.time()
+
+    due = []
+    for suburb, state, postcode in suburbs:
+        computed_at = ages.get(leaderboard_key(suburb, state), 0)
+        if force or now - computed_at > LEADERBOARD_REFRESH_AGE:
+            due.append((computed_at, suburb, state, postcode))
+    due.sort(key=lambda item: item[0])
+    due = due[:limit or LEADERBOARD_BATCH_SIZE]
+
+    logger.info(f"Materializing {len(due)} of {len(suburbs)} subscribed suburb leaderboards")
+    refreshed = 0
+    failed = []
+    for _, suburb, state, postcode in due:
+        try:
+            agent_count = await materialize_suburb_leaderboard(suburb, state, postcode)
+            refreshed += 1
+            logger.info(f"Materialized leaderboard for {suburb}, {state} {postcode or ''}: {agent_count} agents")
+        except Exception as e:
+            logger.error(f"Failed to materialize leaderboard for {suburb}, {state}: {e}")
+            failed.append(f"{suburb}|{state}")
+
+    return {
+        "subscribed_suburbs": len(suburbs),
+        "refreshed": refreshed,
+        "skipped": len(suburbs) - len(due),
+        "failed": failed,
+    }
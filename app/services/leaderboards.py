@@ -0,0 +1,199 @@
+"""
+Suburb Leaderboard Snapshots
+Precomputed per-suburb agent and agency leaderboards (sales totals, joint
+sales, medians, merged branches) for suburbs with active subscriptions.
+
+Snapshots are written by the materialization job (leaderboard_materializer.py)
+to Supabase (suburb_leaderboards table) and Redis. Agents reports with default
+search filters read them instead of recomputing from raw listings.
+
+Snapshots are keyed by SUBURB|STATE (like the featured agents index): the
+materializer knows the subscription's postcode but a report request may not.
+The postcode a snapshot was computed with is kept in the snapshot, and a
+request naming a different postcode is not served from it.
+"""
+import os
+import time
+import logging
+from datetime import datetime, timezone
+
+from .cache import cache_get_compressed_json, cache_set_compressed_json
+from .supabase_client import get_supabase
+
+logger = logging.getLogger("articflow.leaderboards")
+
+# Snapshots older than this are not served (report falls back to live data)
+LEADERBOARD_MAX_AGE = int(os.getenv("LEADERBOARD_MAX_AGE", str(26 * 3600)))
+# The refresh job recomputes snapshots older than this
+LEADERBOARD_REFRESH_AGE = int(os.getenv("LEADERBOARD_REFRESH_AGE", str(20 * 3600)))
+
+TABLE_NAME = "suburb_leaderboards"
+KEY_PREFIX = "leaderboard"
+
+# Search filters the snapshots are computed with (AgentsReportRequest defaults)
+DEFAULT_FILTERS = {
+    "property_types": None,
+    "min_bedrooms": 1,
+    "max_bedrooms": None,
+    "min_bathrooms": 1,
+    "max_bathrooms": None,
+    "min_carspaces": 1,
+    "max_carspaces": None,
+    "include_surrounding_suburbs": False,
+    "region": None,
+    "area": None,
+    "min_land_area": None,
+    "max_land_area": None,
+}
+
+
+# Agent fields the agents report reads from a leaderboard entry; listing-level
+# data ("properties") is reduced to has_sold_price
+SNAPSHOT_AGENT_FIELDS = (
+    "name", "agency", "agency_logo", "photo",
+    "total_sales", "joint_sales", "total_value", "median_sold_price",
+    "total_sales_value_combined", "joint_sales_value_formatted",
+)
+
+
+def leaderboard_key(suburb, state):
+    """SUBURB|STATE key (same shape as featured_agents_index.suburb_state_key)"""
+    return f"{suburb.strip().upper()}|{state.strip().upper()}"
+
+
+def _normalize_postcode(post_code):
+    return str(post_code or "").strip()
+
+
+def snapshot_agent(agent):
+    """Reduce a leaderboard agent to the fields a report renders"""
+    entry = {field: agent[field] for field in SNAPSHOT_AGENT_FIELDS if field in agent}
+    entry["has_sold_price"] = any(
+        p.get("sold_price") is not None for p in (agent.get("properties") or {}).values()
+    )
+    return entry
+
+
+def uses_default_filters(**filters):
+    """True if a report request can be served from a snapshot"""
+    for name, default in DEFAULT_FILTERS.items():
+        value = filters.get(name, default)
+        if name == "property_types":
+            if value:
+                return False
+        elif value != default:
+            return False
+    return True
+
+
+def build_agency_leaderboard(agents_list):
+    """Aggregate a merged agent leaderboard into per-agency totals, best first"""
+    agencies = {}
+    for agent in agents_list:
+        name = agent.get("agency") or "N/A"
+        entry = agencies.setdefault(name, {
+            "name": name,
+            "logo": agent.get("agency_logo", "N/A"),
+            "agent_count": 0,
+            "total_sales": 0,
+            "joint_sales": 0,
+            "total_value": 0,
+        })
+        entry["agent_count"] += 1
+        entry["total_sales"] += agent.get("total_sales", 0)
+        entry["joint_sales"] += agent.get("joint_sales", 0)
+        entry["total_value"] += agent.get("total_value", 0)
+    return sorted(agencies.values(), key=lambda a: (a["total_sales"], a["total_value"]), reverse=True)
+
+
+def store_leaderboard_snapshot(suburb, state, post_code, agents_list):
+    """
+    Save a suburb's merged agent leaderboard (and derived agency leaderboard)
+
+    Returns:
+        The stored snapshot dictionary
+    """
+    key = leaderboard_key(suburb, state)
+    snapshot = {
+        "suburb_key": key,
+        "postcode": _normalize_postcode(post_code),
+        "computed_at": time.time(),
+        "agents": [snapshot_agent(agent) for agent in agents_list],
+        "agencies": build_agency_leaderboard(agents_list),
+    }
+    cache_set_compressed_json(f"{KEY_PREFIX}:{key}", snapshot, LEADERBOARD_MAX_AGE)
+
+    try:
+        get_supabase().table(TABLE_NAME).upsert({
+            "suburb_key": key,
+            "suburb": suburb.strip(),
+            "state": state.strip().upper(),
+            "postcode": snapshot["postcode"],
+            "agent_count": len(agents_list),
+            "snapshot": snapshot,
+            "computed_at": datetime.fromtimestamp(snapshot["computed_at"], timezone.utc).isoformat(),
+        }, on_conflict="suburb_key").execute()
+    except Exception as e:
+        logger.warning(f"Failed to persist leaderboard snapshot for {key}: {e}")
+
+    return snapshot
+
+
+def get_leaderboard_snapshot(suburb, state, post_code=None):
+    """
+    Get a fresh leaderboard snapshot (Redis first, then Supabase)
+
+    Args:
+        suburb: Suburb name
+        state: State abbreviation
+        post_code: Optional postcode from the report request; a snapshot
+            computed for a different postcode is not served
+
+    Returns:
+        Snapshot dictionary, or None if the suburb is cold or the snapshot is stale
+    """
+    key = leaderboard_key(suburb, state)
+    snapshot = cache_get_compressed_json(f"{KEY_PREFIX}:{key}")
+
+    if snapshot is None:
+        try:
+            rows = get_supabase().table(TABLE_NAME).select("snapshot").eq("suburb_key", key).limit(1).execute().data
+        except Exception as e:
+            logger.warning(f"Failed to read leaderboard snapshot for {key}: {e}")
+            return None
+        if not rows:
+            return None
+        snapshot = rows[0]["snapshot"]
+        remaining = LEADERBOARD_MAX_AGE - (time.time() - snapshot.get("computed_at", 0))
+        if remaining > 0:
+            # Warm Redis for the other workers
+            cache_set_compressed_json(f"{KEY_PREFIX}:{key}", snapshot, remaining)
+
+    age = time.time() - snapshot.get("computed_at", 0)
+    if age > LEADERBOARD_MAX_AGE:
+        logger.info(f"Leaderboard snapshot for {key} is stale ({int(age)}s old)")
+        return None
+    requested, computed = _normalize_postcode(post_code), snapshot.get("postcode", "")
+    if requested and computed and requested != computed:
+        logger.info(f"Leaderboard snapshot for {key} is for postcode {computed}, not {requested}")
+        return None
+    return snapshot
+
+
+def get_snapshot_ages():
+    """Return {suburb_key: computed_at epoch seconds} for every stored snapshot"""
+    ages = {}
+    rows = []
+    start = 0
+    while True:
+        page = get_supabase().table(TABLE_NAME).select("suburb_key,computed_at").range(start, start + 999).execute().data or []
+        rows.extend(page)
+        if len(page) < 1000:
+            break
+        start += 1000
+    for row in rows:
+        try:
+            ages[row["suburb_key"]] = datetime.fromisoformat(row["computed_at"].replace("Z", "+00:00")).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return ages
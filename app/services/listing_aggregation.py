@@ -0,0 +1,180 @@
+"""
+Columnar Listing Aggregation
+Optional pandas backend for get_agent_performance_metrics. Sold listings are
+flattened into one listing x contact row per agent appearance, then primary
+and joint counts, sale value sums and median sold prices are computed with
+grouped operations instead of per-agent Python loops.
+
+Produces the same agents dictionaries as domain_service._add_listing_agents.
+Worth it for region-level and surrounding-suburb reports where listing counts
+reach the thousands; single-suburb reports stay on the plain Python path.
+
+LISTING_AGGREGATION_BACKEND:
+    python - always aggregate in Python (default)
+    pandas - always use pandas when it is installed
+    auto   - use pandas for surrounding-suburb, region and area searches
+"""
+import os
+import logging
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+logger = logging.getLogger("articflow.listing_aggregation")
+
+LISTING_AGGREGATION_BACKEND = os.getenv("LISTING_AGGREGATION_BACKEND", "python").strip().lower()
+
+AGENT_KEYS = ["agency_id", "agent_id"]
+
+
+def use_frame_aggregation(include_surrounding_suburbs=False, region=None, area=None):
+    """True if a search should be aggregated with ListingFrameAggregator"""
+    if LISTING_AGGREGATION_BACKEND == "python":
+        return False
+    if pd is None:
+        logger.warning(f"LISTING_AGGREGATION_BACKEND={LISTING_AGGREGATION_BACKEND} but pandas is not installed")
+        return False
+    if LISTING_AGGREGATION_BACKEND == "pandas":
+        return True
+    return bool(include_surrounding_suburbs or region or area)
+
+
+def _number(value):
+    """Plain int for whole-number results (pandas sums and medians are floats)"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class ListingFrameAggregator:
+    """
+    Collects sold listings page by page and aggregates agents in one pass
+
+    Usage:
+        aggregator = ListingFrameAggregator()
+        aggregator.add_listings(page, agents_by_agency)   # per page
+        agents, price_stats = aggregator.aggregate()
+    """
+
+    def __init__(self):
+        self._columns = {
+            "agency_id": [],
+            "agent_id": [],
+            "photo": [],
+            "listing_id": [],
+            "sold_price": [],
+            "sold_date": [],
+            "is_primary": [],
+        }
+
+    def add_listings(self, listings, agents_by_agency):
+        """
+        Flatten the contacts on sold listings into rows
+
+        Same rules as _add_listing_agents: the first contact is the primary
+        agent, contacts without a name are skipped, and listings whose
+        agency is not in agents_by_agency are ignored.
+        """
+        columns = self._columns
+        for listing in listings:
+            if "listing" not in listing or "advertiser" not in listing["listing"]:
+                continue
+            advertiser = listing["listing"]["advertiser"]
+            agency_id = advertiser.get("id")
+            if agency_id not in agents_by_agency or "contacts" not in advertiser:
+                continue
+
+            listing_id = listing["listing"].get("id")
+            sold_data = listing["listing"].get("soldData") or {}
+            sold_price = sold_data.get("soldPrice")
+            sold_date = sold_data.get("soldDate")
+
+            for index, contact in enumerate(advertiser["contacts"]):
+                if "name" not in contact or not contact["name"] or contact["name"].strip() == "":
+                    logger.info(f"Skipping contact with missing or empty name for listing ID: {listing_id}")
+                    continue
+                columns["agency_id"].append(agency_id)
+                columns["agent_id"].append(contact["name"])
+                columns["photo"].append(contact.get("photoUrl", ""))
+                columns["listing_id"].append(listing_id)
+                columns["sold_price"].append(sold_price)
+                columns["sold_date"].append(sold_date)
+                columns["is_primary"].append(index == 0)
+
+    def aggregate(self):
+        """
+        Build the per-agency agents dictionaries
+
+        Returns:
+            Tuple of ({agency_id: {agent_id: agent_data}},
+            {(agency_id, agent_id): (priced property count, median sold price)})
+        """
+        frame = pd.DataFrame({
+            name: pd.Series(values, dtype=object) for name, values in self._columns.items()
+        })
+        if frame.empty:
+            return {}, {}
+        frame["is_primary"] = frame["is_primary"].astype(bool)
+        frame["price"] = pd.to_numeric(frame["sold_price"], errors="coerce")
+        frame["seq"] = range(len(frame))
+
+        # One entry per agent, in first-appearance order (photo from the first listing)
+        agents_frame = frame.drop_duplicates(AGENT_KEYS, keep="first")
+
+        # Rows without a listing ID register the agent but count no sales
+        sales = frame[frame["listing_id"].map(bool)]
+        primary = sales["is_primary"]
+        price = sales["price"].fillna(0)
+        totals = sales.assign(
+            total_sales=primary.astype(int),
+            joint_sales=(~primary).astype(int),
+            total_value=price.where(primary, 0),
+            joint_sales_value=price.where(~primary, 0),
+        ).groupby(AGENT_KEYS, sort=False)[["total_sales", "joint_sales", "total_value", "joint_sales_value"]].sum()
+
+        # Properties are keyed by listing ID: a repeated listing keeps its first
+        # position but the values of its last occurrence
+        sales = sales.assign(first_seq=sales.groupby(AGENT_KEYS + ["listing_id"], sort=False)["seq"].transform("min"))
+        properties = sales.drop_duplicates(AGENT_KEYS + ["listing_id"], keep="last").sort_values("first_seq")
+
+        priced = properties[properties["price"].notna()]
+        medians = priced.groupby(AGENT_KEYS, sort=False)["price"].agg(["count", "median"])
+        # Even counts average the middle two prices (a float), odd counts pick one
+        price_stats = {
+            key: (int(row_count), float(median) if row_count % 2 == 0 else _number(median))
+            for key, row_count, median in zip(medians.index, medians["count"], medians["median"])
+        }
+
+        agents_by_agency = {}
+        for agency_id, agent_id, photo in zip(agents_frame["agency_id"], agents_frame["agent_id"], agents_frame["photo"]):
+            agents_by_agency.setdefault(agency_id, {})[agent_id] = {
+                "id": agent_id,
+                "name": agent_id,
+                "photo": photo,
+                "properties": {},
+                "total_sales": 0,
+                "joint_sales": 0,
+                "total_value": 0,
+                "joint_sales_value": 0,
+            }
+
+        for (agency_id, agent_id), row in zip(totals.index, totals.itertuples(index=False)):
+            agent_data = agents_by_agency[agency_id][agent_id]
+            agent_data["total_sales"] = int(row.total_sales)
+            agent_data["joint_sales"] = int(row.joint_sales)
+            agent_data["total_value"] = _number(row.total_value)
+            agent_data["joint_sales_value"] = _number(row.joint_sales_value)
+
+        for agency_id, agent_id, listing_id, sold_price, sold_date, is_primary in zip(
+            properties["agency_id"], properties["agent_id"], properties["listing_id"],
+            properties["sold_price"], properties["sold_date"], properties["is_primary"]
+        ):
+            agents_by_agency[agency_id][agent_id]["properties"][listing_id] = {
+                "sold_price": sold_price,
+                "sold_date": sold_date,
+                "is_primary": bool(is_primary),
+            }
+
+        logger.info(f"Aggregated {len(frame)} listing contacts into {len(agents_frame)} agents")
+        return agents_by_agency, price_stats
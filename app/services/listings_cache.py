@@ -0,0 +1,61 @@
+"""
+Listings Search Cache
+Content-addressed Redis cache of Domain.com.au `_search` results.
+
+The key is a hash of the canonical search payload, with the rolling
+`listedSince` cut down to the day, so identical suburb/filter searches made
+within LISTINGS_CACHE_TTL share one upstream request. Results are cached
+before the property-type post-filter, so reports that only differ in
+property types reuse the same entry.
+"""
+import os
+import json
+import hashlib
+import logging
+
+from .cache import cache_get_compressed_json, cache_set_compressed_json, incr_stat, get_stats
+
+logger = logging.getLogger("articflow.listings_cache")
+
+LISTINGS_CACHE_TTL = int(os.getenv("LISTINGS_CACHE_TTL", "1800"))
+
+KEY_PREFIX = "listings_cache"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+
+
+def listings_cache_key(payload):
+    """Build the cache key for a `_search` payload"""
+    canonical = dict(payload)
+    canonical.pop("pageNumber", None)
+    if canonical.get("listedSince"):
+        canonical["listedSince"] = str(canonical["listedSince"])[:10]
+    digest = hashlib.sha256(
+        json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+    listing_type = str(payload.get("listingType", "any")).lower()
+    return f"{KEY_PREFIX}:{listing_type}:{digest}"
+
+
+def get_cached_listings(payload):
+    """Return cached raw listings for payload, or None on miss"""
+    listings = cache_get_compressed_json(listings_cache_key(payload))
+    if listings is None:
+        incr_stat(STATS_KEY, "misses")
+        return None
+    incr_stat(STATS_KEY, "hits")
+    logger.info(f"Listings cache hit ({len(listings)} listings)")
+    return listings
+
+
+def set_cached_listings(payload, listings, ttl=None):
+    """Cache the raw (unfiltered) listings returned for payload"""
+    if listings is None:
+        return
+    ttl = ttl or LISTINGS_CACHE_TTL
+    if cache_set_compressed_json(listings_cache_key(payload), listings, ttl):
+        logger.info(f"Cached {len(listings)} listings for {ttl}s")
+
+
+def get_listings_cache_stats():
+    """Return the hit/miss counters for the listings cache"""
+    return get_stats(STATS_KEY)
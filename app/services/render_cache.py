@@ -0,0 +1,95 @@
+"""
+Rendered PDF Cache
+Disk cache of finished PDFs keyed by a hash of the rendered HTML and the
+stylesheets it uses, so a document that comes out identical for many jobs
+is laid out once and copied afterwards.
+
+Only templates in RENDER_CACHE_TEMPLATES are cached. By default these are
+the commission page, whose values come from a fixed set of rate bands, and
+the no-sales page, which only varies by suburb. Agents and agency reports
+differ per job and are always rendered.
+"""
+import os
+import time
+import shutil
+import hashlib
+import logging
+
+from .cache import incr_stat, get_stats, prune_cache_dir
+
+logger = logging.getLogger("articflow.render_cache")
+
+RENDER_CACHE_TEMPLATES = {
+    name.strip()
+    for name in os.getenv("RENDER_CACHE_TEMPLATES", "commission_report.html,not_found.html").split(",")
+    if name.strip()
+}
+RENDER_CACHE_TTL = int(os.getenv("RENDER_CACHE_TTL", str(7 * 24 * 3600)))  # 7 days
+RENDER_CACHE_DIR = os.getenv(
+    "RENDER_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "temp", "rendered_pdfs")
+)
+
+STATS_KEY = "render_cache:stats"
+PRUNE_INTERVAL = 3600
+
+_last_prune = 0.0
+
+
+def render_cache_key(html_content, css_paths):
+    """Hash of the HTML and the stylesheets (path and modification time) it is rendered with"""
+    digest = hashlib.sha256(html_content.encode("utf-8"))
+    for css_path in css_paths:
+        try:
+            mtime = os.stat(css_path).st_mtime_ns
+        except OSError:
+            mtime = 0
+        digest.update(f"\0{css_path}\0{mtime}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(RENDER_CACHE_DIR, f"{key}.pdf")
+
+
+def copy_cached_pdf(key, output_path):
+    """
+    Copy a cached PDF to output_path
+
+    Returns:
+        True on a cache hit, False if the PDF has to be rendered
+    """
+    path = _cache_path(key)
+    try:
+        if time.time() - os.path.getmtime(path) < RENDER_CACHE_TTL:
+            shutil.copyfile(path, output_path)
+            incr_stat(STATS_KEY, "hits")
+            return True
+    except OSError:
+        pass
+    incr_stat(STATS_KEY, "misses")
+    return False
+
+
+def store_rendered_pdf(key, pdf_path):
+    """Add a freshly rendered PDF to the cache (best effort)"""
+    global _last_prune
+
+    path = _cache_path(key)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+        shutil.copyfile(pdf_path, temp_path)
+        os.replace(temp_path, path)  # Atomic, so a concurrent hit never copies half a file
+    except OSError as e:
+        logger.warning(f"Could not cache rendered PDF {pdf_path}: {e}")
+        return
+
+    if time.time() - _last_prune > PRUNE_INTERVAL:
+        _last_prune = time.time()
+        prune_cache_dir(RENDER_CACHE_DIR, RENDER_CACHE_TTL)
+
+
+def get_render_cache_stats():
+    """Return the hit/miss counters for the rendered PDF cache"""
+    return get_stats(STATS_KEY)
@@ -0,0 +1,195 @@
+"""
+Report Image Prefetch
+Downloads the agent photos and agency logos a report shows before it is
+rendered, instead of WeasyPrint fetching them one by one mid-render.
+
+Images are fetched concurrently, downsized with Pillow to twice their
+displayed size (sharp in print, a fraction of the original bytes) and cached
+on disk and in Redis keyed by URL and size, so a logo that appears in many
+reports is downloaded once. The template context is rewritten to local file:
+URLs; an image that cannot be fetched falls back to the template's
+placeholder.
+"""
+import io
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from .cache import get_redis, prune_cache_dir
+from .http_client import get_async_client
+
+logger = logging.getLogger("articflow.report_images")
+
+REPORT_IMAGE_PREFETCH = os.getenv("REPORT_IMAGE_PREFETCH", "true").lower() == "true"
+REPORT_IMAGE_CONCURRENCY = int(os.getenv("REPORT_IMAGE_CONCURRENCY", "8"))
+REPORT_IMAGE_CACHE_TTL = int(os.getenv("REPORT_IMAGE_CACHE_TTL", str(7 * 24 * 3600)))  # 7 days
+REPORT_IMAGE_CACHE_DIR = os.getenv(
+    "REPORT_IMAGE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "temp", "report_images")
+)
+
+# Context field -> (width, height, fit) in pixels, 2x the CSS size in the templates.
+# "cover" crops to fill the box (round agent photos), "contain" keeps the whole logo.
+IMAGE_FIELDS = {
+    "photo_url": (160, 160, "cover"),          # agents_report .agent-photo, 80x80
+    "agency_logo_url": (200, 60, "contain"),   # agents_report .agency-logo, 100x30
+    "logoUrl": (600, 80, "contain"),           # agency_report .agency-logo img, 300x40
+}
+# Context lists whose items carry those fields
+IMAGE_LISTS = ("agents", "top_agents", "agencies")
+
+JPEG_QUALITY = 85
+PRUNE_INTERVAL = 3600
+
+_last_prune = 0.0
+
+
+def _cache_key(url, size):
+    width, height, fit = size
+    return hashlib.sha1(f"{url}|{width}x{height}|{fit}".encode()).hexdigest()
+
+
+def _extension(data):
+    return "png" if data[:8] == b"\x89PNG\r\n\x1a\n" else "jpg"
+
+
+def _resize(data, size):
+    """Downsize image bytes to size; PNG if the image has transparency, else JPEG"""
+    width, height, fit = size
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if fit == "cover":
+            image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            image.thumbnail((width, height), Image.LANCZOS)  # Never upscales
+
+        output = io.BytesIO()
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            image.save(output, "PNG", optimize=True)
+        else:
+            image.convert("RGB").save(output, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        return output.getvalue()
+
+
+def _write_cache_file(key, data):
+    os.makedirs(REPORT_IMAGE_CACHE_DIR, exist_ok=True)
+    path = os.path.join(REPORT_IMAGE_CACHE_DIR, f"{key}.{_extension(data)}")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)  # Atomic, so a concurrent render never sees half a file
+    return path
+
+
+def _load_cached(key):
+    """Path of a cached image on disk, restored from Redis if another worker fetched it"""
+    for extension in ("jpg", "png"):
+        path = os.path.join(REPORT_IMAGE_CACHE_DIR, f"{key}.{extension}")
+        try:
+            if time.time() - os.path.getmtime(path) < REPORT_IMAGE_CACHE_TTL:
+                return path
+        except OSError:
+            pass
+
+    try:
+        data = get_redis().get(f"report_image:{key}")
+    except Exception as e:
+        logger.warning(f"Redis image cache read failed for {key}: {e}")
+        return None
+    return _write_cache_file(key, data) if data else None
+
+
+def _store(key, data):
+    path = _write_cache_file(key, data)
+    try:
+        get_redis().set(f"report_image:{key}", data, ex=REPORT_IMAGE_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Redis image cache write failed for {key}: {e}")
+    return path
+
+
+async def _fetch_image(url, size, semaphore):
+    """Local path of the resized image for url, or None if it could not be fetched"""
+    key = _cache_key(url, size)
+    try:
+        path = await asyncio.to_thread(_load_cached, key)
+        if path:
+            return path
+
+        async with semaphore:
+            client = get_async_client("images", max_connections=REPORT_IMAGE_CONCURRENCY)
+            response = await client.get(url, follow_redirects=True)
+            response.raise_for_status()
+
+        data = await asyncio.to_thread(_resize, response.content, size)
+        path = await asyncio.to_thread(_store, key, data)
+        logger.info(f"Cached report image {url} ({len(response.content)} -> {len(data)} bytes)")
+        return path
+    except Exception as e:
+        logger.warning(f"Could not prefetch report image {url}: {e}")
+        return None
+
+
+async def prefetch_report_images(context):
+    """
+    Prefetch the remote images in a report context
+
+    Args:
+        context: Template context; image URLs are read from the IMAGE_FIELDS
+                 of the items in its IMAGE_LISTS
+
+    Returns:
+        A copy of context with those URLs replaced by local file: URLs, or
+        by "" (the template fallback) where the image could not be fetched.
+        The original context is returned unchanged if it has no remote images.
+    """
+    global _last_prune
+
+    if not REPORT_IMAGE_PREFETCH or not isinstance(context, dict):
+        return context
+
+    wanted = {}
+    for list_name in IMAGE_LISTS:
+        for item in context.get(list_name) or []:
+            if not isinstance(item, dict):
+                continue
+            for field, size in IMAGE_FIELDS.items():
+                url = item.get(field)
+                if isinstance(url, str) and url.startswith("http"):
+                    wanted[(url, size)] = None
+    if not wanted:
+        return context
+
+    if time.time() - _last_prune > PRUNE_INTERVAL:
+        _last_prune = time.time()
+        await asyncio.to_thread(prune_cache_dir, REPORT_IMAGE_CACHE_DIR, REPORT_IMAGE_CACHE_TTL)
+
+    started = time.time()
+    semaphore = asyncio.Semaphore(max(1, REPORT_IMAGE_CONCURRENCY))
+    keys = list(wanted)
+    paths = await asyncio.gather(*(_fetch_image(url, size, semaphore) for url, size in keys))
+    local_urls = {key: Path(path).as_uri() if path else "" for key, path in zip(keys, paths)}
+
+    context = dict(context)
+    for list_name in IMAGE_LISTS:
+        items = context.get(list_name)
+        if not items:
+            continue
+        rewritten = []
+        for item in items:
+            if isinstance(item, dict):
+                item = dict(item)
+                for field, size in IMAGE_FIELDS.items():
+                    if (item.get(field), size) in local_urls:
+                        item[field] = local_urls[(item[field], size)]
+            rewritten.append(item)
+        context[list_name] = rewritten
+
+    fetched = sum(1 for path in paths if path)
+    logger.info(f"Prefetched {fetched}/{len(keys)} report images in {time.time() - started:.2f}s")
+    return context
@@ -0,0 +1,88 @@
+"""
+Standard Subscription Cache
+Redis cache of (agent_name, suburb, state) -> bool results from the Make.com
+standard-subscription webhook, shared by every RQ worker. The webhook is only
+used when the local subscription set (subscription_status.py) is unavailable.
+
+Keys embed a version number; bumping the version (after agents_subscribed is
+re-synced) invalidates every entry at once without scanning for keys.
+"""
+import os
+import hashlib
+import logging
+
+from .cache import get_redis, cache_get_json, cache_set_json, incr_stat, get_stats
+
+logger = logging.getLogger("articflow.subscription_cache")
+
+STD_SUB_CACHE_TTL = int(os.getenv("STD_SUB_CACHE_TTL", str(6 * 3600)))
+
+KEY_PREFIX = "std_sub"
+VERSION_KEY = f"{KEY_PREFIX}:version"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+
+
+def get_subscription_version():
+    """Current subscription data version (bumped on every agents_subscribed sync)"""
+    try:
+        return int(get_redis().get(VERSION_KEY) or 0)
+    except Exception as e:
+        logger.warning(f"Redis GET failed for {VERSION_KEY}: {e}")
+        return None
+
+
+def _entry_key(version, agent_name, suburb, state):
+    raw = "|".join(part.strip().lower() for part in (agent_name, suburb, state))
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:v{version}:{digest}"
+
+
+def get_cached_subscriptions(agent_names, suburb, state):
+    """
+    Look up cached standard-subscription results for several agents
+
+    Returns:
+        Dictionary of agent_name -> bool for the cache hits only
+    """
+    version = get_subscription_version()
+    if version is None:
+        return {}
+
+    hits = {}
+    for agent_name in agent_names:
+        value = cache_get_json(_entry_key(version, agent_name, suburb, state))
+        if value is None:
+            incr_stat(STATS_KEY, "misses")
+        else:
+            incr_stat(STATS_KEY, "hits")
+            hits[agent_name] = bool(value)
+    return hits
+
+
+def set_cached_subscriptions(results, suburb, state, ttl=None):
+    """Store agent_name -> bool webhook results for suburb/state"""
+    version = get_subscription_version()
+    if version is None:
+        return
+    for agent_name, has_subscription in results.items():
+        cache_set_json(_entry_key(version, agent_name, suburb, state), bool(has_subscription), ttl or STD_SUB_CACHE_TTL)
+
+
+def invalidate_subscription_cache():
+    """
+    Invalidate every cached result (call after agents_subscribed changes)
+
+    Bumping the version also makes workers reload their local subscription set.
+    """
+    try:
+        version = get_redis().incr(VERSION_KEY)
+        logger.info(f"Standard subscription cache invalidated (now version {version})")
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to invalidate standard subscription cache: {e}")
+        return False
+
+
+def get_subscription_cache_stats():
+    """Return the hit/miss counters for the standard subscription cache"""
+    return get_stats(STATS_KEY)
@@ -0,0 +1,130 @@
+"""
+Local Standard Subscription Status
+In-memory set of (agent, suburb, state) standard subscriptions loaded from the
+agents_subscribed table (mirrored from the "Agents Subscribed" sheet), so the
+standard-subscription check is a set lookup instead of a webhook call.
+
+The set is reloaded when the shared subscription version in Redis changes
+(bumped by scripts/sync_agents_subscribed.py and the sheets sync) or after
+STD_SUB_LOCAL_MAX_AGE seconds, whichever comes first.
+
+A named row counts as a standard subscription when its Subscription Type is
+not one of the featured tiers (FEATURED_SUBSCRIPTION_TYPES) and the agent is
+not cancelled. The sheet currently lists featured agents only, so the set is
+empty; an empty set means the sheet holds no standard subscribers yet (not
+that every agent is unsubscribed), and the check keeps using the Make.com
+webhook until standard rows are synced. The empty result is kept until the
+next sync bumps the version, so an idle set costs no further queries.
+"""
+import os
+import time
+import logging
+
+from .supabase_client import get_supabase
+from .subscription_cache import get_subscription_version
+
+logger = logging.getLogger("articflow.subscription_status")
+
+# Subscription types of the featured tiers (comma separated); any other row is standard
+FEATURED_SUBSCRIPTION_TYPES = {
+    t.strip().lower() for t in os.getenv("FEATURED_SUBSCRIPTION_TYPES", "Featured,Featured Plus,Plus").split(",")
+    if t.strip()
+}
+CANCELLED_AGENT_STATUS = "cancelled"
+STD_SUB_LOCAL_MAX_AGE = int(os.getenv("STD_SUB_LOCAL_MAX_AGE", "3600"))
+STD_SUB_PAGE_SIZE = 1000
+
+# Loaded state for this worker process (_subscriptions stays None while unavailable)
+_subscriptions = None
+_loaded = False
+_loaded_version = None
+_loaded_at = 0.0
+
+
+def subscription_key(agent_name, suburb, state):
+    """Normalise an (agent, suburb, state) triple for set membership"""
+    return ((agent_name or "").strip().lower(), (suburb or "").strip().lower(), (state or "").strip().lower())
+
+
+def is_standard_subscription(row):
+    """True for a named agents_subscribed row that is neither a featured tier nor cancelled"""
+    if not (row.get("name") or "").strip():
+        return False
+    if (row.get("agent_status") or "").strip().lower() == CANCELLED_AGENT_STATUS:
+        return False
+    return (row.get("subscription_type") or "").strip().lower() not in FEATURED_SUBSCRIPTION_TYPES
+
+
+def _load_subscriptions():
+    """
+    Read every standard subscription row from agents_subscribed
+
+    Returns:
+        frozenset of subscription_key() tuples, or None if the table holds no
+        standard subscribers (an empty set would mark every agent unsubscribed)
+    """
+    sb = get_supabase()
+    keys = set()
+    start = 0
+    while True:
+        page = sb.table("agents_subscribed").select("name,suburb,state,subscription_type,agent_status").range(
+            start, start + STD_SUB_PAGE_SIZE - 1
+        ).execute().data or []
+        for row in page:
+            if is_standard_subscription(row):
+                keys.add(subscription_key(row.get("name"), row.get("suburb"), row.get("state")))
+        if len(page) < STD_SUB_PAGE_SIZE:
+            return frozenset(keys) if keys else None
+        start += STD_SUB_PAGE_SIZE
+
+
+def get_standard_subscriptions():
+    """
+    Get the in-memory standard subscription set, reloading it if out of date
+
+    Returns:
+        frozenset of subscription_key() tuples, or None if it is unavailable (no
+        standard subscribers in agents_subscribed, or the first load failed)
+    """
+    global _subscriptions, _loaded, _loaded_version, _loaded_at
+
+    version = get_subscription_version()
+    expired = time.monotonic() - _loaded_at > STD_SUB_LOCAL_MAX_AGE
+    if _subscriptions is None and version is not None:
+        # No standard rows yet; only a sync (version bump) can add them
+        expired = False
+    if _loaded and not expired and (version is None or version == _loaded_version):
+        return _subscriptions
+
+    try:
+        subscriptions = _load_subscriptions()
+    except Exception as e:
+        logger.error(f"Failed to load standard subscriptions from agents_subscribed: {e}")
+        # Keep serving the previous set rather than nothing
+        return _subscriptions
+
+    _subscriptions = subscriptions
+    _loaded = True
+    _loaded_version = version
+    _loaded_at = time.monotonic()
+    if subscriptions is None:
+        logger.warning(
+            f"agents_subscribed holds no standard subscribers (only "
+            f"{', '.join(sorted(FEATURED_SUBSCRIPTION_TYPES))} rows), using the webhook"
+        )
+    else:
+        logger.info(f"Loaded {len(subscriptions)} standard subscriptions (version {version})")
+    return _subscriptions
+
+
+def lookup_standard_subscriptions(agent_names, suburb, state):
+    """
+    Check standard subscriptions for several agents against the local set
+
+    Returns:
+        Dictionary mapping agent_name to a boolean, or None if the set is unavailable
+    """
+    subscriptions = get_standard_subscriptions()
+    if subscriptions is None:
+        return None
+    return {name: subscription_key(name, suburb, state) in subscriptions for name in agent_names}
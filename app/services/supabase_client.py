@@ -0,0 +1,85 @@
+"""
+Shared Supabase Client
+Process-wide Supabase clients created lazily and reused by every service,
+so report generation only pays for its queries rather than a new client
+(HTTP session + auth setup) per lookup.
+"""
+import os
+import time
+import logging
+import threading
+from dotenv import load_dotenv
+from supabase import create_client
+
+load_dotenv()
+
+logger = logging.getLogger("articflow.supabase")
+
+# Seconds between health probes of a cached client
+SUPABASE_HEALTH_CHECK_INTERVAL = int(os.getenv("SUPABASE_HEALTH_CHECK_INTERVAL", "300"))
+# Cheap query used to probe the connection
+HEALTH_CHECK_TABLE = "agents_subscribed"
+
+# name -> client. Guarded by _lock so concurrent threads build a client once.
+_clients = {}
+_last_checked = {}
+_lock = threading.Lock()
+
+
+def _build_client(name):
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    logger.info(f"Creating '{name}' Supabase client")
+    return create_client(url, key)
+
+
+def get_supabase(name="service"):
+    """
+    Get the shared Supabase client registered under name
+
+    Args:
+        name: Registry name (the service-role client is "service")
+
+    Returns:
+        supabase.Client
+    """
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _build_client(name)
+            _clients[name] = client
+            _last_checked[name] = time.monotonic()
+        return client
+
+
+def reset_supabase(name="service"):
+    """Drop a cached client so the next get_supabase() builds a fresh one"""
+    with _lock:
+        _clients.pop(name, None)
+        _last_checked.pop(name, None)
+
+
+def check_supabase_health(name="service", force=False):
+    """
+    Probe the shared client with a one-row query, rebuilding it on failure
+
+    Probes are rate limited to SUPABASE_HEALTH_CHECK_INTERVAL unless force is set.
+
+    Returns:
+        True if the client answered (or was checked recently), False otherwise
+    """
+    last = _last_checked.get(name)
+    if not force and last is not None and time.monotonic() - last < SUPABASE_HEALTH_CHECK_INTERVAL:
+        return True
+
+    try:
+        get_supabase(name).table(HEALTH_CHECK_TABLE).select("*").limit(1).execute()
+        _last_checked[name] = time.monotonic()
+        return True
+    except Exception as e:
+        logger.warning(f"Supabase health check failed for '{name}' client, resetting: {e}")
+        reset_supabase(name)
+        return False
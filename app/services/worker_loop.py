@@ -0,0 +1,78 @@
+"""
+Worker Event Loop
+One asyncio event loop per worker process, reused by every job that process
+runs. Pooled HTTP clients (http_client.py) are bound to the loop that opened
+them, so keeping the loop alive keeps their keep-alive connections warm
+between jobs instead of reconnecting for each report.
+
+State only survives between jobs when the worker does not fork a work horse
+per job, i.e. when it runs app.worker.AgentLinkWorker (an RQ SimpleWorker).
+Under a forking worker each job simply gets a fresh loop in its child.
+"""
+import os
+import atexit
+import asyncio
+import logging
+
+from .http_client import close_http_clients
+
+logger = logging.getLogger("articflow.worker_loop")
+
+_loop = None
+_loop_pid = None
+
+
+def get_worker_loop():
+    """
+    Get this process's event loop, creating it if needed
+
+    A loop inherited across fork() is never reused; the child gets its own.
+    """
+    global _loop, _loop_pid
+
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        _loop = asyncio.new_event_loop()
+        _loop_pid = os.getpid()
+        logger.info(f"Created worker event loop for process {_loop_pid}")
+    asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def run_async(coro):
+    """
+    Run a coroutine to completion on the worker loop and return its result
+
+    If run_until_complete is interrupted (RQ's job timeout is raised from a
+    SIGALRM handler), the coroutine's task is cancelled and drained before
+    the exception propagates. Otherwise the loop outlives the job and the
+    abandoned task would resume during the next job's run_until_complete.
+    """
+    loop = get_worker_loop()
+    task = loop.create_task(coro)
+    try:
+        return loop.run_until_complete(task)
+    except BaseException:
+        if not task.done():
+            task.cancel()
+            loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+        raise
+
+
+def shutdown_worker_loop():
+    """Close pooled HTTP clients, finish async generators and close the loop"""
+    global _loop
+
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        return
+    try:
+        _loop.run_until_complete(close_http_clients())
+        _loop.run_until_complete(_loop.shutdown_asyncgens())
+    except Exception as e:
+        logger.warning(f"Error shutting down worker event loop: {e}")
+    finally:
+        _loop.close()
+        _loop = None
+        logger.info(f"Closed worker event loop for process {os.getpid()}")
+
+
+atexit.register(shutdown_worker_loop)
@@ -0,0 +1,56 @@
+"""
+RQ Worker for AgentLink
+Non-forking RQ worker: jobs run in the worker process itself instead of a
+work horse forked per job, so the event loop (services/worker_loop.py),
+pooled HTTP clients, the Supabase client and in-memory lookup tables
+(area types, standard subscriptions, commission rates, compiled report
+templates) stay warm between jobs.
+
+Run with:
+    rq worker --worker-class app.worker.AgentLinkWorker --url redis://redis:6379/0 agentlink-queue
+"""
+import logging
+
+from rq import SimpleWorker
+
+# Import the task module up front so WeasyPrint, Jinja2 and the service
+# modules are loaded before the first job rather than during it
+import app.worker_tasks  # noqa: F401
+from app.services.worker_loop import get_worker_loop, shutdown_worker_loop
+from app.services.supabase_client import check_supabase_health
+from app.services.area_types import load_area_types
+from app.services.subscription_status import get_standard_subscriptions
+from app.services.featured_agents_index import ensure_featured_index
+from app.services.html_pdf_service import precompile_templates
+
+logger = logging.getLogger("articflow.worker")
+
+
+def warm_up():
+    """Create the event loop and load shared clients and lookup tables"""
+    get_worker_loop()
+    steps = [
+        ("Supabase client", lambda: check_supabase_health(force=True)),
+        ("area types", load_area_types),
+        ("standard subscriptions", get_standard_subscriptions),
+        ("featured agents index", ensure_featured_index),
+        ("report templates", precompile_templates),
+    ]
+    for name, step in steps:
+        try:
+            step()
+            logger.info(f"Worker warm-up: loaded {name}")
+        except Exception as e:
+            # Jobs load these lazily anyway; a failed warm-up only costs the first job
+            logger.warning(f"Worker warm-up: failed to load {name}: {e}")
+
+
+class AgentLinkWorker(SimpleWorker):
+    """SimpleWorker that warms shared state on start and closes it on shutdown"""
+
+    def work(self, *args, **kwargs):
+        warm_up()
+        try:
+            return super().work(*args, **kwargs)
+        finally:
+            shutdown_worker_loop()
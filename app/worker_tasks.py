@@ -3,7 +3,9 @@ RQ Worker Tasks for AgentLink
 This file contains all background tasks that will be processed by RQ workers
 """
 import os
+import json
 import asyncio
+import hashlib
 import logging
 from datetime import datetime
 import redis
@@ -15,6 +17,9 @@ from app.services.dropbox_service import upload_to_dropbox
 from app.services.html_pdf_service import generate_pdf_with_weasyprint
 from app.services.agent_commission import get_agent_commission, get_area_type
 from app.services.commission_leasing_service import get_leasing_commission_info
+from app.services.worker_loop import run_async
+from app.services.supabase_client import check_supabase_health
+from app.services.leaderboard_materializer import materialize_leaderboards
 
 # Toggle for Backblaze vs Dropbox
 USE_BACKBLAZE = os.getenv("USE_BACKBLAZE", "false").lower() == "true"
@@ -36,6 +41,12 @@ redis_conn = redis.from_url(REDIS_URL)
 # Create RQ queue
 queue = Queue('agentlink-queue', connection=redis_conn)
 
+# Identical in-flight agents reports share one job for up to this long
+SINGLE_FLIGHT_TTL = 900  # Longer than the 10 minute job timeout
+
+# Suburbs of a batch report processed at the same time by one worker
+BATCH_SUBURB_CONCURRENCY = int(os.getenv("BATCH_SUBURB_CONCURRENCY", "4"))
+
 
 def update_job_status(job_id: str, status: str, **kwargs):
     """Update job status in Redis"""
@@ -49,6 +60,12 @@ def update_job_status(job_id: str, status: str, **kwargs):
     redis_conn.hset(f"job:{job_id}", mapping=job_data)
     redis_conn.expire(f"job:{job_id}", 3600)  # Expire after 1 hour
     logger.info(f"Job {job_id} status updated to: {status}")
+    
+    # Mirror the update onto any duplicate jobs coalesced into this one
+    for follower_id in redis_conn.smembers(f"job:{job_id}:followers"):
+        follower_id = follower_id.decode()
+        redis_conn.hset(f"job:{follower_id}", mapping=job_data)
+        redis_conn.expire(f"job:{follower_id}", 3600)
 
 
 def get_job_status(job_id: str) -> dict:
@@ -60,6 +77,71 @@ def get_job_status(job_id: str) -> dict:
     return {k.decode(): v.decode() for k, v in data.items()}
 
 
+def fail_unfinished_job(job_id: str, error: str):
+    """Mark a job failed unless it already completed or failed (interrupted mid-step)"""
+    status = get_job_status(job_id) if job_id else None
+    if status and status.get("status") not in ("completed", "failed"):
+        update_job_status(job_id, "failed", error=error)
+
+
+def agents_report_flight_key(params: dict) -> str:
+    """
+    Build the single-flight key for an agents report request
+    
+    Suburb/state casing, property type order and whitespace are normalized so
+    that resubmitted or duplicated webhooks map to the same key.
+    """
+    normalized = dict(params)
+    normalized["suburb"] = (normalized.get("suburb") or "").strip().lower()
+    normalized["state"] = (normalized.get("state") or "").strip().upper()
+    if normalized.get("property_types"):
+        normalized["property_types"] = sorted(normalized["property_types"])
+    digest = hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"singleflight:agents:{digest}"
+
+
+def join_single_flight(flight_key: str, job_id: str):
+    """
+    Claim flight_key for job_id, or attach job_id to the job already holding it
+    
+    Returns:
+        The leader job ID if job_id was attached as a follower, otherwise None
+        (job_id is now the leader and should be enqueued)
+    """
+    if redis_conn.set(flight_key, job_id, nx=True, ex=SINGLE_FLIGHT_TTL):
+        return None
+    
+    leader_id = redis_conn.get(flight_key)
+    leader_id = leader_id.decode() if leader_id else None
+    leader = get_job_status(leader_id) if leader_id else None
+    if not leader or leader.get("status") == "failed":
+        # Stale or failed leader - take over the key
+        redis_conn.set(flight_key, job_id, ex=SINGLE_FLIGHT_TTL)
+        return None
+    
+    redis_conn.sadd(f"job:{leader_id}:followers", job_id)
+    redis_conn.expire(f"job:{leader_id}:followers", 3600)
+    
+    # Copy the leader's state after registering, so an update that landed in
+    # between (including completion) is never missed
+    leader = get_job_status(leader_id)
+    if leader:
+        redis_conn.hset(f"job:{job_id}", mapping=leader)
+        redis_conn.expire(f"job:{job_id}", 3600)
+    
+    logger.info(f"Job {job_id} coalesced into in-flight job {leader_id}")
+    return leader_id
+
+
+def release_single_flight(flight_key: str, job_id: str):
+    """Release flight_key if job_id still holds it"""
+    if not flight_key:
+        return
+    holder = redis_conn.get(flight_key)
+    if holder and holder.decode() == job_id:
+        redis_conn.delete(flight_key)
+
+
 async def get_commission_rate_async(agents_data, job_id, suburb, home_owner_pricing, post_code, state):
     """
     Generate a commission report PDF based on agent data and upload it to Dropbox.
@@ -87,7 +169,7 @@ async def get_commission_rate_async(agents_data, job_id, suburb, home_owner_pric
                 marketing_cost = agents_data["top_agents"][0].get("marketing", "")
                 
         if (not commission_rate or not marketing_cost) and home_owner_pricing:
-            area_type = get_area_type(post_code, suburb)
+            area_type = get_area_type(post_code, suburb, state)
             standard_rates = get_agent_commission(home_owner_pricing, area_type, state)
             commission_rate = standard_rates.get("commission_rate", "")
             marketing_cost = standard_rates.get("marketing", "")
@@ -120,6 +202,157 @@ async def get_commission_rate_async(agents_data, job_id, suburb, home_owner_pric
         return None, None, "", "", None
 
 
+async def run_agents_report(
+    job_id: str, 
+    suburb: str = "Queenscliff", 
+    state: str = "NSW",
+    property_types: list = None,
+    min_bedrooms: int = 1,
+    max_bedrooms: int = None,
+    min_bathrooms: int = 1,
+    max_bathrooms: int = None,
+    min_carspaces: int = 1,
+    max_carspaces: int = None,
+    include_surrounding_suburbs: bool = False,
+    post_code: str = None,
+    region: str = None,
+    area: str = None,
+    featured_agent_id: str = None,
+    min_land_area: int = None,
+    max_land_area: int = None,
+    home_owner_pricing: str = None,
+    bypass_cache: bool = False
+):
+    """
+    Generate, upload and record one agents report on the running event loop
+    
+    Shared by single report jobs and batch jobs; job status is updated in
+    Redis as each step completes. Errors propagate to the caller.
+    """
+    update_job_status(job_id, "fetching_agents_data", suburb=suburb)
+    
+    # Step 1: Fetch agents data
+    agents_data = await fetch_property_data(
+        property_id="not_used",
+        job_id=job_id,
+        suburb=suburb,
+        state=state,
+        property_types=property_types,
+        min_bedrooms=min_bedrooms,
+        max_bedrooms=max_bedrooms,
+        min_bathrooms=min_bathrooms,
+        max_bathrooms=max_bathrooms,
+        min_carspaces=min_carspaces,
+        max_carspaces=max_carspaces,
+        include_surrounding_suburbs=include_surrounding_suburbs,
+        post_code=post_code,
+        region=region,
+        area=area,
+        min_land_area=min_land_area,
+        max_land_area=max_land_area,
+        home_owner_pricing=home_owner_pricing,
+        bypass_cache=bypass_cache
+    )
+    
+    logger.info(f"Job {job_id}: Agents data fetched successfully")
+    
+    # Generate commission report if needed
+    commission_dropbox_url = None
+    commission_filename = None
+    commission_rate = ""
+    discount = ""
+    commission_pdf_path = None
+    if home_owner_pricing:
+        update_job_status(job_id, "generating_commission_pdf")
+        commission_dropbox_url, commission_filename, commission_rate, discount, commission_pdf_path = (
+            await get_commission_rate_async(agents_data, job_id, suburb, home_owner_pricing, post_code, state)
+        )
+        logger.info(f"Job {job_id}: Commission report generated: {commission_dropbox_url}")
+    
+    # Step 2: Generate PDF
+    update_job_status(job_id, "generating_pdf")
+    
+    context = {
+        "suburb": suburb,
+        "agents": agents_data["top_agents"]
+    }
+    
+    template_name = "not_found.html" if not agents_data["top_agents"] else "agents_report.html"
+    
+    pdf_path = await generate_pdf_with_weasyprint(
+        context, 
+        job_id=job_id,
+        template_name=template_name
+    )
+    
+    logger.info(f"Job {job_id}: PDF generated at {pdf_path}")
+    
+    # Step 3: Upload to storage (Backblaze or Dropbox)
+    storage_name = "Backblaze" if USE_BACKBLAZE else "Dropbox"
+    update_job_status(job_id, "uploading_to_dropbox")  # Keep status name for compatibility
+    
+    filename = f"{suburb}_Top_Agents_{job_id}.pdf"
+    folder_path = "Suburbs_Top_Agents" if USE_BACKBLAZE else "/Suburbs Top Agents"
+    storage_url = await upload_service(pdf_path, filename, folder_path=folder_path)
+    
+    logger.info(f"Job {job_id}: PDF uploaded to {storage_name}: {storage_url}")
+    
+    # Step 4: Create completed PDF (Backblaze only)
+    completed_pdf_url = None
+    completed_filename = None
+    if USE_BACKBLAZE and home_owner_pricing:
+        update_job_status(job_id, "creating_completed_pdf")
+        try:
+            completed_pdf_url, completed_filename = await create_and_upload_completed_pdf(
+                suburb=suburb,
+                job_id=job_id,
+                agent_report_path=pdf_path,
+                commission_report_path=commission_pdf_path
+            )
+            logger.info(f"Job {job_id}: Completed PDF created: {completed_pdf_url}")
+        except Exception as e:
+            logger.error(f"Job {job_id}: Failed to create completed PDF: {e}")
+    
+    # Clean up temporary files
+    if os.path.exists(pdf_path):
+        os.remove(pdf_path)
+    if commission_pdf_path and os.path.exists(commission_pdf_path):
+        os.remove(commission_pdf_path)
+    
+    # Update final status
+    update_job_status(
+        job_id, 
+        "completed",
+        dropbox_url=storage_url,  # Keep key name for backwards compatibility
+        filename=filename,
+        commission_dropbox_url=commission_dropbox_url or "",
+        commission_filename=commission_filename or "",
+        commission_rate=commission_rate,
+        discount=discount,
+        completed_pdf_url=completed_pdf_url or "",
+        completed_filename=completed_filename or "",
+        error=""
+    )
+    logger.info(f"Job {job_id}: Completed successfully")
+
+
+async def agents_report_job(job_id: str, *args, single_flight_key: str = None, **kwargs):
+    """
+    Run one agents report, recording failures in the job status
+    
+    Takes the same arguments as process_agents_report_task. When
+    single_flight_key is set, duplicate requests have been attached to this
+    job; the key is released once the job finishes either way.
+    """
+    try:
+        await run_agents_report(job_id, *args, **kwargs)
+    except Exception as e:
+        logger.error(f"Error processing agents report job {job_id}: {str(e)}", exc_info=True)
+        update_job_status(job_id, "failed", error=str(e))
+    finally:
+        release_single_flight(single_flight_key, job_id)
+
+
 def process_agents_report_task(
     job_id: str, 
     suburb: str = "Queenscliff", 
@@ -138,24 +371,26 @@ def process_agents_report_task(
     featured_agent_id: str = None,
     min_land_area: int = None,
     max_land_area: int = None,
-    home_owner_pricing: str = None
+    home_owner_pricing: str = None,
+    bypass_cache: bool = False,
+    single_flight_key: str = None
 ):
     """
     RQ Task: Process agents report generation
     This runs in a separate worker process
+    
+    When single_flight_key is set, duplicate requests have been attached to
+    this job; the key is released once the job finishes either way.
     """
     try:
         logger.info(f"Worker: Starting to process agents report job {job_id}")
-        update_job_status(job_id, "fetching_agents_data", suburb=suburb)
+        # Re-probe the shared Supabase client (rate limited) so a dropped
+        # connection is rebuilt before the featured/commission lookups
+        check_supabase_health()
         
-        # Use asyncio.run to execute async functions
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        # Step 1: Fetch agents data
-        agents_data = loop.run_until_complete(fetch_property_data(
-            property_id="not_used",
-            job_id=job_id,
+        # Runs on the worker's long-lived event loop so pooled connections stay warm
+        run_async(agents_report_job(
+            job_id,
             suburb=suburb,
             state=state,
             property_types=property_types,
@@ -169,102 +404,121 @@ def process_agents_report_task(
             post_code=post_code,
             region=region,
             area=area,
+            featured_agent_id=featured_agent_id,
             min_land_area=min_land_area,
             max_land_area=max_land_area,
-            home_owner_pricing=home_owner_pricing
+            home_owner_pricing=home_owner_pricing,
+            bypass_cache=bypass_cache,
+            single_flight_key=single_flight_key
         ))
         
-        logger.info(f"Job {job_id}: Agents data fetched successfully")
-        
-        # Generate commission report if needed
-        commission_dropbox_url = None
-        commission_filename = None
-        commission_rate = ""
-        discount = ""
-        commission_pdf_path = None
-        if home_owner_pricing:
-            update_job_status(job_id, "generating_commission_pdf")
-            commission_dropbox_url, commission_filename, commission_rate, discount, commission_pdf_path = loop.run_until_complete(
-                get_commission_rate_async(agents_data, job_id, suburb, home_owner_pricing, post_code, state)
-            )
-            logger.info(f"Job {job_id}: Commission report generated: {commission_dropbox_url}")
-        
-        # Step 2: Generate PDF
-        update_job_status(job_id, "generating_pdf")
-        
-        context = {
-            "suburb": suburb,
-            "agents": agents_data["top_agents"]
-        }
-        
-        template_name = "not_found.html" if not agents_data["top_agents"] else "agents_report.html"
-        
-        pdf_path = loop.run_until_complete(generate_pdf_with_weasyprint(
-            context, 
-            job_id=job_id,
-            template_name=template_name
-        ))
-        
-        logger.info(f"Job {job_id}: PDF generated at {pdf_path}")
-        
-        # Step 3: Upload to storage (Backblaze or Dropbox)
-        storage_name = "Backblaze" if USE_BACKBLAZE else "Dropbox"
-        update_job_status(job_id, "uploading_to_dropbox")  # Keep status name for compatibility
-        
-        filename = f"{suburb}_Top_Agents_{job_id}.pdf"
-        folder_path = "Suburbs_Top_Agents" if USE_BACKBLAZE else "/Suburbs Top Agents"
-        storage_url = loop.run_until_complete(upload_service(pdf_path, filename, folder_path=folder_path))
-        
-        logger.info(f"Job {job_id}: PDF uploaded to {storage_name}: {storage_url}")
-        
-        # Step 4: Create completed PDF (Backblaze only)
-        completed_pdf_url = None
-        completed_filename = None
-        if USE_BACKBLAZE and home_owner_pricing:
-            update_job_status(job_id, "creating_completed_pdf")
-            try:
-                completed_pdf_url, completed_filename = loop.run_until_complete(
-                    create_and_upload_completed_pdf(
-                        suburb=suburb,
-                        job_id=job_id,
-                        agent_report_path=pdf_path,
-                        commission_report_path=commission_pdf_path
-                    )
-                )
-                logger.info(f"Job {job_id}: Completed PDF created: {completed_pdf_url}")
-            except Exception as e:
-                logger.error(f"Job {job_id}: Failed to create completed PDF: {e}")
-        
-        # Clean up temporary files
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
-        if commission_pdf_path and os.path.exists(commission_pdf_path):
-            os.remove(commission_pdf_path)
-        
-        # Update final status
-        update_job_status(
-            job_id, 
-            "completed",
-            dropbox_url=storage_url,  # Keep key name for backwards compatibility
-            filename=filename,
-            commission_dropbox_url=commission_dropbox_url or "",
-            commission_filename=commission_filename or "",
-            commission_rate=commission_rate,
-            discount=discount,
-            completed_pdf_url=completed_pdf_url or "",
-            completed_filename=completed_filename or "",
-            error=""
-        )
-        
-        loop.close()
-        logger.info(f"Job {job_id}: Completed successfully")
-        
     except Exception as e:
+        # Raised outside the coroutine, e.g. RQ's JobTimeoutException (SIGALRM)
         logger.error(f"Error processing agents report job {job_id}: {str(e)}", exc_info=True)
-        update_job_status(job_id, "failed", error=str(e))
+        fail_unfinished_job(job_id, str(e))
+    finally:
+        release_single_flight(single_flight_key, job_id)
 
 
-def process_agency_report_task(
+def create_batch(batch_id: str, jobs: list):
+    """
+    Record a batch of agents report jobs in Redis
+    
+    Args:
+        batch_id: Batch ID returned to the caller
+        jobs: List of {"job_id", "suburb", "state"} dictionaries, one per suburb
+    """
+    redis_conn.hset(f"batch:{batch_id}", mapping={
+        "jobs": json.dumps(jobs),
+        "created_at": datetime.now().isoformat()
+    })
+    redis_conn.expire(f"batch:{batch_id}", 3600)  # Same lifetime as the job hashes
+
+
+def get_batch_status(batch_id: str) -> dict:
+    """
+    Get a batch and the current status of each of its suburb jobs
+    
+    Returns:
+        Dictionary with overall status, counts and per-suburb job statuses,
+        or None if the batch does not exist
+    """
+    data = redis_conn.hgetall(f"batch:{batch_id}")
+    if not data:
+        return None
+    batch = {k.decode(): v.decode() for k, v in data.items()}
+    
+    jobs = []
+    for job in json.loads(batch["jobs"]):
+        status = get_job_status(job["job_id"]) or {"status": "expired"}
+        jobs.append({**job, **status})
+    
+    completed = sum(1 for job in jobs if job["status"] == "completed")
+    failed = sum(1 for job in jobs if job["status"] in ("failed", "expired"))
+    if completed + failed < len(jobs):
+        overall = "processing"
+    elif failed == 0:
+        overall = "completed"
+    elif completed == 0:
+        overall = "failed"
+    else:
+        overall = "partially_completed"
+    
+    return {
+        "batch_id": batch_id,
+        "status": overall,
+        "created_at": batch.get("created_at", ""),
+        "total": len(jobs),
+        "completed": completed,
+        "failed": failed,
+        "jobs": jobs
+    }
+
+
+async def agents_batch_job(batch_id: str, reports: list):
+    """Run the reports of a batch concurrently (see process_agents_batch_task)"""
+    semaphore = asyncio.Semaphore(max(1, BATCH_SUBURB_CONCURRENCY))
+    
+    async def _run(report):
+        report = dict(report)
+        job_id = report.pop("job_id")
+        async with semaphore:
+            await agents_report_job(job_id, **report)
+    
+    await asyncio.gather(*(_run(report) for report in reports))
+
+
+def process_agents_batch_task(batch_id: str, reports: list):
+    """
+    RQ Task: Process a batch of agents reports (one per suburb) in one worker
+    
+    Suburbs run concurrently (BATCH_SUBURB_CONCURRENCY at a time) on one
+    event loop, so they share this process's pooled HTTP clients, Supabase
+    client and in-memory caches, and an agency requested by several suburbs
+    at once is fetched from Domain only once. PDF renders run on the
+    html_pdf_service render pool while other suburbs wait on the network.
+    
+    Args:
+        batch_id: Batch ID (for logging)
+        reports: List of run_agents_report keyword arguments, each with its own
+                 job_id and optional single_flight_key
+    """
+    try:
+        logger.info(f"Worker: Starting batch {batch_id} with {len(reports)} suburbs")
+        check_supabase_health()
+        run_async(agents_batch_job(batch_id, reports))
+        logger.info(f"Worker: Finished batch {batch_id}")
+    except Exception as e:
+        # Raised outside the coroutines, e.g. RQ's JobTimeoutException (SIGALRM)
+        logger.error(f"Error processing batch {batch_id}: {str(e)}", exc_info=True)
+        for report in reports:
+            fail_unfinished_job(report["job_id"], str(e))
+    finally:
+        for report in reports:
+            release_single_flight(report.get("single_flight_key"), report["job_id"])
+
+
+async def agency_report_job(
     job_id: str, 
     suburb: str = "Queenscliff", 
     state: str = "NSW",
@@ -282,22 +536,16 @@ def process_agency_report_task(
     featured_agency_id: str = None,
     min_land_area: int = None,
     max_land_area: int = None,
-    rental_value: str = None
+    rental_value: str = None,
+    bypass_cache: bool = False
 ):
-    """
-    RQ Task: Process agency report generation
-    This runs in a separate worker process
-    """
+    """Generate, upload and record one agency report (see process_agency_report_task)"""
     try:
         logger.info(f"Worker: Starting to process agency report job {job_id}")
         update_job_status(job_id, "fetching_agency_data", suburb=suburb)
         
-        # Use asyncio.run to execute async functions
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         # Step 1: Fetch agency data
-        agency_data = loop.run_until_complete(fetch_rented_property_data(
+        agency_data = await fetch_rented_property_data(
             property_id="not_used",
             job_id=job_id,
             suburb=suburb,
@@ -314,8 +562,9 @@ def process_agency_report_task(
             region=region,
             area=area,
             min_land_area=min_land_area,
-            max_land_area=max_land_area
-        ))
+            max_land_area=max_land_area,
+            bypass_cache=bypass_cache
+        )
         
         logger.info(f"Job {job_id}: Agency data fetched successfully")
         
@@ -327,11 +576,11 @@ def process_agency_report_task(
             "agencies": agency_data["top_agencies"]
         }
         
-        pdf_path = loop.run_until_complete(generate_pdf_with_weasyprint(
+        pdf_path = await generate_pdf_with_weasyprint(
             context, 
             job_id=job_id,
             template_name="agency_report.html"
-        ))
+        )
         
         logger.info(f"Job {job_id}: Agency PDF generated at {pdf_path}")
         
@@ -345,8 +594,9 @@ def process_agency_report_task(
             logger.info(f"Job {job_id}: Getting commission info for rental_value={rental_value}")
             update_job_status(job_id, "fetching_commission_info")
             
-            # Call webhook and get commission PDF
-            commission_pdf_path, commission_sheet = get_leasing_commission_info(
+            # Call webhook and get commission PDF (blocking, so off the event loop)
+            commission_pdf_path, commission_sheet = await asyncio.to_thread(
+                get_leasing_commission_info,
                 suburb=suburb,
                 state=state,
                 post_code=post_code,
@@ -364,7 +614,7 @@ def process_agency_report_task(
             
             filename = f"{suburb}_Top_Rental_Agencies_{job_id}.pdf"
             backblaze_folder = "Suburbs_Top_Rental_Agencies"
-            pdf_url = loop.run_until_complete(upload_to_backblaze(pdf_path, filename, folder_path=backblaze_folder))
+            pdf_url = await upload_to_backblaze(pdf_path, filename, folder_path=backblaze_folder)
             
             logger.info(f"Job {job_id}: Agency report PDF uploaded to Backblaze: {pdf_url}")
             
@@ -373,13 +623,11 @@ def process_agency_report_task(
                 update_job_status(job_id, "creating_completed_pdf")
                 logger.info(f"Job {job_id}: Creating completed leasing PDF...")
                 
-                completed_pdf_url, completed_filename = loop.run_until_complete(
-                    create_and_upload_completed_leasing_pdf(
-                        agency_report_path=pdf_path,
-                        commission_pdf_path=str(commission_pdf_path),
-                        suburb=suburb,
-                        job_id=job_id
-                    )
+                completed_pdf_url, completed_filename = await create_and_upload_completed_leasing_pdf(
+                    agency_report_path=pdf_path,
+                    commission_pdf_path=str(commission_pdf_path),
+                    suburb=suburb,
+                    job_id=job_id
                 )
                 
                 if completed_pdf_url:
@@ -391,7 +639,7 @@ def process_agency_report_task(
             
             filename = f"{suburb}_Top_Rental_Agencies_{job_id}.pdf"
             dropbox_folder = "/Suburbs Top Rental Agencies"
-            pdf_url = loop.run_until_complete(upload_to_dropbox(pdf_path, filename, folder_path=dropbox_folder))
+            pdf_url = await upload_to_dropbox(pdf_path, filename, folder_path=dropbox_folder)
             
             logger.info(f"Job {job_id}: PDF uploaded to Dropbox: {pdf_url}")
         
@@ -410,9 +658,73 @@ def process_agency_report_task(
             error=""
         )
         
-        loop.close()
         logger.info(f"Job {job_id}: Completed successfully")
         
     except Exception as e:
         logger.error(f"Error processing agency report job {job_id}: {str(e)}", exc_info=True)
         update_job_status(job_id, "failed", error=str(e))
+
+
+def process_agency_report_task(
+    job_id: str, 
+    suburb: str = "Queenscliff", 
+    state: str = "NSW",
+    property_types: list = None,
+    min_bedrooms: int = 1,
+    max_bedrooms: int = None,
+    min_bathrooms: int = 1,
+    max_bathrooms: int = None,
+    min_carspaces: int = 1,
+    max_carspaces: int = None,
+    include_surrounding_suburbs: bool = False,
+    post_code: str = None,
+    region: str = None,
+    area: str = None,
+    featured_agency_id: str = None,
+    min_land_area: int = None,
+    max_land_area: int = None,
+    rental_value: str = None,
+    bypass_cache: bool = False
+):
+    """
+    RQ Task: Process agency report generation
+    This runs in a separate worker process
+    """
+    try:
+        # Worker's long-lived event loop (pooled connections stay warm between jobs)
+        run_async(agency_report_job(
+            job_id,
+            suburb=suburb,
+            state=state,
+            property_types=property_types,
+            min_bedrooms=min_bedrooms,
+            max_bedrooms=max_bedrooms,
+            min_bathrooms=min_bathrooms,
+            max_bathrooms=max_bathrooms,
+            min_carspaces=min_carspaces,
+            max_carspaces=max_carspaces,
+            include_surrounding_suburbs=include_surrounding_suburbs,
+            post_code=post_code,
+            region=region,
+            area=area,
+            featured_agency_id=featured_agency_id,
+            min_land_area=min_land_area,
+            max_land_area=max_land_area,
+            rental_value=rental_value,
+            bypass_cache=bypass_cache
+        ))
+        
+    except Exception as e:
+        # Raised outside the coroutine, e.g. RQ's JobTimeoutException (SIGALRM)
+        logger.error(f"Error processing agency report job {job_id}: {str(e)}", exc_info=True)
+        fail_unfinished_job(job_id, str(e))
+
+
+def materialize_leaderboards_task(force: bool = False, limit: int = None):
+    """
+    RQ Task: Refresh precomputed suburb leaderboards
+    Only stale or missing snapshots are recomputed unless force is set
+    """
+    summary = run_async(materialize_leaderboards(force=force, limit=limit))
+    logger.info(f"Leaderboard materialization finished: {summary}")
+    return summary
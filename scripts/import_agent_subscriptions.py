@@ -28,9 +28,13 @@ import sys
 import re
 from collections import defaultdict
 from datetime import datetime
+from pathlib import Path
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+# Add parent directory to path (for the featured agents index rebuild)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -336,6 +340,14 @@ def main():
     print(f"✅ Done — {inserted} rows inserted into 'agent_subscriptions'")
     print(f"{'='*60}")
 
+    # Rebuild the Redis SUBURB|STATE index used by the featured-agent check
+    try:
+        from app.services.featured_agents_index import build_featured_index
+        suburb_count = build_featured_index(supabase)
+        print(f"\n✅ Rebuilt featured agents index ({suburb_count} suburbs)")
+    except Exception as e:
+        print(f"\n⚠️ Could not rebuild featured agents index (it will rebuild on next lookup): {e}")
+
     only_in_fc = set(fc_by_name_state.keys()) - set(by_name.keys())
     only_in_sub = set(by_name.keys()) - set(fc_by_name_state.keys())
 
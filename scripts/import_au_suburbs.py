@@ -4,8 +4,12 @@ Import Australian Postcodes & Suburbs into Supabase au_suburbs table.
 Source: app/assets/google_sheets/Australian Postcodes & Suburbs.xlsx
 Target: Supabase table `au_suburbs`
 
+Optional 4th column COMMISSION SHEET (1 = inner city, 2 = suburb, 3 = rural)
+populates au_suburbs.commission_sheet when present.
+
 Run:
     python scripts/import_au_suburbs.py
+    python scripts/import_au_suburbs.py --backfill-area-types   # classify remaining suburbs via the area-type webhook
 
 Prerequisites:
     pip install openpyxl supabase python-dotenv
@@ -21,11 +25,30 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Add parent directory to path (for the area-type webhook used by the backfill)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 XLSX_PATH = Path(__file__).parent.parent / "app" / "assets" / "google_sheets" / "Australian Postcodes & Suburbs.xlsx"
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 TABLE_NAME = "au_suburbs"
 BATCH_SIZE = 500
+COMMISSION_SHEET_HEADERS = {"COMMISSION SHEET", "AREA TYPE"}
+AREA_TYPE_NAMES = {"INNER CITY": 1, "INNER_CITY": 1, "SUBURB": 2, "SUBURBS": 2, "RURAL": 3}
+
+
+def parse_commission_sheet(value) -> int | None:
+    """Accept 1/2/3 (number or text) or an area type name; anything else is unclassified."""
+    if value is None or str(value).strip() == "":
+        return None
+    text = str(value).strip().upper()
+    if text in AREA_TYPE_NAMES:
+        return AREA_TYPE_NAMES[text]
+    try:
+        sheet = int(float(text))
+    except ValueError:
+        return None
+    return sheet if sheet in (1, 2, 3) else None
 
 
 def load_xlsx(path: Path) -> list[dict]:
@@ -34,6 +57,11 @@ def load_xlsx(path: Path) -> list[dict]:
     wb = openpyxl.load_workbook(path, data_only=True, read_only=True)
     ws = wb.active
 
+    headers = [str(h or "").strip().upper() for h in next(ws.iter_rows(min_row=1, max_row=1, values_only=True))]
+    sheet_col = next((i for i, h in enumerate(headers) if h in COMMISSION_SHEET_HEADERS), None)
+    if sheet_col is not None:
+        print(f"Found commission sheet column: {headers[sheet_col]}")
+
     rows = []
     seen = set()  # track (suburb, state, postcode) to deduplicate exact duplicates only
 
@@ -55,11 +83,17 @@ def load_xlsx(path: Path) -> list[dict]:
             continue
         seen.add(key)
 
-        rows.append({
+        record = {
             "suburb":   suburb,
             "state":    state,
             "postcode": postcode,
-        })
+        }
+        # Only send commission_sheet when the sheet has it, so upserts don't wipe backfilled values
+        if sheet_col is not None and sheet_col < len(row):
+            sheet = parse_commission_sheet(row[sheet_col])
+            if sheet is not None:
+                record["commission_sheet"] = sheet
+        rows.append(record)
 
     wb.close()
     print(f"Loaded {len(rows)} unique suburb+state+postcode rows")
@@ -71,8 +105,13 @@ def upsert_to_supabase(supabase: Client, rows: list[dict]) -> None:
     total = len(rows)
     inserted = 0
 
-    for i in range(0, total, BATCH_SIZE):
-        batch = rows[i : i + BATCH_SIZE]
+    # PostgREST bulk upserts need identical keys per batch, so rows with and
+    # without a commission_sheet are sent in separate batches
+    with_sheet = [r for r in rows if "commission_sheet" in r]
+    without_sheet = [r for r in rows if "commission_sheet" not in r]
+    batches = [group[i : i + BATCH_SIZE] for group in (with_sheet, without_sheet) for i in range(0, len(group), BATCH_SIZE)]
+
+    for i, batch in enumerate(batches):
         try:
             supabase.table(TABLE_NAME).upsert(
                 batch,
@@ -82,12 +121,42 @@ def upsert_to_supabase(supabase: Client, rows: list[dict]) -> None:
             pct = (inserted / total) * 100
             print(f"  Upserted {inserted}/{total} rows ({pct:.0f}%)")
         except Exception as e:
-            print(f"  ERROR on batch {i//BATCH_SIZE + 1}: {e}")
+            print(f"  ERROR on batch {i + 1}: {e}")
             raise
 
     print(f"\n✅ Done — {inserted} rows upserted to '{TABLE_NAME}'")
 
 
+def backfill_area_types(supabase: Client) -> None:
+    """Classify every au_suburbs row without a commission_sheet using the area-type webhook."""
+    from app.services.commission_leasing_service import call_area_type_webhook
+
+    pending = []
+    start = 0
+    while True:
+        page = supabase.table(TABLE_NAME).select("id,suburb,state,postcode").is_(
+            "commission_sheet", "null"
+        ).range(start, start + BATCH_SIZE - 1).execute().data
+        pending.extend(page)
+        if len(page) < BATCH_SIZE:
+            break
+        start += BATCH_SIZE
+
+    print(f"Backfilling commission_sheet for {len(pending)} suburbs...\n")
+    updated = 0
+    for i, row in enumerate(pending, 1):
+        sheet = parse_commission_sheet(call_area_type_webhook(row["suburb"], row["state"], row["postcode"]))
+        if sheet is None:
+            print(f"  [NO RESULT] {row['suburb']} | {row['state']} | {row['postcode']}")
+            continue
+        supabase.table(TABLE_NAME).update({"commission_sheet": sheet}).eq("id", row["id"]).execute()
+        updated += 1
+        if i % 100 == 0:
+            print(f"  Processed {i}/{len(pending)} ({updated} classified)")
+
+    print(f"\n✅ Done — {updated}/{len(pending)} suburbs classified")
+
+
 def main():
     if not SUPABASE_URL or not SUPABASE_KEY:
         print("ERROR: SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in .env")
@@ -97,6 +166,11 @@ def main():
         print(f"ERROR: File not found: {XLSX_PATH}")
         sys.exit(1)
 
+    if "--backfill-area-types" in sys.argv:
+        print("=== Australian Suburbs Area Type Backfill ===\n")
+        backfill_area_types(create_client(SUPABASE_URL, SUPABASE_KEY))
+        return
+
     print("=== Australian Suburbs Import ===\n")
 
     rows = load_xlsx(XLSX_PATH)
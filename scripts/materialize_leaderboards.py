@@ -0,0 +1,52 @@
+"""
+Precompute suburb agent/agency leaderboards for every subscribed suburb.
+
+Only suburbs whose snapshot is missing or older than LEADERBOARD_REFRESH_AGE
+are recomputed (oldest first, up to LEADERBOARD_BATCH_SIZE per run), so this
+is safe to schedule frequently, e.g. hourly via cron:
+
+    0 * * * * cd /app && python scripts/materialize_leaderboards.py
+
+Run:
+    python scripts/materialize_leaderboards.py            # incremental refresh
+    python scripts/materialize_leaderboards.py --force    # recompute everything
+
+Prerequisites:
+    Run supabase/migrations/create-suburb-leaderboards-table.sql first
+    SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, DOMAIN_API_KEY and REDIS_URL in .env
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.leaderboard_materializer import materialize_leaderboards
+from app.services.http_client import close_http_clients
+
+
+async def run(force):
+    try:
+        return await materialize_leaderboards(force=force)
+    finally:
+        await close_http_clients()
+
+
+def main():
+    force = "--force" in sys.argv
+    print(f"=== Materialize suburb leaderboards ({'full' if force else 'incremental'}) ===\n")
+    summary = asyncio.run(run(force))
+    print(f"\n✅ Refreshed {summary['refreshed']} suburbs, skipped {summary['skipped']} fresh snapshots")
+    if summary["failed"]:
+        print(f"⚠️ Failed: {len(summary['failed'])}")
+        for key in summary["failed"]:
+            print(f"  - {key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Add parent directory to path (for the subscription cache invalidation)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 XLSX_PATH = Path(__file__).parent.parent / "app" / "assets" / "google_sheets" / "Agents Subscribed.xlsx"
 SHEET_NAME = "Sheet1"
 TABLE_NAME = "agents_subscribed"
@@ -123,6 +126,14 @@ def sync(supabase: Client, rows: list[dict]):
 
     print(f"\n✅ Done — {inserted} rows synced to '{TABLE_NAME}'")
 
+    # Cached standard-subscription webhook results are stale now
+    try:
+        from app.services.subscription_cache import invalidate_subscription_cache
+        if invalidate_subscription_cache():
+            print("✅ Invalidated standard subscription cache")
+    except Exception as e:
+        print(f"⚠️ Could not invalidate standard subscription cache: {e}")
+
 
 def main():
     if not SUPABASE_URL or not SUPABASE_KEY:
@@ -0,0 +1,42 @@
+-- Add agent_subscriptions.subscribed_suburb_states
+-- Derived TEXT[] of 'SUBURB|STATE' keys (postcode stripped) kept in sync with
+-- subscribed_suburbs by trigger. Report generation only knows suburb + state,
+-- so this lets the featured-agent lookup use a GIN-indexed containment query
+-- instead of fetching every subscription and filtering in Python.
+--
+-- Lookup query (PostgREST: .contains("subscribed_suburb_states", ["ARMIDALE|NSW"])):
+--   SELECT * FROM agent_subscriptions
+--   WHERE subscribed_suburb_states @> ARRAY['ARMIDALE|NSW'];
+
+ALTER TABLE agent_subscriptions
+    ADD COLUMN IF NOT EXISTS subscribed_suburb_states TEXT[] NOT NULL DEFAULT '{}';
+
+CREATE OR REPLACE FUNCTION agent_subscriptions_suburb_states(suburbs TEXT[])
+RETURNS TEXT[] AS $$
+    SELECT COALESCE(array_agg(DISTINCT upper(trim(split_part(s, '|', 1))) || '|' || upper(trim(split_part(s, '|', 2)))), '{}')
+    FROM unnest(suburbs) AS s
+    WHERE split_part(s, '|', 2) <> '';
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION update_agent_subscriptions_suburb_states()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.subscribed_suburb_states = agent_subscriptions_suburb_states(NEW.subscribed_suburbs);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_agent_subscriptions_suburb_states
+    BEFORE INSERT OR UPDATE OF subscribed_suburbs ON agent_subscriptions
+    FOR EACH ROW
+    EXECUTE FUNCTION update_agent_subscriptions_suburb_states();
+
+-- Backfill existing rows
+UPDATE agent_subscriptions
+SET subscribed_suburb_states = agent_subscriptions_suburb_states(subscribed_suburbs);
+
+-- GIN index for fast containment queries on subscribed_suburb_states
+CREATE INDEX IF NOT EXISTS idx_agent_subs_suburb_states
+    ON agent_subscriptions USING GIN (subscribed_suburb_states);
+
+COMMENT ON COLUMN agent_subscriptions.subscribed_suburb_states IS 'Derived from subscribed_suburbs by trigger. Format: SUBURB|STATE e.g. ARMIDALE|NSW. Use @> with the GIN index for featured-agent lookups.';
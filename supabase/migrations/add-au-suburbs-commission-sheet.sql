@@ -0,0 +1,19 @@
+-- Add au_suburbs.commission_sheet
+-- Static per-suburb area classification used to pick commission rates (sales)
+-- and commission PDFs (leasing). Loaded into worker memory by
+-- app/services/area_types.py so reports no longer call the area-type webhooks.
+--
+--   1 = inner_city, 2 = suburb, 3 = rural, NULL = not classified yet
+--
+-- Populate via scripts/import_au_suburbs.py (COMMISSION SHEET column in the xlsx)
+-- or once from the existing webhook: python scripts/import_au_suburbs.py --backfill-area-types
+
+ALTER TABLE au_suburbs
+    ADD COLUMN IF NOT EXISTS commission_sheet SMALLINT
+    CHECK (commission_sheet IN (1, 2, 3));
+
+-- Partial index: workers only load classified rows
+CREATE INDEX IF NOT EXISTS idx_au_suburbs_commission_sheet
+    ON au_suburbs (commission_sheet) WHERE commission_sheet IS NOT NULL;
+
+COMMENT ON COLUMN au_suburbs.commission_sheet IS 'Area type / commission sheet: 1 = inner city, 2 = suburb, 3 = rural. NULL falls back to the area-type webhook.';
@@ -0,0 +1,21 @@
+-- Table: suburb_leaderboards
+-- Purpose: Precomputed per-suburb agent and agency leaderboards for suburbs with
+-- active subscriptions. Written by scripts/materialize_leaderboards.py (or the
+-- materialize_leaderboards_task RQ job) and read by agents reports that use the
+-- default search filters. Redis holds a copy; this table is the durable store.
+
+CREATE TABLE IF NOT EXISTS suburb_leaderboards (
+    suburb_key   TEXT PRIMARY KEY,            -- SUBURB|STATE e.g. ARMIDALE|NSW
+    suburb       TEXT NOT NULL,
+    state        TEXT NOT NULL,
+    postcode     TEXT NOT NULL DEFAULT '',    -- Postcode the snapshot was computed with
+    agent_count  INTEGER NOT NULL DEFAULT 0,
+    snapshot     JSONB NOT NULL,              -- {"agents": [...], "agencies": [...], "computed_at": epoch}
+    computed_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Incremental refresh picks the oldest snapshots first
+CREATE INDEX IF NOT EXISTS idx_suburb_leaderboards_computed_at ON suburb_leaderboards (computed_at);
+
+COMMENT ON TABLE  suburb_leaderboards          IS 'Precomputed suburb leaderboards (merged agents + agency totals) for default-filter agents reports.';
+COMMENT ON COLUMN suburb_leaderboards.snapshot IS 'Merged agent leaderboard and derived agency leaderboard as served to reports.';
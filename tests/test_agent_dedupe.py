@@ -0,0 +1,196 @@
+"""
+Property tests for app/services/agent_dedupe.py
+
+Randomized agent lists are checked against the original nested-loop
+implementation from domain_service.fetch_property_data, plus invariants
+that must hold for any input. Standard library only; run with pytest or
+directly: python tests/test_agent_dedupe.py
+"""
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.agent_dedupe import (
+    COMMON_FRANCHISES, canonical_agency, dedupe_agents, dedupe_agents_by_name, AgentNameIndex
+)
+
+SEEDS = range(200)
+
+AGENT_NAMES = ["John Smith", "john smith ", "Jane Doe", "JANE DOE", "Alex Lee", "Sam Wu", "Chris Ng", "Pat Kim"]
+AGENCIES = [
+    "Belle Property Dee Why", "Belle Property Manly", "Ray White - Bondi", "Ray White Double Bay",
+    "LJ Hooker Parramatta", "Century 21 Ray White Group", "McGrath Paddington", "Raine & Horne Mosman",
+    "First National Real Estate", "Harcourts", "Smith Realty Co", "Smith Realty", "Local Agents - North",
+    "Local Agents - South", " Independent ", "Belle Property", "Coastal Homes Group Pty",
+]
+
+
+def reference_canonical_agency(agency):
+    """Agency normalization as originally written in fetch_property_data"""
+    agency_full = agency.strip().lower()
+    if ' - ' in agency_full:
+        return agency_full.split(' - ')[0]
+    parts = agency_full.split()
+    if len(parts) > 1:
+        for franchise in COMMON_FRANCHISES:
+            if franchise in agency_full:
+                return franchise
+        return " ".join(parts[:2])
+    return agency_full
+
+
+def reference_dedupe(agents_list):
+    """Branch merge as originally written in fetch_property_data"""
+    unique_agents = {}
+    agents_by_name = {}
+    for agent in agents_list:
+        agents_by_name.setdefault(agent['name'].strip().lower(), []).append(agent)
+
+    for agent_name, agent_group in agents_by_name.items():
+        if len(agent_group) == 1:
+            agent = agent_group[0]
+            unique_agents[f"{agent_name}_{agent['agency'].strip().lower()}"] = agent
+            continue
+
+        normalized_agencies = {}
+        for a in agent_group:
+            normalized_agencies.setdefault(reference_canonical_agency(a['agency']), []).append(a)
+
+        for main_agency, agency_agents in normalized_agencies.items():
+            if len(agency_agents) == 1:
+                unique_agents[f"{agent_name}_{main_agency}"] = agency_agents[0]
+                continue
+            merged_agent = agency_agents[0].copy()
+            merged_agent['branches'] = []
+            totals = {"total_sales": 0, "joint_sales": 0, "total_value": 0, "joint_sales_value": 0}
+            all_properties = {}
+            for branch_agent in agency_agents:
+                merged_agent['branches'].append(branch_agent['agency'])
+                for field in totals:
+                    totals[field] += branch_agent.get(field, 0)
+                for prop_id, prop_data in branch_agent.get('properties', {}).items():
+                    all_properties[prop_id] = prop_data
+            merged_agent.update(totals)
+            merged_agent['properties'] = all_properties
+            merged_agent['agency'] = main_agency
+            unique_agents[f"{agent_name}_{main_agency}"] = merged_agent
+
+    return list(unique_agents.values())
+
+
+def reference_dedupe_by_name(agents_list):
+    """Final by-name dedupe as originally written in fetch_property_data"""
+    final_unique_agents = {}
+    for agent in agents_list:
+        key = agent['name'].strip().lower()
+        existing = final_unique_agents.get(key)
+        if existing is None:
+            final_unique_agents[key] = agent
+        elif agent.get('featured', False) and not existing.get('featured', False):
+            final_unique_agents[key] = agent
+        elif not agent.get('featured', False) and existing.get('featured', False):
+            pass
+        elif agent.get('total_sales', 0) > existing.get('total_sales', 0):
+            final_unique_agents[key] = agent
+    return list(final_unique_agents.values())
+
+
+def random_agents(rng, count):
+    agents = []
+    for index in range(count):
+        sales = rng.randint(1, 20)
+        agents.append({
+            "id": index,
+            "name": rng.choice(AGENT_NAMES),
+            "agency": rng.choice(AGENCIES),
+            "total_sales": sales,
+            "joint_sales": rng.randint(0, sales),
+            "total_value": sales * rng.randint(500_000, 3_000_000),
+            "joint_sales_value": rng.randint(0, 1_000_000),
+            "properties": {f"p{rng.randint(0, 50)}": {"agent": index} for _ in range(rng.randint(0, 3))},
+            "featured": rng.random() < 0.2,
+        })
+    return agents
+
+
+def test_canonical_agency_matches_reference():
+    for agency in AGENCIES + ["", "Ray", "x - y - z", "Raine & Horne Ray White", "mcgrathbelle property"]:
+        assert canonical_agency(agency) == reference_canonical_agency(agency), agency
+
+
+def test_canonical_agency_franchise_priority():
+    # Both franchises appear; the earlier entry in COMMON_FRANCHISES wins regardless of position
+    assert canonical_agency("Century 21 Ray White Group") == "ray white"
+    assert canonical_agency("Harcourts Belle Property") == "belle property"
+
+
+def test_dedupe_matches_reference():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        agents = random_agents(rng, rng.randint(0, 60))
+        assert dedupe_agents(agents) == reference_dedupe(agents), seed
+
+
+def test_dedupe_preserves_sales_totals():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        agents = random_agents(rng, rng.randint(0, 60))
+        result = dedupe_agents(agents)
+        assert sum(a["total_sales"] for a in result) == sum(a["total_sales"] for a in agents), seed
+        assert sum(a["total_value"] for a in result) == sum(a["total_value"] for a in agents), seed
+
+
+def test_dedupe_keys_are_unique_and_idempotent():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        result = dedupe_agents(random_agents(rng, rng.randint(0, 60)))
+        keys = [(a["name"].strip().lower(), canonical_agency(a["agency"])) for a in result]
+        assert len(keys) == len(set(keys)), seed
+        assert dedupe_agents(result) == result, seed
+
+
+def test_dedupe_does_not_mutate_input():
+    rng = random.Random(7)
+    agents = random_agents(rng, 40)
+    snapshot = [dict(agent) for agent in agents]
+    dedupe_agents(agents)
+    assert agents == snapshot
+
+
+def test_dedupe_by_name_matches_reference():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        agents = random_agents(rng, rng.randint(0, 60))
+        result = dedupe_agents_by_name(agents)
+        assert result == reference_dedupe_by_name(agents), seed
+        names = [a["name"].strip().lower() for a in result]
+        assert len(names) == len(set(names)), seed
+
+
+def test_name_index_finds_first_match():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        agents = random_agents(rng, rng.randint(0, 60))
+        index = AgentNameIndex(agents)
+        for name in AGENT_NAMES + ["Nobody"]:
+            expected = next((a for a in agents if a["name"].strip().lower() == name.strip().lower()), None)
+            assert index.find(name) is expected, (seed, name)
+
+
+def test_name_index_append():
+    agents = [{"name": "Jane Doe"}]
+    index = AgentNameIndex(agents)
+    index.append({"name": "New Agent"})
+    index.append({"name": "jane doe"})
+    assert len(agents) == 3
+    assert index.find(" NEW AGENT ") is agents[1]
+    assert index.find("Jane Doe") is agents[0]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
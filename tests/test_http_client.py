@@ -0,0 +1,96 @@
+"""
+Tests for app/services/http_client.py
+
+A pooled client is replaced when it is requested from a different event
+loop; the replaced client's keep-alive connections must be closed rather
+than left open until garbage collection. Uses a local keep-alive HTTP
+server; run with pytest or directly: python tests/test_http_client.py
+"""
+import os
+import sys
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import http_client
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+async def _fetch(name, url):
+    client = http_client.get_async_client(name)
+    response = await client.get(url)
+    assert response.status_code == 200
+    return client
+
+
+def _pooled_sockets(client):
+    sockets = []
+    for connection in client._transport._pool.connections:
+        stream = connection._connection._network_stream
+        sockets.append(stream.get_extra_info("socket"))
+    return sockets
+
+
+def test_client_from_closed_loop_is_closed_on_replace():
+    server, url = _serve()
+    try:
+        old = asyncio.run(_fetch("test-closed-loop", url))
+        sockets = _pooled_sockets(old)
+        assert sockets and all(sock.fileno() != -1 for sock in sockets)
+
+        new = asyncio.run(_fetch("test-closed-loop", url))
+        assert new is not old
+        assert all(sock.fileno() == -1 for sock in sockets)
+        http_client._close_sockets(new)
+    finally:
+        http_client._clients.pop("test-closed-loop", None)
+        server.shutdown()
+
+
+def test_client_on_running_loop_is_closed_there():
+    server, url = _serve()
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        old = asyncio.run_coroutine_threadsafe(_fetch("test-running-loop", url), other_loop).result(5)
+
+        new = asyncio.run(_fetch("test-running-loop", url))
+        assert new is not old
+        # aclose() was scheduled on the loop that owns the client
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.1), other_loop).result(5)
+        assert old.is_closed
+        http_client._close_sockets(new)
+    finally:
+        http_client._clients.pop("test-running-loop", None)
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(5)
+        other_loop.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,142 @@
+"""
+Tests for app/services/leaderboards.py and leaderboard_materializer.py
+
+A snapshot materialized for an agents_subscribed row (which carries a
+postcode) must be found by a default-filter report for the same suburb
+whether or not the request names the postcode, and must only hold the agent
+fields the report renders. Redis and Supabase are replaced with in-memory
+fakes; run with pytest or directly: python tests/test_leaderboards.py
+"""
+import os
+import sys
+import json
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import leaderboards, leaderboard_materializer
+
+AGENTS = [
+    {
+        "id": 11, "name": "Jane Doe", "photo": "https://img.example/1.jpg",
+        "agency": "Ray White Manly", "agency_logo": "https://img.example/rw.png",
+        "total_sales": 3, "joint_sales": 1, "total_value": 4200000, "joint_sales_value": 900000,
+        "median_sold_price": "$1.4M", "total_sales_value_combined": 5100000,
+        "joint_sales_value_formatted": "$900K",
+        "properties": {
+            "101": {"sold_price": 1400000, "sold_date": "2025-03-01", "is_joint": False},
+            "102": {"sold_price": None, "sold_date": "2025-04-01", "is_joint": False},
+        },
+    },
+    {
+        "id": 12, "name": "John Smith", "photo": "N/A",
+        "agency": "LJ Hooker", "agency_logo": "N/A",
+        "total_sales": 1, "joint_sales": 0, "total_value": 0, "joint_sales_value": 0,
+        "median_sold_price": "Not disclosed", "total_sales_value_combined": 0,
+        "joint_sales_value_formatted": "$0",
+        "properties": {"201": {"sold_price": None, "sold_date": "2025-05-01", "is_joint": False}},
+    },
+]
+
+
+class FakeQuery:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.filters = {}
+        self.data = None
+
+    def select(self, columns):
+        return self
+
+    def upsert(self, row, on_conflict=None):
+        self.db.setdefault(self.name, {})[row[on_conflict]] = json.loads(json.dumps(row))
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def limit(self, count):
+        return self
+
+    def range(self, start, end):
+        self.data = list(self.db.get(self.name, [])[start:end + 1])
+        return self
+
+    def execute(self):
+        if self.data is None:
+            rows = self.db.get(self.name, {})
+            self.data = [row for key, row in rows.items() if self.filters.get("suburb_key", key) == key]
+        return self
+
+
+class FakeSupabase:
+    def __init__(self, db=None):
+        self.db = db or {}
+
+    def table(self, name):
+        return FakeQuery(self.db, name)
+
+
+def _fakes(supabase):
+    redis = {}
+    return mock.patch.multiple(
+        leaderboards,
+        get_supabase=lambda: supabase,
+        cache_get_compressed_json=lambda key: json.loads(redis[key]) if key in redis else None,
+        cache_set_compressed_json=lambda key, value, ttl: redis.__setitem__(key, json.dumps(value)),
+    ), redis
+
+
+def test_materialized_suburb_is_served_with_or_without_postcode():
+    supabase = FakeSupabase({"agents_subscribed": [
+        {"suburb": "Manly ", "state": "nsw", "postcode": "2095"},
+        {"suburb": "MANLY", "state": "NSW", "postcode": None},
+    ]})
+    with mock.patch.object(leaderboard_materializer, "get_supabase", lambda: supabase):
+        suburbs = leaderboard_materializer.get_subscribed_suburbs()
+    assert suburbs == [("Manly", "NSW", "2095")]
+
+    patch, redis = _fakes(supabase)
+    with patch:
+        leaderboards.store_leaderboard_snapshot(*suburbs[0], AGENTS)
+
+        for post_code in (None, "", "2095", " 2095 "):
+            snapshot = leaderboards.get_leaderboard_snapshot("manly", "NSW", post_code)
+            assert snapshot is not None, post_code
+            assert [agent["name"] for agent in snapshot["agents"]] == ["Jane Doe", "John Smith"]
+
+        # Redis evicted: served from the Supabase row
+        redis.clear()
+        assert leaderboards.get_leaderboard_snapshot("Manly", "NSW") is not None
+
+
+def test_other_postcode_is_not_served():
+    patch, _ = _fakes(FakeSupabase())
+    with patch:
+        leaderboards.store_leaderboard_snapshot("Springfield", "QLD", "4300", AGENTS)
+        assert leaderboards.get_leaderboard_snapshot("Springfield", "QLD", "4300") is not None
+        assert leaderboards.get_leaderboard_snapshot("Springfield", "QLD", "4806") is None
+
+
+def test_snapshot_holds_only_rendered_fields():
+    supabase = FakeSupabase()
+    patch, redis = _fakes(supabase)
+    with patch:
+        snapshot = leaderboards.store_leaderboard_snapshot("Manly", "NSW", "2095", AGENTS)
+
+    stored_row = supabase.db[leaderboards.TABLE_NAME]["MANLY|NSW"]
+    for stored in (snapshot, json.loads(redis["leaderboard:MANLY|NSW"]), stored_row["snapshot"]):
+        for agent in stored["agents"]:
+            assert set(agent) == set(leaderboards.SNAPSHOT_AGENT_FIELDS) | {"has_sold_price"}
+        assert [agent["has_sold_price"] for agent in stored["agents"]] == [True, False]
+    assert stored_row["postcode"] == "2095"
+    assert snapshot["agencies"][0]["name"] == "Ray White Manly"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
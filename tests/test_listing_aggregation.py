@@ -0,0 +1,125 @@
+"""
+Parity tests for app/services/listing_aggregation.py
+
+Seeded multi-page sold-listing fixtures are aggregated both by
+domain_service._add_listing_agents (page by page, as
+get_agent_performance_metrics streams them) and by ListingFrameAggregator;
+the agents dictionaries must match exactly, including key order and number
+types, and the frame medians must match _agent_price_stats. Run with pytest
+or directly: python tests/test_listing_aggregation.py
+"""
+import os
+import sys
+import json
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.domain_service import _add_listing_agents, _agent_price_stats
+from app.services.listing_aggregation import ListingFrameAggregator
+
+SEEDS = range(100)
+PAGE_SIZE = 25  # Small pages so every fixture spans several of them
+
+AGENCY_IDS = [101, 102, 103, 104]
+UNKNOWN_AGENCY_ID = 999  # Not in agents_by_agency: its listings are ignored
+AGENT_NAMES = ["John Smith", "Jane Doe", "Alex Lee", "Sam Wu", "Chris Ng", "Pat Kim", "", "   ", None]
+PRICES = [None, 0, 650000, 900000, 1250000, 1250000, 2100000, 3300000]
+
+
+def make_listing(rng, listing_ids):
+    """One sold listing in the Domain sales search shape"""
+    listing = {"id": rng.choice(listing_ids)}  # Repeats and missing (None) IDs included
+    if rng.random() < 0.9:
+        listing["soldData"] = {"soldPrice": rng.choice(PRICES), "soldDate": f"2025-{rng.randint(1, 12):02d}-01"}
+
+    advertiser = {"id": UNKNOWN_AGENCY_ID if rng.random() < 0.05 else rng.choice(AGENCY_IDS)}
+    if rng.random() < 0.95:
+        contacts = []
+        for _ in range(rng.randint(0, 3)):
+            contact = {"photoUrl": f"https://img.example/{rng.randint(1, 50)}.jpg"}
+            name = rng.choice(AGENT_NAMES)
+            if name is not None:
+                contact["name"] = name
+            contacts.append(contact)
+        advertiser["contacts"] = contacts
+    listing["advertiser"] = advertiser
+
+    if rng.random() < 0.02:
+        return {"listing": {"id": listing["id"]}}  # No advertiser
+    return {"listing": listing}
+
+
+def make_pages(seed):
+    rng = random.Random(seed)
+    listing_ids = [None] + [rng.randint(1, 10 ** 6) for _ in range(rng.randint(5, 120))]
+    listings = [make_listing(rng, listing_ids) for _ in range(rng.randint(1, 150))]
+    return [listings[i:i + PAGE_SIZE] for i in range(0, len(listings), PAGE_SIZE)]
+
+
+def aggregate_python(pages):
+    agents_by_agency = {agency_id: {} for agency_id in AGENCY_IDS}
+    for page in pages:
+        for listing in page:
+            _add_listing_agents(listing, agents_by_agency)
+    return agents_by_agency
+
+
+def aggregate_frame(pages):
+    agents_by_agency = {agency_id: {} for agency_id in AGENCY_IDS}
+    aggregator = ListingFrameAggregator()
+    for page in pages:
+        aggregator.add_listings(page, agents_by_agency)
+    frame_agents, price_stats = aggregator.aggregate()
+    for agency_id, agents in frame_agents.items():
+        agents_by_agency[agency_id].update(agents)
+    return agents_by_agency, price_stats
+
+
+def dump(agents_by_agency):
+    """Order- and type-sensitive rendering (1 and 1.0 differ, key order matters)"""
+    return json.dumps(
+        [[agency_id, [[agent_id, agent["id"], agent["name"], agent["photo"], agent["total_sales"],
+                       agent["joint_sales"], agent["total_value"], agent["joint_sales_value"],
+                       [[listing_id, prop] for listing_id, prop in agent["properties"].items()]]
+                      for agent_id, agent in agents.items()]]
+         for agency_id, agents in agents_by_agency.items()]
+    )
+
+
+def test_fixtures_span_several_pages():
+    assert max(len(make_pages(seed)) for seed in SEEDS) >= 4
+
+
+def test_frame_matches_python_aggregation():
+    for seed in SEEDS:
+        pages = make_pages(seed)
+        expected = aggregate_python(pages)
+        actual, _ = aggregate_frame(pages)
+        assert actual == expected, f"seed {seed}"
+        assert dump(actual) == dump(expected), f"seed {seed}"
+
+
+def test_frame_medians_match_python():
+    for seed in SEEDS:
+        pages = make_pages(seed)
+        agents_by_agency, price_stats = aggregate_frame(pages)
+        for agency_id, agents in agents_by_agency.items():
+            for agent_id, agent_data in agents.items():
+                count, median = _agent_price_stats(agent_data)
+                stats = price_stats.get((agency_id, agent_id), (0, 0))
+                assert stats == (count, median), f"seed {seed} {agent_id}"
+                assert type(stats[1]) is type(median), f"seed {seed} {agent_id}"
+
+
+def test_empty_pages():
+    agents_by_agency, price_stats = aggregate_frame([[], []])
+    assert agents_by_agency == {agency_id: {} for agency_id in AGENCY_IDS}
+    assert price_stats == {}
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
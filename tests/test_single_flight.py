@@ -0,0 +1,184 @@
+"""
+Tests for agents report single-flight coalescing in app/worker_tasks.py
+
+Covers leader/follower joins, key release, follower status mirroring, and
+that a report interrupted by RQ's job timeout (raised from a SIGALRM
+handler, outside the report coroutine) is marked failed, releases its key
+and does not resume on the reused worker loop. Redis is replaced with a
+small in-memory fake; run with pytest or directly:
+python tests/test_single_flight.py
+"""
+import os
+import sys
+import signal
+import asyncio
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rq.timeouts import JobTimeoutException
+
+import app.worker_tasks as worker_tasks
+
+
+class FakeRedis:
+    """The subset of redis-py used by the job status and single-flight helpers"""
+
+    def __init__(self):
+        self.data = {}
+
+    @staticmethod
+    def _bytes(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = self._bytes(value)
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({self._bytes(k): self._bytes(v) for k, v in mapping.items()})
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(self._bytes(m) for m in members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+
+def _fresh_redis():
+    return mock.patch.object(worker_tasks, "redis_conn", FakeRedis())
+
+
+def _status(job_id):
+    return (worker_tasks.get_job_status(job_id) or {}).get("status")
+
+
+def test_first_request_leads():
+    with _fresh_redis() as r:
+        assert worker_tasks.join_single_flight("flight", "leader") is None
+        assert r.get("flight") == b"leader"
+
+
+def test_duplicate_follows_and_copies_leader_state():
+    with _fresh_redis():
+        worker_tasks.join_single_flight("flight", "leader")
+        worker_tasks.update_job_status("leader", "fetching_agents_data", suburb="Manly")
+
+        assert worker_tasks.join_single_flight("flight", "follower") == "leader"
+        assert worker_tasks.get_job_status("follower")["suburb"] == "Manly"
+        assert _status("follower") == "fetching_agents_data"
+
+
+def test_leader_updates_are_mirrored_to_followers():
+    with _fresh_redis():
+        worker_tasks.join_single_flight("flight", "leader")
+        worker_tasks.update_job_status("leader", "queued")
+        worker_tasks.join_single_flight("flight", "follower")
+
+        worker_tasks.update_job_status("leader", "completed", dropbox_url="https://example/report.pdf")
+        follower = worker_tasks.get_job_status("follower")
+        assert follower["status"] == "completed"
+        assert follower["dropbox_url"] == "https://example/report.pdf"
+
+
+def test_failed_or_missing_leader_is_taken_over():
+    with _fresh_redis() as r:
+        worker_tasks.join_single_flight("flight", "leader")
+        # Leader never wrote a status (expired hash)
+        assert worker_tasks.join_single_flight("flight", "second") is None
+        assert r.get("flight") == b"second"
+
+        worker_tasks.update_job_status("second", "failed", error="boom")
+        assert worker_tasks.join_single_flight("flight", "third") is None
+        assert r.get("flight") == b"third"
+
+
+def test_release_only_by_holder():
+    with _fresh_redis() as r:
+        worker_tasks.join_single_flight("flight", "leader")
+        worker_tasks.release_single_flight("flight", "someone-else")
+        assert r.get("flight") == b"leader"
+
+        worker_tasks.release_single_flight("flight", "leader")
+        assert r.get("flight") is None
+        worker_tasks.release_single_flight(None, "leader")  # No key: no-op
+
+
+def test_report_error_fails_job_and_releases_key():
+    async def failing_report(job_id, **kwargs):
+        worker_tasks.update_job_status(job_id, "fetching_agents_data")
+        raise RuntimeError("Domain API down")
+
+    with _fresh_redis() as r, \
+            mock.patch.object(worker_tasks, "check_supabase_health", lambda: None), \
+            mock.patch.object(worker_tasks, "run_agents_report", failing_report):
+        worker_tasks.join_single_flight("flight", "leader")
+        worker_tasks.update_job_status("leader", "queued")
+        worker_tasks.join_single_flight("flight", "follower")
+
+        worker_tasks.process_agents_report_task("leader", single_flight_key="flight")
+
+        assert _status("leader") == "failed"
+        assert _status("follower") == "failed"
+        assert r.get("flight") is None
+
+
+def test_job_timeout_fails_job_releases_key_and_does_not_resume():
+    finished = []
+
+    async def slow_report(job_id, **kwargs):
+        worker_tasks.update_job_status(job_id, "fetching_agents_data")
+        await asyncio.sleep(kwargs.get("min_bedrooms", 1))
+        worker_tasks.update_job_status(job_id, "completed")
+        finished.append(job_id)
+
+    def raise_timeout(signum, frame):
+        raise JobTimeoutException("Task exceeded maximum timeout value (0.2 seconds)")
+
+    previous = signal.signal(signal.SIGALRM, raise_timeout)
+    try:
+        with _fresh_redis() as r, \
+                mock.patch.object(worker_tasks, "check_supabase_health", lambda: None), \
+                mock.patch.object(worker_tasks, "run_agents_report", slow_report):
+            worker_tasks.join_single_flight("flight", "leader")
+            worker_tasks.update_job_status("leader", "queued")
+            worker_tasks.join_single_flight("flight", "follower")
+
+            # Like RQ's death penalty: SIGALRM interrupts run_until_complete
+            signal.setitimer(signal.ITIMER_REAL, 0.2)
+            worker_tasks.process_agents_report_task("leader", min_bedrooms=1, single_flight_key="flight")
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+            assert _status("leader") == "failed"
+            assert _status("follower") == "failed"
+            assert r.get("flight") is None
+
+            # The next job reuses the worker loop; the interrupted report must not finish there
+            worker_tasks.process_agents_report_task("next", min_bedrooms=1.5)
+            assert finished == ["next"]
+            assert _status("leader") == "failed"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,138 @@
+"""
+Tests for app/services/subscription_status.py
+
+Pins which agents_subscribed rows count as a standard subscription, and that
+check_standard_subscriptions_bulk() falls back to the Make.com webhook when
+the local set has nothing to answer from. Supabase, Redis and the webhook are
+replaced with in-memory fakes; run with pytest or directly:
+python tests/test_subscription_status.py
+"""
+import os
+import sys
+import asyncio
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import subscription_status, domain_utils
+
+# Shape of the mirrored "Agents Subscribed" Sheet1 today: featured tiers only
+# (blank-type rows in the workbook have no name and are skipped by the sync)
+SHEET_ROWS = [
+    {"name": "Jane Doe", "suburb": "Manly", "state": "NSW", "subscription_type": "Featured"},
+    {"name": "John Smith", "suburb": "Manly", "state": "NSW", "subscription_type": "Featured Plus"},
+    {"name": "Veronica Cole", "suburb": "Manly", "state": "NSW", "subscription_type": "Featured",
+     "agent_status": "Cancelled"},
+]
+
+# Rows the sheet would carry for standard subscribers
+STANDARD_ROWS = [
+    {"name": " Sam Wu ", "suburb": "MANLY", "state": "nsw", "subscription_type": None},
+    {"name": "Alex Lee", "suburb": "Manly", "state": "NSW", "subscription_type": "Standard"},
+    {"name": "Pat Kim", "suburb": "Manly", "state": "NSW", "subscription_type": None, "agent_status": "Cancelled"},
+    {"name": None, "suburb": "Manly", "state": "NSW", "subscription_type": None},
+]
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.data = None
+
+    def select(self, columns):
+        return self
+
+    def range(self, start, end):
+        self.data = self.rows[start:end + 1]
+        return self
+
+    def execute(self):
+        return self
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def table(self, name):
+        assert name == "agents_subscribed"
+        self.queries += 1
+        return FakeQuery(self.rows)
+
+
+def _load(rows, max_age=3600):
+    """Run get_standard_subscriptions() twice from a cold state against rows"""
+    supabase = FakeSupabase(rows)
+    with mock.patch.multiple(
+        subscription_status,
+        STD_SUB_LOCAL_MAX_AGE=max_age,
+        _subscriptions=None, _loaded=False, _loaded_version=None, _loaded_at=0.0,
+        get_supabase=lambda: supabase,
+        get_subscription_version=lambda: 1,
+    ):
+        first = subscription_status.get_standard_subscriptions()
+        second = subscription_status.get_standard_subscriptions()
+    return first, second, supabase.queries
+
+
+def test_featured_only_table_is_unavailable():
+    first, second, queries = _load(SHEET_ROWS)
+    assert first is None and second is None
+    assert queries == 1
+
+
+def test_unavailable_set_waits_for_a_sync():
+    # Expired by age, but with the version unchanged the featured-only table is not re-read
+    _, _, queries = _load(SHEET_ROWS, max_age=-1)
+    assert queries == 1
+
+
+def test_non_featured_rows_are_standard():
+    first, second, queries = _load(SHEET_ROWS + STANDARD_ROWS)
+    assert first == frozenset({("sam wu", "manly", "nsw"), ("alex lee", "manly", "nsw")})
+    assert second is first
+    assert queries == 1
+
+
+def test_lookup_against_loaded_set():
+    with mock.patch.object(subscription_status, "get_standard_subscriptions",
+                           return_value=frozenset({("sam wu", "manly", "nsw")})):
+        assert subscription_status.lookup_standard_subscriptions(["Sam Wu", "Jane Doe"], "Manly", "NSW") == {
+            "Sam Wu": True, "Jane Doe": False
+        }
+
+
+def test_bulk_check_falls_back_to_webhook():
+    calls = []
+
+    async def fake_webhook(agent_name, suburb, state):
+        calls.append(agent_name)
+        return agent_name == "Alex Lee"
+
+    with mock.patch.object(domain_utils, "lookup_standard_subscriptions", return_value=None), \
+            mock.patch.object(domain_utils, "get_cached_subscriptions", return_value={}), \
+            mock.patch.object(domain_utils, "set_cached_subscriptions"), \
+            mock.patch.object(domain_utils, "_post_standard_subscription_check", fake_webhook), \
+            mock.patch.object(domain_utils, "STD_SUB_WEBHOOK_FALLBACK", True):
+        results = asyncio.run(domain_utils.check_standard_subscriptions_bulk(["Alex Lee", "Jane Doe"], "Manly", "NSW"))
+
+    assert results == {"Alex Lee": True, "Jane Doe": False}
+    assert sorted(calls) == ["Alex Lee", "Jane Doe"]
+
+
+def test_bulk_check_uses_local_set():
+    with mock.patch.object(domain_utils, "lookup_standard_subscriptions",
+                           return_value={"Alex Lee": True, "Jane Doe": False}), \
+            mock.patch.object(domain_utils, "_post_standard_subscription_check") as webhook:
+        results = asyncio.run(domain_utils.check_standard_subscriptions_bulk(["Alex Lee", "Jane Doe"], "Manly", "NSW"))
+
+    assert results == {"Alex Lee": True, "Jane Doe": False}
+    webhook.assert_not_called()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")